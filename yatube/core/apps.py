@@ -1,5 +1,21 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        # Регистрирует задачу flush_mail для исполнителей очереди.
+        from . import mail  # noqa: F401
+        from .db import configure_sqlite
+        from .metrics import instrument_templates
+        from .slow_queries import install
+        from .template_profile import warm_templates
+
+        connection_created.connect(configure_sqlite)
+        connection_created.connect(install)
+        instrument_templates()
+        if settings.TEMPLATE_PROFILE == 'cached':
+            warm_templates()
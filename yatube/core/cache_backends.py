@@ -0,0 +1,282 @@
+import os
+import random
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.files import locks
+from django.core.signals import request_finished
+
+from .metrics import record_cache_lookup
+
+METRICS = ('hits', 'misses', 'sets', 'evictions')
+STATS_KEY = 'tiered-cache-stats:{tier}:{metric}'
+
+_missing = object()
+
+
+class LocalTier(LocMemCache):
+    """LocMemCache (LRU), который считает вытесненные записи."""
+
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        self.evictions = 0
+
+    def _cull(self):
+        before = len(self._cache)
+        super()._cull()
+        self.evictions += before - len(self._cache)
+
+
+class SharedTier(FileBasedCache):
+    """FileBasedCache, который считает вытесненные записи.
+
+    FileBasedCache перечисляет весь каталог кэша при каждой записи,
+    чтобы проверить MAX_ENTRIES. Здесь проверка идёт раз в CULL_EVERY
+    записей процесса: каталог может превысить предел на столько записей
+    на процесс, пока его не проредят.
+    """
+
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        self.cull_every = params.get('OPTIONS', {}).get('CULL_EVERY', 1)
+        self.sets_since_cull = 0
+        self.evictions = 0
+
+    def _cull(self):
+        self.sets_since_cull += 1
+        if self.sets_since_cull < self.cull_every:
+            return
+        self.sets_since_cull = 0
+        files = self._list_cache_files()
+        if len(files) < self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            self.clear()
+            self.evictions += len(files)
+            return
+        culled = random.sample(files, len(files) // self._cull_frequency)
+        for name in culled:
+            self._delete(name)
+        self.evictions += len(culled)
+
+    @contextmanager
+    def _locked(self):
+        """Блокировка файла в каталоге кэша на чтение-изменение-запись:
+        без неё два процесса, поднимающие версию ленты, оба получат N+1.
+        Файл блокировки не кончается на .djcache и в записи не входит."""
+        self._createdir()
+        with open(os.path.join(self._dir, 'update.lock'), 'ab') as lock:
+            locks.lock(lock, locks.LOCK_EX)
+            try:
+                yield
+            finally:
+                locks.unlock(lock)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._locked():
+            return super().add(key, value, timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        # BaseCache.incr перезаписывает ключ с TIMEOUT по умолчанию, а
+        # увеличивают здесь версии лент и счётчики статистики, которые
+        # хранятся бессрочно.
+        with self._locked():
+            value = self.get(key, version=version)
+            if value is None:
+                raise ValueError("Key '%s' not found" % key)
+            value += delta
+            self.set(key, value, None, version=version)
+        return value
+
+    def size(self):
+        files = self._list_cache_files()
+        return len(files), sum(_file_size(name) for name in files)
+
+
+def _file_size(name):
+    try:
+        return os.path.getsize(name)
+    except OSError:
+        # Файл мог удалить соседний процесс.
+        return 0
+
+
+class TieredCache(BaseCache):
+    """Кэш из двух уровней: LRU в памяти процесса и общий файловый кэш
+    для всех WSGI-процессов хоста.
+
+    Запись идёт в оба уровня, чтение сначала из памяти. Запись в памяти
+    живёт не дольше LOCAL_TIMEOUT, поэтому соседний процесс видит
+    изменение общего уровня с задержкой не больше LOCAL_TIMEOUT секунд.
+    Без SHARED кэш работает только в памяти процесса, с обычными TTL.
+
+    Счётчики попаданий, промахов, записей и вытеснений копятся в процессе
+    и не чаще раза в STATS_FLUSH_INTERVAL секунд прибавляются к общим
+    счётчикам в общем уровне, откуда их читает manage.py cache_stats.
+    Переносятся они по сигналу request_finished, после ответа, а не
+    внутри get() и set().
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.local = LocalTier(location, {
+            'TIMEOUT': params.get('TIMEOUT', 300),
+            'OPTIONS': {
+                'MAX_ENTRIES': options.get('LOCAL_MAX_ENTRIES', 1000),
+            },
+        })
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        shared = options.get('SHARED')
+        self.shared = None
+        if shared:
+            self.shared = SharedTier(shared['LOCATION'], {
+                'TIMEOUT': params.get('TIMEOUT', 300),
+                'KEY_PREFIX': params.get('KEY_PREFIX', ''),
+                'OPTIONS': {
+                    'MAX_ENTRIES': shared.get('MAX_ENTRIES', 10000),
+                    'CULL_EVERY': shared.get('CULL_EVERY', 100),
+                },
+            })
+        self.stats_flush_interval = options.get('STATS_FLUSH_INTERVAL', 10)
+        self.stats = {'local': Counter(), 'shared': Counter()}
+        self._flushed_at = time.monotonic()
+        self._flushed_evictions = {'local': 0, 'shared': 0}
+        # Слабая ссылка: кэш потока уходит вместе с потоком.
+        request_finished.connect(self._flush_stats_if_due)
+
+    def _local_timeout(self, timeout):
+        if self.shared is None:
+            return timeout
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return self.local_timeout
+        return min(timeout, self.local_timeout)
+
+    def _record(self, tier, metric):
+        self.stats[tier][metric] += 1
+
+    def _flush_stats_if_due(self, **kwargs):
+        if time.monotonic() - self._flushed_at >= self.stats_flush_interval:
+            self.flush_stats()
+
+    def get(self, key, default=None, version=None):
+        value = self.local.get(key, _missing, version=version)
+        if value is not _missing:
+            self._record('local', 'hits')
+            record_cache_lookup(hit=True)
+            return value
+        self._record('local', 'misses')
+        if self.shared is None:
+            record_cache_lookup(hit=False)
+            return default
+        value = self.shared.get(key, _missing, version=version)
+        if value is _missing:
+            self._record('shared', 'misses')
+            record_cache_lookup(hit=False)
+            return default
+        self._record('shared', 'hits')
+        record_cache_lookup(hit=True)
+        self.local.set(
+            key, value, self._local_timeout(DEFAULT_TIMEOUT), version=version
+        )
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if self.shared is not None:
+            self.shared.set(key, value, timeout, version=version)
+            self._record('shared', 'sets')
+        self.local.set(
+            key, value, self._local_timeout(timeout), version=version
+        )
+        self._record('local', 'sets')
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if self.shared is None:
+            return self.local.add(key, value, timeout, version=version)
+        if not self.shared.add(key, value, timeout, version=version):
+            return False
+        self.local.set(
+            key, value, self._local_timeout(timeout), version=version
+        )
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        touched = self.local.touch(
+            key, self._local_timeout(timeout), version=version
+        )
+        if self.shared is not None:
+            touched = self.shared.touch(key, timeout, version=version)
+        return touched
+
+    def incr(self, key, delta=1, version=None):
+        if self.shared is None:
+            return self.local.incr(key, delta, version=version)
+        value = self.shared.incr(key, delta, version=version)
+        self.local.set(
+            key, value, self._local_timeout(DEFAULT_TIMEOUT), version=version
+        )
+        return value
+
+    def delete(self, key, version=None):
+        self.local.delete(key, version=version)
+        if self.shared is not None:
+            self.shared.delete(key, version=version)
+
+    def has_key(self, key, version=None):
+        return self.get(key, _missing, version=version) is not _missing
+
+    def clear(self):
+        self.local.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    def flush_stats(self):
+        """Переносит накопленные счётчики процесса в общий уровень."""
+        self._flushed_at = time.monotonic()
+        for tier, backend in (('local', self.local),
+                              ('shared', self.shared)):
+            if backend is None:
+                continue
+            self.stats[tier]['evictions'] += (
+                backend.evictions - self._flushed_evictions[tier]
+            )
+            self._flushed_evictions[tier] = backend.evictions
+        if self.shared is None:
+            return
+        for tier, counter in self.stats.items():
+            for metric, delta in counter.items():
+                if not delta:
+                    continue
+                key = STATS_KEY.format(tier=tier, metric=metric)
+                self.shared.add(key, 0, None)
+                self.shared.incr(key, delta)
+            counter.clear()
+
+    def get_stats(self):
+        """Счётчики по уровням: общие для всех процессов при SHARED,
+        иначе только текущего процесса."""
+        self.flush_stats()
+        stats = {}
+        for tier, counter in self.stats.items():
+            stats[tier] = {metric: counter[metric] for metric in METRICS}
+            if self.shared is not None:
+                for metric in METRICS:
+                    stats[tier][metric] = self.shared.get(
+                        STATS_KEY.format(tier=tier, metric=metric), 0
+                    )
+        stats['local']['entries'] = len(self.local._cache)
+        stats['local']['max_entries'] = self.local._max_entries
+        if self.shared is not None:
+            entries, size = self.shared.size()
+            stats['shared']['entries'] = entries
+            stats['shared']['bytes'] = size
+            stats['shared']['max_entries'] = self.shared._max_entries
+        else:
+            del stats['shared']
+        return stats
@@ -0,0 +1,178 @@
+import time
+import traceback
+import uuid
+from datetime import timedelta
+from email import message_from_bytes
+from email.message import Message
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.message import MIMEMixin
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Job, QueuedMail
+from .tasks import backoff, task
+
+FLUSH_LOCK_KEY = 'core:mail:flushing'
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Почтовый бэкенд, который не отправляет письма, а складывает их в
+    таблицу QueuedMail и ставит задачу flush_mail. Запрос ждёт только
+    записи в базу; отправкой через MAIL_DELIVERY_BACKEND занимаются
+    исполнители manage.py run_workers."""
+
+    def send_messages(self, email_messages):
+        queued = [
+            QueuedMail(
+                from_email=message.from_email,
+                recipients='\n'.join(message.recipients()),
+                message=message.message().as_bytes(),
+            )
+            for message in email_messages
+            if message.recipients()
+        ]
+        if not queued:
+            return 0
+        with transaction.atomic():
+            QueuedMail.objects.bulk_create(queued)
+            schedule_flush()
+        return len(queued)
+
+
+class RawMIMEMessage(MIMEMixin, Message):
+    """MIME-сообщение, разобранное из байтов, с as_bytes(linesep=...),
+    которого ждёт SMTP-бэкенд Django."""
+
+
+class StoredMessage(EmailMessage):
+    """Письмо из очереди: MIME-сообщение уже собрано, бэкенду остаётся
+    только передать его."""
+
+    def __init__(self, mail):
+        super().__init__(
+            from_email=mail.from_email, to=mail.recipients.splitlines()
+        )
+        self.raw = bytes(mail.message)
+
+    def message(self):
+        return message_from_bytes(self.raw, _class=RawMIMEMessage)
+
+
+def schedule_flush():
+    """Ставит flush_mail, если в очереди нет готовой к запуску. Повтор,
+    отложенный backoff на будущее, не в счёт: новое письмо не должно его
+    ждать, а двойной отправки не даст claim_mail."""
+    if not Job.objects.filter(
+        task=flush_mail.task_name, status=Job.QUEUED,
+        run_at__lte=timezone.now(),
+    ).exists():
+        flush_mail.enqueue()
+
+
+def release_stale_mail():
+    stale = timezone.now() - timedelta(seconds=settings.TASKS_LOCK_TIMEOUT)
+    return QueuedMail.objects.filter(
+        status=QueuedMail.SENDING, locked_at__lt=stale
+    ).update(status=QueuedMail.QUEUED, locked_by='', locked_at=None)
+
+
+def claim_mail(owner, limit):
+    """Забирает до limit готовых писем тем же условным UPDATE, что и
+    core.tasks.claim."""
+    now = timezone.now()
+    ids = list(
+        QueuedMail.objects.filter(status=QueuedMail.QUEUED, send_at__lte=now)
+        .order_by('send_at', 'pk')
+        .values_list('pk', flat=True)[:limit]
+    )
+    QueuedMail.objects.filter(pk__in=ids, status=QueuedMail.QUEUED).update(
+        status=QueuedMail.SENDING, locked_by=owner, locked_at=now
+    )
+    return list(
+        QueuedMail.objects.filter(status=QueuedMail.SENDING, locked_by=owner)
+        .order_by('send_at', 'pk')
+    )
+
+
+@task(atomic=False)
+def flush_mail():
+    """Отправляет очередь писем пачками по MAIL_BATCH_SIZE через одно
+    соединение MAIL_DELIVERY_BACKEND, не быстрее MAIL_RATE_LIMIT писем в
+    секунду. Письмо, которое не ушло, повторяется позже, а после
+    MAIL_MAX_ATTEMPTS попыток остаётся со статусом failed.
+
+    Каждое письмо удаляется из очереди сразу после отправки, поэтому
+    задача идёт вне общей транзакции.
+
+    Одновременно идёт только один flush_mail: второй удвоил бы скорость
+    отправки. Тот, что застал блокировку, сразу выходит, а работающий,
+    сняв её, ещё раз смотрит в очередь. Новые пачки не берутся дольше
+    MAIL_FLUSH_TIME_LIMIT секунд, остаток досылает следующий flush_mail:
+    задача укладывается в TASKS_LOCK_TIMEOUT, и release_stale не
+    запускает её второй раз.
+    """
+    if not cache.add(FLUSH_LOCK_KEY, True, settings.TASKS_LOCK_TIMEOUT):
+        return 0
+    try:
+        sent, retry_at = _send_queued()
+    finally:
+        cache.delete(FLUSH_LOCK_KEY)
+    if retry_at is not None:
+        flush_mail.enqueue(run_at=retry_at)
+    if QueuedMail.objects.filter(
+        status=QueuedMail.QUEUED, send_at__lte=timezone.now()
+    ).exists():
+        schedule_flush()
+    return sent
+
+
+def _send_queued():
+    release_stale_mail()
+    owner = uuid.uuid4().hex
+    connection = get_connection(settings.MAIL_DELIVERY_BACKEND)
+    started = time.monotonic()
+    deadline = started + settings.MAIL_FLUSH_TIME_LIMIT
+    sent = 0
+    retry_at = None
+    # Ошибку открытия соединения ловит очередь задач и повторит flush_mail.
+    with connection:
+        while True:
+            batch = claim_mail(owner, settings.MAIL_BATCH_SIZE)
+            if not batch:
+                break
+            for mail in batch:
+                pause = started + sent / settings.MAIL_RATE_LIMIT
+                time.sleep(max(0, pause - time.monotonic()))
+                try:
+                    connection.send_messages([StoredMessage(mail)])
+                except Exception:
+                    send_at = _retry_later(mail, traceback.format_exc())
+                    if send_at and (retry_at is None or send_at < retry_at):
+                        retry_at = send_at
+                else:
+                    mail.delete()
+                sent += 1
+            if time.monotonic() >= deadline:
+                break
+    return sent, retry_at
+
+
+def _retry_later(mail, error):
+    """Возвращает письмо в очередь и отдаёт время следующей попытки или
+    None, если попытки исчерпаны."""
+    mail.attempts += 1
+    failed = mail.attempts >= settings.MAIL_MAX_ATTEMPTS
+    send_at = timezone.now() + backoff(mail.attempts)
+    QueuedMail.objects.filter(pk=mail.pk).update(
+        status=QueuedMail.FAILED if failed else QueuedMail.QUEUED,
+        attempts=mail.attempts,
+        send_at=send_at,
+        locked_by='',
+        locked_at=None,
+        last_error=error,
+    )
+    return None if failed else send_at
@@ -0,0 +1,43 @@
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+
+from core.cache_backends import TieredCache
+
+
+class Command(BaseCommand):
+    help = 'Показывает попадания, размер и вытеснения по уровням кэша.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--alias', default='default', help='Псевдоним кэша из CACHES.'
+        )
+
+    def handle(self, *args, **options):
+        cache = caches[options['alias']]
+        if not isinstance(cache, TieredCache):
+            raise CommandError(
+                f'Кэш {options["alias"]} не использует TieredCache.'
+            )
+        if cache.shared is None:
+            self.stdout.write(self.style.WARNING(
+                'Общий уровень выключен: счётчики относятся только к '
+                'этому процессу.'
+            ))
+        for tier, stats in cache.get_stats().items():
+            lookups = stats['hits'] + stats['misses']
+            ratio = stats['hits'] / lookups if lookups else 0
+            self.stdout.write(f'[{tier}]')
+            self.stdout.write(
+                f'  hit ratio: {ratio:.1%} '
+                f'({stats["hits"]} hits / {stats["misses"]} misses)'
+            )
+            # Память процесса у каждого своя, видна только своя.
+            scope = ' (this process)' if tier == 'local' else ''
+            self.stdout.write(
+                f'  entries{scope}: {stats["entries"]} '
+                f'of {stats["max_entries"]}'
+            )
+            if 'bytes' in stats:
+                self.stdout.write(f'  size: {stats["bytes"]} bytes')
+            self.stdout.write(f'  sets: {stats["sets"]}')
+            self.stdout.write(f'  evictions: {stats["evictions"]}')
@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core.template_profile import RenderProfile
+from posts.models import Group, Post
+
+User = get_user_model()
+
+DUMMY_CACHES = {
+    alias: {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+    for alias in settings.CACHES
+}
+
+
+def default_urls():
+    """Ленты и страница поста на данных из текущей базы."""
+    urls = [reverse('posts:index')]
+    group = Group.objects.order_by('pk').first()
+    if group is not None:
+        urls.append(reverse('posts:posts_list', args=[group.slug]))
+    post = Post.objects.select_related('author').order_by('-pk').first()
+    if post is not None:
+        urls.append(reverse('posts:profile', args=[post.author.username]))
+        urls.append(reverse('posts:post_detail', args=[post.pk]))
+    return urls
+
+
+class Command(BaseCommand):
+    help = (
+        'Отрисовывает страницы тестовым клиентом и показывает, сколько '
+        'времени занял каждый шаблон (с include) и каждый тег и '
+        'переменная по месту в шаблоне. Кэши на время замера выключены, '
+        'чтобы отрисовывались и закэшированные фрагменты лент.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'urls', nargs='*',
+            help='Адреса страниц; по умолчанию ленты и страница поста.',
+        )
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument(
+            '--limit', type=int, default=20,
+            help='Сколько самых дорогих тегов показать.',
+        )
+        parser.add_argument(
+            '--warm-cache', action='store_true',
+            help='Не выключать кэши: замерять страницы как при повторе.',
+        )
+
+    def handle(self, *args, **options):
+        urls = options['urls'] or default_urls()
+        client = Client()
+        caches = {} if options['warm_cache'] else {'CACHES': DUMMY_CACHES}
+        with override_settings(**caches), RenderProfile() as profile:
+            for url in urls:
+                for _ in range(options['repeat']):
+                    response = client.get(url)
+                    if response.status_code != 200:
+                        raise CommandError(
+                            f'{url}: ответ {response.status_code}'
+                        )
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            'Шаблоны: всего мс, отрисовок, мс на отрисовку'
+        ))
+        for name, (count, total) in self.ranked(profile.templates):
+            self.write_row(total, count, name)
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            'Теги и переменные: всего мс, вызовов, мс на вызов'
+        ))
+        ranked = self.ranked(profile.nodes)[:options['limit']]
+        for (name, line, label), (count, total) in ranked:
+            self.write_row(total, count, f'{name}:{line}  {label}')
+
+    def ranked(self, totals):
+        return sorted(totals.items(), key=lambda item: -item[1][1])
+
+    def write_row(self, total, count, title):
+        self.stdout.write(
+            f'{total * 1000:9.2f}  {count:7}  '
+            f'{total / count * 1000:8.3f}  {title}'
+        )
@@ -0,0 +1,52 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import tasks
+
+
+class Command(BaseCommand):
+    help = 'Запускает исполнителей фоновых задач core.tasks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=2,
+            help='Число потоков-исполнителей.',
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Выполнить готовые задачи и выйти.',
+        )
+
+    def handle(self, *args, **options):
+        tasks.discover()
+        released = tasks.release_stale()
+        if released:
+            self.stdout.write(f'Возвращено брошенных задач: {released}')
+        if options['burst']:
+            done = tasks.run_jobs(tasks.worker_name(0))
+            self.stdout.write(self.style.SUCCESS(f'Выполнено задач: {done}'))
+            return
+        stop = threading.Event()
+        threads = [
+            threading.Thread(
+                target=tasks.work, args=(index, stop),
+                name=f'worker-{index}', daemon=True,
+            )
+            for index in range(options['workers'])
+        ]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(self.style.SUCCESS(
+            f'Исполнителей: {len(threads)}. Остановка — Ctrl+C.'
+        ))
+        try:
+            while True:
+                time.sleep(settings.TASKS_LOCK_TIMEOUT / 2)
+                tasks.release_stale()
+        except KeyboardInterrupt:
+            stop.set()
+            for thread in threads:
+                thread.join()
@@ -0,0 +1,91 @@
+import json
+import os
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.slow_queries import normalize_sql
+
+SORT_KEYS = {
+    'total': lambda group: group['total_ms'],
+    'count': lambda group: group['count'],
+    'max': lambda group: group['max_ms'],
+}
+
+
+def read_entries(path):
+    """Записи журнала и его ротированных копий path.1, path.2, ..."""
+    paths = [path]
+    number = 1
+    while os.path.exists(f'{path}.{number}'):
+        paths.append(f'{path}.{number}')
+        number += 1
+    for name in reversed(paths):
+        if not os.path.exists(name):
+            continue
+        with open(name, encoding='utf-8') as log:
+            for line in log:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def group_entries(entries):
+    """Группирует записи по форме SQL."""
+    groups = defaultdict(lambda: {
+        'count': 0, 'total_ms': 0, 'max_ms': 0, 'sources': Counter(),
+    })
+    for entry in entries:
+        group = groups[normalize_sql(entry['sql'])]
+        group['count'] += 1
+        group['total_ms'] += entry['duration_ms']
+        group['max_ms'] = max(group['max_ms'], entry['duration_ms'])
+        for source in (entry.get('frame'), entry.get('template')):
+            if source:
+                group['sources'][source] += 1
+    return groups
+
+
+class Command(BaseCommand):
+    help = (
+        'Отчёт по журналу медленных запросов: запросы сгруппированы по '
+        'форме SQL, для каждой — число, суммарное и максимальное время и '
+        'места в коде и шаблонах, откуда они выполнялись.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--log', default=settings.SLOW_QUERY_LOG,
+            help='Журнал; по умолчанию SLOW_QUERY_LOG.',
+        )
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument(
+            '--sort', choices=sorted(SORT_KEYS), default='total',
+        )
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options['log']):
+            raise CommandError(f'Журнал {options["log"]} не найден.')
+        groups = group_entries(read_entries(options['log']))
+        if not groups:
+            self.stdout.write('Медленных запросов нет.')
+            return
+        ranked = sorted(
+            groups.items(),
+            key=lambda item: SORT_KEYS[options['sort']](item[1]),
+            reverse=True,
+        )
+        for number, (sql, group) in enumerate(
+            ranked[:options['limit']], 1
+        ):
+            average = group['total_ms'] / group['count']
+            self.stdout.write(self.style.WARNING(
+                f'{number}. {group["count"]} запросов, всего '
+                f'{group["total_ms"]:.0f} мс, в среднем {average:.1f} мс, '
+                f'максимум {group["max_ms"]:.1f} мс'
+            ))
+            self.stdout.write(f'   {sql}')
+            for source, count in group['sources'].most_common(3):
+                self.stdout.write(f'   {source} ({count})')
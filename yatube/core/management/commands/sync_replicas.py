@@ -0,0 +1,48 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from posts.feeds import replicas_synced
+
+
+class Command(BaseCommand):
+    help = (
+        'Заменитель репликации для локальной проверки: копирует основную '
+        'базу SQLite в файлы реплик через backup API.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Повторять копирование каждые N секунд.',
+        )
+
+    def handle(self, *args, **options):
+        primary = connections['default'].settings_dict
+        if primary['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('sync_replicas работает только с SQLite.')
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('DATABASE_REPLICAS пуст.')
+        while True:
+            for alias in settings.DATABASE_REPLICAS:
+                self.copy(primary['NAME'], connections[alias])
+                self.stdout.write(f'{alias}: синхронизирована')
+            replicas_synced()
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    def copy(self, source_path, replica):
+        # Открытое соединение Django с репликой видело бы старые данные
+        # и мешало бы записи файла.
+        replica.close()
+        source = sqlite3.connect(source_path)
+        target = sqlite3.connect(replica.settings_dict['NAME'])
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
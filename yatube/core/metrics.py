@@ -0,0 +1,237 @@
+import bisect
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.template.base import Template
+
+# Границы корзин гистограмм: секунды для времени, штуки для запросов.
+SECONDS_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+QUERIES_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+HISTOGRAMS = (
+    ('request_seconds', 'Время ответа', SECONDS_BUCKETS),
+    ('db_seconds', 'Время запросов к базе', SECONDS_BUCKETS),
+    ('template_seconds', 'Время отрисовки шаблонов', SECONDS_BUCKETS),
+    ('queries', 'Число запросов к базе', QUERIES_BUCKETS),
+)
+
+_state = threading.local()
+
+
+class RequestMetrics:
+    """Замеры одного запроса. Пока запрос идёт, объект доступен потоку
+    через current(), и его пополняют обёртка запросов к базе, Template.render
+    и TieredCache.get."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = 0
+        self.db_time = 0
+        self.queries = 0
+        self.template_time = 0
+        self.rendering = False
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обёртка connection.execute_wrapper."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    def server_timing(self):
+        return ', '.join((
+            f'total;dur={self.total * 1000:.1f}',
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'cache;desc="{self.cache_hits} hits {self.cache_misses} misses"',
+        ))
+
+
+def current():
+    return getattr(_state, 'request', None)
+
+
+def start():
+    _state.request = RequestMetrics()
+    return _state.request
+
+
+def stop():
+    _state.request = None
+
+
+def record_cache_lookup(hit):
+    metrics = current()
+    if metrics is None:
+        return
+    if hit:
+        metrics.cache_hits += 1
+    else:
+        metrics.cache_misses += 1
+
+
+def instrument_templates():
+    """Считает время Template.render в текущем запросе. Вложенные шаблоны
+    ({% include %}, {% extends %}) входят во время внешнего."""
+    render = Template.render
+    if getattr(render, 'instrumented', False):
+        return
+
+    @wraps(render)
+    def timed_render(self, context):
+        metrics = current()
+        if metrics is None or metrics.rendering:
+            return render(self, context)
+        metrics.rendering = True
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            metrics.template_time += time.perf_counter() - started
+            metrics.rendering = False
+
+    timed_render.instrumented = True
+    Template.render = timed_render
+
+
+class RollingHistogram:
+    """Гистограмма за последние METRICS_WINDOW секунд.
+
+    Окно разбито на METRICS_WINDOW_SLICES отрезков; устаревший отрезок
+    обнуляется при первой записи после него, поэтому старые замеры
+    выпадают из окна ступеньками.
+    """
+
+    def __init__(self, buckets, window, slices):
+        self.buckets = buckets
+        self.slice_seconds = window / slices
+        self.slices = [
+            {'epoch': None, 'counts': [0] * (len(buckets) + 1), 'sum': 0}
+            for _ in range(slices)
+        ]
+
+    def _slice(self, now):
+        epoch = int(now // self.slice_seconds)
+        current_slice = self.slices[epoch % len(self.slices)]
+        if current_slice['epoch'] != epoch:
+            current_slice['epoch'] = epoch
+            current_slice['counts'] = [0] * (len(self.buckets) + 1)
+            current_slice['sum'] = 0
+        return current_slice
+
+    def observe(self, value, now):
+        current_slice = self._slice(now)
+        current_slice['counts'][bisect.bisect_left(self.buckets, value)] += 1
+        current_slice['sum'] += value
+
+    def snapshot(self, now):
+        """Накопленные счётчики корзин (последняя — +Inf) и сумма за
+        окно."""
+        oldest = int(now // self.slice_seconds) - len(self.slices) + 1
+        counts = [0] * (len(self.buckets) + 1)
+        total = 0
+        for window_slice in self.slices:
+            if window_slice['epoch'] is None or window_slice['epoch'] < oldest:
+                continue
+            for index, count in enumerate(window_slice['counts']):
+                counts[index] += count
+            total += window_slice['sum']
+        cumulative = []
+        running = 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return cumulative, total
+
+
+class Registry:
+    """Гистограммы и счётчики кэша по имени вью в памяти процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def _view(self, name):
+        view = self.views.get(name)
+        if view is None:
+            window = settings.METRICS_WINDOW
+            slices = settings.METRICS_WINDOW_SLICES
+            view = {
+                metric: RollingHistogram(buckets, window, slices)
+                for metric, _, buckets in HISTOGRAMS
+            }
+            view['cache_hits'] = RollingHistogram((), window, slices)
+            view['cache_misses'] = RollingHistogram((), window, slices)
+            self.views[name] = view
+        return view
+
+    def observe(self, name, metrics, now=None):
+        now = time.time() if now is None else now
+        with self.lock:
+            view = self._view(name)
+            view['request_seconds'].observe(metrics.total, now)
+            view['db_seconds'].observe(metrics.db_time, now)
+            view['template_seconds'].observe(metrics.template_time, now)
+            view['queries'].observe(metrics.queries, now)
+            view['cache_hits'].observe(metrics.cache_hits, now)
+            view['cache_misses'].observe(metrics.cache_misses, now)
+
+    def clear(self):
+        with self.lock:
+            self.views.clear()
+
+    def render(self, now=None):
+        """Текстовый формат Prometheus."""
+        now = time.time() if now is None else now
+        prefix = settings.METRICS_PREFIX
+        window = settings.METRICS_WINDOW
+        lines = []
+        with self.lock:
+            views = sorted(self.views.items())
+            for metric, title, buckets in HISTOGRAMS:
+                name = f'{prefix}_{metric}'
+                lines.append(f'# HELP {name} {title} за {window} с.')
+                lines.append(f'# TYPE {name} histogram')
+                for view_name, view in views:
+                    counts, total = view[metric].snapshot(now)
+                    label = f'view="{_escape(view_name)}"'
+                    bounds = [str(bound) for bound in buckets] + ['+Inf']
+                    for bound, count in zip(bounds, counts):
+                        lines.append(
+                            f'{name}_bucket{{{label},le="{bound}"}} {count}'
+                        )
+                    lines.append(f'{name}_sum{{{label}}} {total:g}')
+                    lines.append(f'{name}_count{{{label}}} {counts[-1]}')
+            name = f'{prefix}_cache_lookups'
+            lines.append(
+                f'# HELP {name} Обращения к кэшу за {window} с.'
+            )
+            lines.append(f'# TYPE {name} gauge')
+            for view_name, view in views:
+                label = f'view="{_escape(view_name)}"'
+                for result in ('hits', 'misses'):
+                    total = view[f'cache_{result}'].snapshot(now)[1]
+                    lines.append(
+                        f'{name}{{{label},result="{result}"}} {total}'
+                    )
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return (
+        value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    )
+
+
+registry = Registry()
@@ -0,0 +1,61 @@
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics, routers
+
+
+class ReplicaPinningMiddleware:
+    """Read-your-writes для реплик: после записи клиент получает cookie,
+    и его запросы читают основную базу, пока реплики не догонят её."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routers.reset()
+        if settings.REPLICA_PIN_COOKIE in request.COOKIES:
+            routers.pin_to_primary()
+        try:
+            response = self.get_response(request)
+            if routers.wrote_to_primary():
+                response.set_cookie(
+                    settings.REPLICA_PIN_COOKIE, '1',
+                    max_age=settings.REPLICA_PIN_SECONDS,
+                    httponly=True, samesite='Lax',
+                )
+        finally:
+            routers.reset()
+        return response
+
+
+class MetricsMiddleware:
+    """Замеряет каждый запрос: общее время, время и число запросов к
+    базе, время шаблонов и обращения к кэшу. Отдаёт их в заголовке
+    Server-Timing и копит по имени вью в core.metrics.registry, откуда их
+    читает /metrics.
+
+    Стоит первым в MIDDLEWARE, чтобы в общее время вошли все остальные.
+    Потоковые ответы замеряются до начала отдачи тела.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        measured = metrics.start()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(measured))
+                response = self.get_response(request)
+        finally:
+            metrics.stop()
+        measured.finish()
+        match = request.resolver_match
+        metrics.registry.observe(
+            match.view_name if match else '<unresolved>', measured
+        )
+        response['Server-Timing'] = measured.server_timing()
+        return response
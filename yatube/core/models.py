@@ -0,0 +1,79 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Отложенная задача core.tasks. Строка записывается в той же
+    транзакции, что и данные, ради которых задача поставлена, и
+    переживает перезапуск процессов."""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Не выполнена'),
+    )
+
+    task = models.CharField('Задача', max_length=200)
+    payload = models.TextField('Аргументы', help_text='JSON: args и kwargs')
+    status = models.CharField(
+        'Состояние', max_length=10, choices=STATUS_CHOICES, default=QUEUED
+    )
+    run_at = models.DateTimeField('Запустить не раньше', default=timezone.now)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField('Предел попыток')
+    locked_by = models.CharField('Исполнитель', max_length=100, blank=True)
+    locked_at = models.DateTimeField('Взята в работу', null=True, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Поставлена', auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['status', 'run_at'], name='job_status_run_at_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.task} #{self.pk} ({self.status})'
+
+
+class QueuedMail(models.Model):
+    """Письмо, принятое core.mail.QueuedEmailBackend и ждущее отправки.
+    Хранится готовым MIME-сообщением."""
+
+    QUEUED = 'queued'
+    SENDING = 'sending'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'В очереди'),
+        (SENDING, 'Отправляется'),
+        (FAILED, 'Не отправлено'),
+    )
+
+    from_email = models.CharField('Отправитель', max_length=254)
+    recipients = models.TextField('Получатели', help_text='По одному в строке')
+    message = models.BinaryField('Сообщение')
+    status = models.CharField(
+        'Состояние', max_length=10, choices=STATUS_CHOICES, default=QUEUED
+    )
+    send_at = models.DateTimeField('Отправить не раньше', default=timezone.now)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    locked_by = models.CharField('Отправитель очереди', max_length=100,
+                                 blank=True)
+    locked_at = models.DateTimeField('Взято в отправку', null=True,
+                                     blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Принято', auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['status', 'send_at'], name='mail_status_send_at_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'#{self.pk} -> {self.recipients.replace(chr(10), ", ")}'
@@ -0,0 +1,55 @@
+import random
+import threading
+
+from django.conf import settings
+
+# Модели этих приложений читаются с реплик: ленты, посты и группы.
+REPLICATED_APPS = {'posts'}
+
+_state = threading.local()
+
+
+def pin_to_primary():
+    """Направляет все чтения текущего потока на основную базу."""
+    _state.pinned = True
+
+
+def wrote_to_primary():
+    return getattr(_state, 'wrote', False)
+
+
+def reset():
+    _state.pinned = False
+    _state.wrote = False
+
+
+class PrimaryReplicaRouter:
+    """Записи идут в основную базу, чтения постов и групп — на случайную
+    реплику из DATABASE_REPLICAS.
+
+    После записи чтения потока тоже идут в основную базу, чтобы автор
+    сразу увидел свой пост; между запросами это состояние переносит
+    core.middleware.ReplicaPinningMiddleware.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            not settings.DATABASE_REPLICAS
+            or model._meta.app_label not in REPLICATED_APPS
+            or getattr(_state, 'pinned', False)
+        ):
+            return 'default'
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        _state.pinned = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат копию основной базы целиком.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема попадает на реплики вместе с данными репликацией.
+        return db == 'default'
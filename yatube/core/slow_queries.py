@@ -0,0 +1,119 @@
+import json
+import logging
+import os
+import random
+import re
+import sys
+import sysconfig
+import time
+
+import django
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger('yatube.slow_queries')
+
+# Сколько своих кадров стека сохранять, от ближайшего к запросу.
+STACK_DEPTH = 5
+MAX_PARAMS_LENGTH = 500
+
+# Кадры этих модулей — обёртки вокруг запроса, а не его причина.
+_INSTRUMENTATION = {
+    os.path.abspath(__file__),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'metrics.py'),
+}
+# Каталоги стандартной библиотеки, установленных пакетов и Django, в том
+# числе виртуального окружения внутри BASE_DIR. Сравниваются префиксы
+# путей: проект может лежать и в /var/lib или /usr/lib.
+_LIBRARIES = tuple(sorted({
+    os.path.join(os.path.realpath(path), '')
+    for path in (
+        *(sysconfig.get_paths()[name]
+          for name in ('stdlib', 'platstdlib', 'purelib', 'platlib')),
+        os.path.dirname(django.__file__),
+    )
+}))
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDER_LIST_RE = re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)')
+SPACE_RE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """Форма запроса без значений: литералы и параметры заменены на ?,
+    списки IN (?, ?, ...) свёрнуты в IN (...)."""
+    sql = STRING_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = PLACEHOLDER_LIST_RE.sub('(...)', sql)
+    return SPACE_RE.sub(' ', sql).strip()
+
+
+def _own_code(filename):
+    return (
+        filename.startswith(settings.BASE_DIR)
+        and filename not in _INSTRUMENTATION
+        and not os.path.realpath(filename).startswith(_LIBRARIES)
+    )
+
+
+def attribute(frame):
+    """Кадры нашего кода, вызвавшие запрос, и строка шаблона, если запрос
+    выполнен при отрисовке."""
+    stack = []
+    template = None
+    while frame is not None:
+        code = frame.f_code
+        if template is None and code.co_name == 'render_annotated':
+            node = frame.f_locals.get('self')
+            origin = getattr(node, 'origin', None)
+            token = getattr(node, 'token', None)
+            if origin is not None and token is not None:
+                template = f'{origin.template_name}:{token.lineno}'
+        if len(stack) < STACK_DEPTH and _own_code(code.co_filename):
+            filename = os.path.relpath(code.co_filename, settings.BASE_DIR)
+            stack.append(f'{filename}:{frame.f_lineno} in {code.co_name}')
+        frame = frame.f_back
+    return stack, template
+
+
+def log_slow_queries(execute, sql, params, many, context):
+    """Обёртка connection.execute_wrapper: запросы дольше SLOW_QUERY_MS
+    попадают в журнал yatube.slow_queries с долей SLOW_QUERY_SAMPLE_RATE.
+    """
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = (time.perf_counter() - started) * 1000
+        threshold = settings.SLOW_QUERY_MS
+        if (
+            threshold is not None
+            and duration >= threshold
+            and random.random() < settings.SLOW_QUERY_SAMPLE_RATE
+        ):
+            stack, template = attribute(sys._getframe(1))
+            logger.warning(json.dumps({
+                'time': timezone.now().isoformat(),
+                'alias': context['connection'].alias,
+                'duration_ms': round(duration, 3),
+                'sql': sql,
+                'params': repr(params)[:MAX_PARAMS_LENGTH],
+                'many': many,
+                'frame': stack[0] if stack else None,
+                'template': template,
+                'stack': stack,
+            }, ensure_ascii=False))
+
+
+def install(sender, connection, **kwargs):
+    """Обработчик connection_created: вешает log_slow_queries на
+    соединение один раз за жизнь его обёртки.
+
+    Соединение может открыться внутри connection.execute_wrapper(), а тот
+    снимает свою обёртку с конца списка, поэтому наша встаёт в начало.
+    """
+    if log_slow_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, log_slow_queries)
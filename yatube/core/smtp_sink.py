@@ -0,0 +1,106 @@
+import socketserver
+import threading
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Минимальный SMTP-сервер для тестов и локальной проверки: принимает
+    любые письма и складывает их в messages, ничего не отправляя.
+
+        with SMTPSink() as sink:
+            EMAIL_HOST, EMAIL_PORT = sink.server_address
+            ...
+            sink.messages  # [(mail_from, [rcpt, ...], data), ...]
+
+    sink.sessions — число SMTP-соединений, sink.reject_next — сколько
+    следующих писем отклонить ответом 451.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0):
+        super().__init__((host, port), SMTPHandler)
+        self.messages = []
+        self.sessions = 0
+        self.reject_next = 0
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        with self.server.lock:
+            self.server.sessions += 1
+        self.mail_from, self.recipients = None, []
+        self.reply('220 sink ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip()
+            handler = getattr(self, f'smtp_{command[:4].lower()}', None)
+            if handler is None:
+                self.reply('502 Command not implemented')
+            elif handler(command) is False:
+                return
+
+    def smtp_ehlo(self, command):
+        self.reply('250-sink')
+        self.reply('250 8BITMIME')
+
+    def smtp_helo(self, command):
+        self.reply('250 sink')
+
+    def smtp_mail(self, command):
+        self.mail_from, self.recipients = command[10:].strip(' <>'), []
+        self.reply('250 OK')
+
+    def smtp_rcpt(self, command):
+        self.recipients.append(command[8:].strip(' <>'))
+        self.reply('250 OK')
+
+    def smtp_data(self, command):
+        self.reply('354 End data with <CR><LF>.<CR><LF>')
+        data = self.read_data()
+        with self.server.lock:
+            rejected = self.server.reject_next > 0
+            if rejected:
+                self.server.reject_next -= 1
+            else:
+                self.server.messages.append(
+                    (self.mail_from, self.recipients, data))
+        self.reply('451 Try again later' if rejected else '250 OK')
+
+    def smtp_rset(self, command):
+        self.mail_from, self.recipients = None, []
+        self.reply('250 OK')
+
+    def smtp_noop(self, command):
+        self.reply('250 OK')
+
+    def smtp_quit(self, command):
+        self.reply('221 Bye')
+        return False
+
+    def read_data(self):
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if line in (b'.\r\n', b'.\n', b''):
+                return b''.join(lines)
+            if line.startswith(b'..'):
+                line = line[1:]
+            lines.append(line)
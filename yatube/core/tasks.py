@@ -0,0 +1,163 @@
+import json
+import logging
+import os
+import socket
+import traceback
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Job
+from .routers import pin_to_primary
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+class UnknownTask(Exception):
+    pass
+
+
+def task(func=None, *, max_attempts=None, atomic=True):
+    """Регистрирует функцию как задачу очереди.
+
+    Аргументы задачи должны сериализоваться в JSON. Поставить задачу:
+    func.enqueue(*args, **kwargs). Задача выполняется в транзакции, если
+    не указано atomic=False: так её запускают задачи, которые сами
+    фиксируют каждый шаг.
+    """
+    def register(func):
+        name = f'{func.__module__}.{func.__name__}'
+        _registry[name] = func
+        func.task_name = name
+        func.max_attempts = max_attempts or settings.TASKS_MAX_ATTEMPTS
+        func.atomic = atomic
+        func.enqueue = lambda *args, **kwargs: enqueue(func, *args, **kwargs)
+        return func
+
+    if func is not None:
+        return register(func)
+    return register
+
+
+def enqueue(func, *args, run_at=None, **kwargs):
+    """Ставит задачу в очередь. Строка Job попадает в базу вместе с
+    текущей транзакцией, и после отката задачи как не было."""
+    return Job.objects.create(
+        task=func.task_name,
+        payload=json.dumps({'args': args, 'kwargs': kwargs}),
+        max_attempts=func.max_attempts,
+        run_at=run_at or timezone.now(),
+    )
+
+
+def discover():
+    """Импортирует модули tasks всех приложений."""
+    autodiscover_modules('tasks')
+
+
+def backoff(attempt):
+    """Пауза перед повтором: TASKS_RETRY_DELAY, удваивается с каждой
+    попыткой, но не дольше TASKS_RETRY_MAX_DELAY секунд."""
+    delay = settings.TASKS_RETRY_DELAY * 2 ** (attempt - 1)
+    return timedelta(seconds=min(delay, settings.TASKS_RETRY_MAX_DELAY))
+
+
+def release_stale():
+    """Возвращает в очередь задачи исполнителей, которые упали, не
+    завершив их."""
+    stale = timezone.now() - timedelta(seconds=settings.TASKS_LOCK_TIMEOUT)
+    return Job.objects.filter(status=Job.RUNNING, locked_at__lt=stale).update(
+        status=Job.QUEUED, locked_by='', locked_at=None
+    )
+
+
+def claim(worker):
+    """Берёт одну готовую к запуску задачу.
+
+    Взятие — UPDATE с условием status=queued: из двух исполнителей,
+    выбравших одну строку, его выполнит только один, без блокировок
+    SELECT ... FOR UPDATE, которых нет в SQLite.
+    """
+    now = timezone.now()
+    candidates = Job.objects.filter(
+        status=Job.QUEUED, run_at__lte=now
+    ).order_by('run_at', 'pk').values_list('pk', flat=True)[:10]
+    for pk in candidates:
+        claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING,
+            locked_by=worker,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def run_job(job):
+    """Выполняет задачу. Успешная удаляется, упавшая уходит на повтор
+    или, исчерпав попытки, остаётся в таблице со статусом failed."""
+    try:
+        func = _registry.get(job.task)
+        if func is None:
+            raise UnknownTask(job.task)
+        payload = json.loads(job.payload)
+        with transaction.atomic() if func.atomic else nullcontext():
+            func(*payload['args'], **payload['kwargs'])
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning('Задача %s упала (попытка %s)', job, job.attempts)
+        failed = job.attempts >= job.max_attempts
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.FAILED if failed else Job.QUEUED,
+            run_at=timezone.now() + backoff(job.attempts),
+            locked_by='',
+            locked_at=None,
+            last_error=error,
+        )
+        return False
+    Job.objects.filter(pk=job.pk).delete()
+    return True
+
+
+def run_jobs(worker='inline', limit=None):
+    """Выполняет готовые задачи в текущем потоке, пока они есть, и
+    возвращает число выполненных (в том числе упавших)."""
+    done = 0
+    while limit is None or done < limit:
+        job = claim(worker)
+        if job is None:
+            break
+        run_job(job)
+        done += 1
+    return done
+
+
+def worker_name(index):
+    return f'{socket.gethostname()}:{os.getpid()}:{index}'
+
+
+def work(index, stop):
+    """Цикл исполнителя: берёт задачи, пока не выставлен stop."""
+    name = worker_name(index)
+    # Задачи идут сразу за записью, реплики могут её ещё не видеть.
+    pin_to_primary()
+    while not stop.is_set():
+        close_old_connections()
+        try:
+            job = claim(name)
+            if job is None:
+                stop.wait(settings.TASKS_POLL_INTERVAL)
+                continue
+            run_job(job)
+        except Exception:
+            logger.exception('Ошибка исполнителя %s', name)
+            stop.wait(settings.TASKS_POLL_INTERVAL)
+    connections.close_all()
@@ -0,0 +1,146 @@
+import logging
+import os
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.template import TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+from django.template.base import Node, Template, TextNode, TokenType
+from django.template.utils import get_app_template_dirs
+
+logger = logging.getLogger(__name__)
+
+
+def project_template_files(engine):
+    """Шаблоны проекта парами (каталог, путь к файлу): из DIRS и каталогов
+    templates наших приложений, без шаблонов Django и сторонних
+    пакетов."""
+    dirs = [*engine.engine.dirs, *get_app_template_dirs('templates')]
+    for directory in dirs:
+        directory = str(directory)
+        if not directory.startswith(settings.BASE_DIR):
+            continue
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if name.endswith(('.html', '.txt')):
+                    yield directory, os.path.join(root, name)
+
+
+def project_template_names(engine):
+    """Имена шаблонов проекта, как их передают get_template."""
+    return sorted({
+        os.path.relpath(path, directory).replace(os.sep, '/')
+        for directory, path in project_template_files(engine)
+    })
+
+
+_templates_mtime = None
+
+
+def templates_mtime():
+    """Время изменения самого нового шаблона проекта, в секундах.
+
+    В профиле cached процесс читает шаблоны один раз, и время считается
+    тоже один раз; в профиле debug — при каждом вызове.
+    """
+    global _templates_mtime
+    if _templates_mtime is None or settings.TEMPLATE_PROFILE != 'cached':
+        _templates_mtime = max(
+            (
+                os.path.getmtime(path)
+                for engine in engines.all()
+                if isinstance(engine, DjangoTemplates)
+                for _, path in project_template_files(engine)
+            ),
+            default=0,
+        )
+    return _templates_mtime
+
+
+def warm_templates():
+    """Компилирует шаблоны проекта в кэш загрузчика django.template.
+    loaders.cached, чтобы первые запросы процесса не разбирали их.
+    Возвращает число загруженных шаблонов."""
+    warmed = 0
+    for engine in engines.all():
+        if not isinstance(engine, DjangoTemplates):
+            continue
+        for name in project_template_names(engine):
+            try:
+                engine.get_template(name)
+            except TemplateSyntaxError:
+                logger.exception('Шаблон %s не компилируется', name)
+            else:
+                warmed += 1
+    return warmed
+
+
+def node_label(node):
+    """Как узел выглядит в шаблоне: {% url %} или {{ post.text }}."""
+    token = node.token
+    if token.token_type == TokenType.VAR:
+        return f'{{{{ {token.contents} }}}}'
+    return f'{{% {token.contents.split()[0]} %}}'
+
+
+class RenderProfile:
+    """Замеряет отрисовку шаблонов, пока активен (with RenderProfile()):
+    время каждого шаблона, в том числе подключённого {% include %}, и
+    каждого тега и переменной по месту в шаблоне.
+
+    Время включительное: в шаблон входят его include, в тег — всё, что
+    внутри него. Подменяет методы классов на время with, поэтому годится
+    для однопоточных замеров, а не для работающего сервера.
+    """
+
+    def __init__(self):
+        # [число отрисовок, суммарное время в секундах]
+        self.templates = defaultdict(lambda: [0, 0.0])
+        self.nodes = defaultdict(lambda: [0, 0.0])
+
+    def __enter__(self):
+        self._render = Template.render
+        self._render_annotated = Node.render_annotated
+        profile = self
+        render, render_annotated = self._render, self._render_annotated
+
+        def timed_render(template, context):
+            started = time.perf_counter()
+            try:
+                return render(template, context)
+            finally:
+                profile._record(
+                    profile.templates, template.origin.template_name,
+                    started,
+                )
+
+        def timed_render_annotated(node, context):
+            if (
+                isinstance(node, TextNode)
+                or getattr(node, 'token', None) is None
+            ):
+                return render_annotated(node, context)
+            started = time.perf_counter()
+            try:
+                return render_annotated(node, context)
+            finally:
+                key = (
+                    node.origin.template_name, node.token.lineno,
+                    node_label(node),
+                )
+                profile._record(profile.nodes, key, started)
+
+        Template.render = timed_render
+        Node.render_annotated = timed_render_annotated
+        return self
+
+    def __exit__(self, *exc_info):
+        Template.render = self._render
+        Node.render_annotated = self._render_annotated
+
+    @staticmethod
+    def _record(totals, key, started):
+        entry = totals[key]
+        entry[0] += 1
+        entry[1] += time.perf_counter() - started
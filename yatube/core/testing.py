@@ -0,0 +1,34 @@
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class CommitCallbacksMixin:
+    """TestCase.captureOnCommitCallbacks из Django 3.2 для Django 2.2.
+
+    TestCase не фиксирует транзакцию, поэтому функции
+    transaction.on_commit (сброс кэша лент и объектов) в тестах сами не
+    выполняются. with self.captureOnCommitCallbacks(execute=True)
+    выполняет отложенные внутри блока функции, как при фиксации.
+    """
+
+    @classmethod
+    @contextmanager
+    def captureOnCommitCallbacks(cls, *, using=DEFAULT_DB_ALIAS,
+                                 execute=False):
+        callbacks = []
+        start = len(connections[using].run_on_commit)
+        try:
+            yield callbacks
+        finally:
+            while True:
+                pending = connections[using].run_on_commit[start:]
+                if not pending:
+                    break
+                start += len(pending)
+                for _, callback in pending:
+                    callbacks.append(callback)
+                    if execute:
+                        callback()
+                if not execute:
+                    break
@@ -0,0 +1,116 @@
+import shutil
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.signals import request_finished
+from django.test import SimpleTestCase
+
+from core.cache_backends import TieredCache
+
+
+class TieredCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.cache = self.make_cache()
+
+    def make_cache(self, location='test-tiered', **options):
+        # LocMemCache с одним LOCATION общий на процесс: другой процесс
+        # изображает кэш с другим LOCATION, и видеть запись он может
+        # только через файлы общего уровня.
+        return TieredCache(location, {
+            'TIMEOUT': 60,
+            'OPTIONS': {
+                'LOCAL_MAX_ENTRIES': 10,
+                'LOCAL_TIMEOUT': 5,
+                'STATS_FLUSH_INTERVAL': 0,
+                'SHARED': {'LOCATION': self.cache_dir, 'MAX_ENTRIES': 100},
+                **options,
+            },
+        })
+
+    def test_shared_tier_is_seen_by_other_process(self):
+        """Запись одного процесса читается другим через общий уровень."""
+        self.cache.set('key', 'value')
+        other = self.make_cache('test-tiered-other')
+        self.assertIsNone(other.local.get('key'))
+        self.assertEqual(other.get('key'), 'value')
+        self.assertEqual(other.stats['shared']['hits'], 1)
+        self.assertEqual(other.local.get('key'), 'value')
+
+    def test_delete_reaches_both_tiers(self):
+        """Удаление убирает запись из памяти и из общего уровня."""
+        self.cache.set('key', 'value')
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+        self.assertIsNone(self.make_cache().get('key'))
+
+    def test_incr_keeps_value_without_expiry(self):
+        """incr в общем уровне не назначает ключу срок жизни."""
+        self.cache.set('version', 1, None)
+        self.assertEqual(self.cache.incr('version'), 2)
+        self.assertEqual(self.cache.shared.get('version'), 2)
+
+    def test_shared_tier_culls_every_n_sets(self):
+        """Каталог общего уровня перечисляется раз в CULL_EVERY записей."""
+        cache = self.make_cache(STATS_FLUSH_INTERVAL=60, SHARED={
+            'LOCATION': self.cache_dir, 'MAX_ENTRIES': 4, 'CULL_EVERY': 5,
+        })
+        with mock.patch.object(
+            cache.shared, '_list_cache_files',
+            wraps=cache.shared._list_cache_files,
+        ) as list_files:
+            for i in range(10):
+                cache.set(f'key{i}', i)
+        self.assertEqual(list_files.call_count, 2)
+        self.assertGreater(cache.shared.evictions, 0)
+
+    def test_concurrent_incr_loses_no_updates(self):
+        """incr из разных процессов не теряет увеличений."""
+        self.cache.set('version', 0, None)
+
+        def bump():
+            other = self.make_cache('test-tiered-other')
+            for _ in range(25):
+                other.incr('version')
+
+        threads = [threading.Thread(target=bump) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.cache.shared.get('version'), 100)
+
+    def test_get_does_not_flush_stats(self):
+        """Счётчики переносятся после ответа, а не внутри get()."""
+        self.cache.get('missing')
+        self.assertEqual(self.cache.stats['local']['misses'], 1)
+        request_finished.send(sender=None)
+        self.assertEqual(self.cache.stats['local']['misses'], 0)
+
+    def test_stats_are_shared(self):
+        """Счётчики обоих уровней и вытеснения копятся в общем уровне."""
+        for i in range(15):
+            self.cache.set(f'key{i}', i)
+        self.cache.get('key14')
+        self.cache.local.clear()
+        self.cache.get('key14')
+        self.cache.get('missing')
+        request_finished.send(sender=None)
+        stats = self.make_cache().get_stats()
+        self.assertEqual(stats['local']['hits'], 1)
+        self.assertEqual(stats['local']['misses'], 2)
+        self.assertEqual(stats['shared']['hits'], 1)
+        self.assertEqual(stats['shared']['misses'], 1)
+        self.assertGreater(stats['local']['evictions'], 0)
+        self.assertGreaterEqual(stats['shared']['entries'], 15)
+
+    def test_cache_stats_command(self):
+        """cache_stats выводит данные по каждому уровню."""
+        out = StringIO()
+        call_command('cache_stats', stdout=out)
+        self.assertIn('[local]', out.getvalue())
+        self.assertIn('hit ratio', out.getvalue())
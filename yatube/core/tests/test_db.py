@@ -0,0 +1,69 @@
+import os
+import runpy
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.db.utils import ConnectionHandler, OperationalError
+from django.test import SimpleTestCase
+
+
+class SqlitePragmasTests(SimpleTestCase):
+    def test_new_connection_gets_pragmas(self):
+        """Новое соединение с файлом SQLite получает WAL, NORMAL, mmap и
+        busy_timeout."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            settings_dict = dict(
+                connection.settings_dict,
+                NAME=os.path.join(tmp_dir, 'pragmas.sqlite3'),
+            )
+            wrapper = DatabaseWrapper(settings_dict, alias='pragmas')
+            wrapper.ensure_connection()
+            try:
+                pragmas = {
+                    name: wrapper.connection.execute(
+                        f'PRAGMA {name}').fetchone()[0]
+                    for name in ('journal_mode', 'synchronous',
+                                 'mmap_size', 'busy_timeout')
+                }
+            finally:
+                wrapper.close()
+        self.assertEqual(pragmas, {
+            'journal_mode': 'wal',
+            'synchronous': 1,
+            'mmap_size': 256 * 1024 * 1024,
+            'busy_timeout': 5000,
+        })
+
+
+class PostgresProfileTests(SimpleTestCase):
+    """Профиль postgresql против локального сервера из POSTGRES_*.
+    Без psycopg2 или без сервера тест пропускается."""
+
+    def setUp(self):
+        try:
+            import psycopg2  # noqa: F401
+        except ImportError:
+            self.skipTest('psycopg2 не установлен')
+        path = os.path.join(settings.BASE_DIR, 'yatube', 'settings.py')
+        with mock.patch.dict(os.environ, YATUBE_DB_PROFILE='postgresql'):
+            profile = runpy.run_path(path)
+        handler = ConnectionHandler({
+            'postgresql': profile['DATABASES']['default'],
+        })
+        self.wrapper = handler['postgresql']
+        self.addCleanup(self.wrapper.close)
+        try:
+            self.wrapper.ensure_connection()
+        except OperationalError as error:
+            self.skipTest(f'PostgreSQL недоступен: {error}')
+
+    def test_reads_timestamptz(self):
+        """Django читает timestamptz: psycopg2 2.9+ с Django 2.2 падает
+        на каждом таком значении."""
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('SELECT now()')
+            now = cursor.fetchone()[0]
+        self.assertIsNotNone(now.tzinfo)
@@ -0,0 +1,119 @@
+from datetime import timedelta
+
+from django.core import mail
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.mail import FLUSH_LOCK_KEY, flush_mail
+from core.models import Job, QueuedMail
+from core.smtp_sink import SMTPSink
+from core.tasks import run_jobs
+
+User = get_user_model()
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.QueuedEmailBackend',
+    MAIL_DELIVERY_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+    MAIL_RATE_LIMIT=1000,
+    TASKS_RETRY_DELAY=0,
+)
+class QueuedMailTests(TestCase):
+    def setUp(self):
+        self.sink = SMTPSink().__enter__()
+        self.addCleanup(self.sink.__exit__)
+        host, port = self.sink.server_address
+        smtp = override_settings(EMAIL_HOST=host, EMAIL_PORT=port)
+        smtp.enable()
+        self.addCleanup(smtp.disable)
+
+    def send(self, count):
+        for number in range(count):
+            mail.send_mail(
+                f'Письмо {number}', 'Текст', 'from@example.com',
+                [f'to{number}@example.com'],
+            )
+
+    def test_send_only_queues(self):
+        """Отправка только кладёт письмо в очередь и ставит одну задачу."""
+        self.send(3)
+        self.assertEqual(QueuedMail.objects.count(), 3)
+        self.assertEqual(Job.objects.count(), 1)
+        self.assertEqual(self.sink.messages, [])
+
+    def test_flush_uses_one_connection(self):
+        """Очередь уходит через одно SMTP-соединение."""
+        self.send(3)
+        run_jobs()
+        self.assertEqual(self.sink.sessions, 1)
+        self.assertEqual(
+            [rcpt for _, rcpt, _ in self.sink.messages],
+            [['to0@example.com'], ['to1@example.com'], ['to2@example.com']],
+        )
+        self.assertIn(b'Subject: =?utf-8?', self.sink.messages[0][2])
+        self.assertFalse(QueuedMail.objects.exists())
+
+    def test_new_mail_does_not_wait_for_backed_off_flush(self):
+        """Новое письмо не ждёт отложенного повтора flush_mail."""
+        flush_mail.enqueue(run_at=timezone.now() + timedelta(hours=1))
+        self.send(1)
+        self.assertEqual(Job.objects.count(), 2)
+        run_jobs()
+        self.assertEqual(len(self.sink.messages), 1)
+
+    def test_flush_is_single_flight(self):
+        """Пока идёт один flush_mail, второй ничего не отправляет."""
+        self.send(2)
+        cache.add(FLUSH_LOCK_KEY, True)
+        self.addCleanup(cache.delete, FLUSH_LOCK_KEY)
+        self.assertEqual(flush_mail(), 0)
+        self.assertEqual(QueuedMail.objects.count(), 2)
+        cache.delete(FLUSH_LOCK_KEY)
+        self.assertEqual(flush_mail(), 2)
+
+    @override_settings(MAIL_BATCH_SIZE=2, MAIL_FLUSH_TIME_LIMIT=0)
+    def test_flush_is_time_bounded(self):
+        """Исчерпав время, flush_mail ставит продолжение, а не шлёт
+        всю очередь сам."""
+        self.send(5)
+        Job.objects.all().delete()
+        self.assertEqual(flush_mail(), 2)
+        self.assertEqual(QueuedMail.objects.count(), 3)
+        self.assertEqual(Job.objects.count(), 1)
+        run_jobs()
+        self.assertEqual(len(self.sink.messages), 5)
+        self.assertEqual(self.sink.sessions, 3)
+
+    def test_rejected_mail_is_retried(self):
+        """Отклонённое сервером письмо отправляется повторно."""
+        self.sink.reject_next = 1
+        self.send(2)
+        run_jobs()
+        self.assertEqual(len(self.sink.messages), 2)
+        self.assertFalse(QueuedMail.objects.exists())
+
+    @override_settings(MAIL_MAX_ATTEMPTS=1)
+    def test_failed_after_max_attempts(self):
+        """Исчерпав попытки, письмо остаётся со статусом failed."""
+        self.sink.reject_next = 1
+        self.send(1)
+        run_jobs()
+        self.assertEqual(
+            QueuedMail.objects.get().status, QueuedMail.FAILED
+        )
+
+    def test_password_reset_queues_mail(self):
+        """Сброс пароля не ждёт отправки письма."""
+        User.objects.create_user(
+            username='user', email='user@example.com', password='pass-1234'
+        )
+        response = self.client.post(
+            reverse('users:password_reset'), {'email': 'user@example.com'}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.sink.messages, [])
+        self.assertEqual(QueuedMail.objects.get().recipients,
+                         'user@example.com')
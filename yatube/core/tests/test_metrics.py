@@ -0,0 +1,77 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from core.metrics import RollingHistogram, registry
+from posts.models import Post
+
+User = get_user_model()
+
+
+class MetricsMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.create(text='Тестовый пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+
+    def test_server_timing_header(self):
+        """Ответ несёт время всего запроса, базы, шаблонов и кэш."""
+        response = self.client.get(reverse('posts:index'))
+        timing = dict(
+            re.match(r'\s*(\w+);(.*)', part).groups()
+            for part in response['Server-Timing'].split(',')
+        )
+        self.assertEqual(set(timing), {'total', 'db', 'tpl', 'cache'})
+        self.assertRegex(timing['db'], r'desc="[1-9]\d* queries"')
+        template_ms = float(re.search(r'dur=([\d.]+)', timing['tpl'])[1])
+        total_ms = float(re.search(r'dur=([\d.]+)', timing['total'])[1])
+        self.assertGreater(template_ms, 0)
+        self.assertLessEqual(template_ms, total_ms)
+        self.assertRegex(timing['cache'], r'desc="\d+ hits [1-9]\d* misses"')
+
+    def test_metrics_are_staff_only(self):
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(self.author)
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+    def test_metrics_histograms_by_view(self):
+        """/metrics отдаёт гистограммы по имени вью в формате Prometheus."""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('# TYPE yatube_request_seconds histogram', body)
+        self.assertIn(
+            'yatube_request_seconds_count{view="posts:index"} 2', body
+        )
+        self.assertIn(
+            'yatube_queries_bucket{view="posts:index",le="+Inf"} 2', body
+        )
+        self.assertRegex(
+            body,
+            r'yatube_cache_lookups\{view="posts:index",result="misses"\} '
+            r'[1-9]',
+        )
+
+
+class RollingHistogramTests(SimpleTestCase):
+    def test_old_observations_leave_window(self):
+        histogram = RollingHistogram((1, 5), window=60, slices=3)
+        histogram.observe(0.5, now=0)
+        histogram.observe(3, now=30)
+        histogram.observe(10, now=50)
+        self.assertEqual(histogram.snapshot(now=50), ([1, 2, 3], 13.5))
+        # Отрезок [0, 20) выпал из окна, [20, 40) ещё в нём.
+        self.assertEqual(histogram.snapshot(now=65), ([0, 1, 2], 13))
+        self.assertEqual(histogram.snapshot(now=200), ([0, 0, 0], 0))
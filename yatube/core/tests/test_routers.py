@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+
+from core import routers
+from core.middleware import ReplicaPinningMiddleware
+from posts.models import Post, PostTombstone
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        routers.reset()
+        self.addCleanup(routers.reset)
+        self.router = routers.PrimaryReplicaRouter()
+
+    def test_posts_read_from_replica(self):
+        """Посты читаются с реплики, пользователи — с основной базы."""
+        self.assertEqual(self.router.db_for_read(Post), 'replica1')
+        self.assertEqual(self.router.db_for_read(User), 'default')
+
+    def test_write_pins_reads_to_primary(self):
+        """После записи поток читает основную базу."""
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_middleware_sets_and_honours_pin_cookie(self):
+        """После записи клиент получает cookie, и с ней его следующие
+        запросы читают основную базу."""
+        seen = []
+
+        def write_view(request):
+            self.router.db_for_write(Post)
+            return HttpResponse()
+
+        def read_view(request):
+            seen.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        factory = RequestFactory()
+        response = ReplicaPinningMiddleware(write_view)(factory.get('/'))
+        cookie = response.cookies['primary_pin']
+        self.assertTrue(cookie['max-age'])
+
+        ReplicaPinningMiddleware(read_view)(factory.get('/'))
+        request = factory.get('/')
+        request.COOKIES['primary_pin'] = cookie.value
+        ReplicaPinningMiddleware(read_view)(request)
+        self.assertEqual(seen, ['replica1', 'default'])
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class BulkWriteRoutingTests(TestCase):
+    """Псевдоним replica1 в тестах не настроен: чтение с реплики упало
+    бы с ConnectionDoesNotExist."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        routers.reset()
+        self.addCleanup(routers.reset)
+
+    def test_bulk_writes_read_rows_from_primary(self):
+        """update() и delete() читают затронутые строки с основной
+        базы."""
+        posts = Post.objects.filter(pk=self.post.pk)
+        self.assertEqual(posts.update(text='Правка'), 1)
+        routers.reset()
+        posts = Post.objects.filter(pk=self.post.pk)
+        posts.delete()
+        self.assertTrue(
+            PostTombstone.objects.filter(post_id=self.post.pk).exists()
+        )
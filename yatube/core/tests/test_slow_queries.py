@@ -0,0 +1,117 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core.slow_queries import _own_code, logger, normalize_sql
+from posts.models import Post
+
+User = get_user_model()
+
+
+class NormalizeSqlTests(SimpleTestCase):
+    def test_values_are_replaced(self):
+        self.assertEqual(
+            normalize_sql(
+                "SELECT *  FROM t WHERE a = 'x''y' AND b = 10\n"
+                'AND c IN (%s, %s, %s) LIMIT 21'
+            ),
+            'SELECT * FROM t WHERE a = ? AND b = ? AND c IN (...) LIMIT ?',
+        )
+        self.assertEqual(
+            normalize_sql('SELECT * FROM t WHERE c IN (%s, %s)'),
+            normalize_sql('SELECT * FROM t WHERE c IN (%s, %s, %s, %s)'),
+        )
+
+
+class OwnCodeTests(SimpleTestCase):
+    @override_settings(BASE_DIR='/usr/lib/yatube')
+    def test_project_under_lib_is_own_code(self):
+        """Проект в /usr/lib — свой код."""
+        self.assertTrue(_own_code('/usr/lib/yatube/posts/views.py'))
+
+    def test_libraries_inside_base_dir_are_not_own_code(self):
+        """Django и stdlib не свой код, даже если лежат внутри BASE_DIR."""
+        for module in (django, os):
+            base_dir = os.path.dirname(os.path.dirname(module.__file__))
+            with self.subTest(module=module.__name__):
+                with override_settings(BASE_DIR=base_dir):
+                    self.assertFalse(_own_code(module.__file__))
+
+
+class SlowQueryLogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='author')
+        Post.objects.create(text='Тестовый пост', author=author)
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(SLOW_QUERY_MS=0)
+    def test_queries_are_attributed(self):
+        """Запись указывает на наш код и на строку шаблона."""
+        with self.assertLogs('yatube.slow_queries', 'WARNING') as logs:
+            self.client.get(reverse('posts:index'))
+        entries = [json.loads(record.getMessage()) for record in logs.records]
+        self.assertTrue(all(
+            {'sql', 'params', 'duration_ms', 'frame', 'stack'} <= set(entry)
+            for entry in entries
+        ))
+        frames = {entry['frame'] for entry in entries}
+        self.assertTrue(any(
+            frame and frame.startswith(os.path.join('posts', ''))
+            for frame in frames
+        ), frames)
+        templates = {entry['template'] for entry in entries} - {None}
+        self.assertTrue(any(
+            template.startswith('posts/') for template in templates
+        ), templates)
+
+    @override_settings(SLOW_QUERY_MS=0, SLOW_QUERY_SAMPLE_RATE=0)
+    def test_sampling(self):
+        with mock.patch.object(logger, 'warning') as warning:
+            Post.objects.count()
+        warning.assert_not_called()
+
+    @override_settings(SLOW_QUERY_MS=None)
+    def test_disabled(self):
+        with mock.patch.object(logger, 'warning') as warning:
+            Post.objects.count()
+        warning.assert_not_called()
+
+
+class SlowQueriesReportTests(SimpleTestCase):
+    def test_groups_by_sql_shape(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'slow.log')
+        entries = [
+            ('SELECT * FROM posts_post WHERE id = 1', 120, 'a.py:1 in f'),
+            ('SELECT * FROM posts_post WHERE id = 2', 300, 'a.py:1 in f'),
+            ('SELECT COUNT(*) FROM posts_post', 150, 'b.py:2 in g'),
+        ]
+        # Старшая запись — в ротированной копии.
+        for name, chunk in ((path + '.1', entries[:1]), (path, entries[1:])):
+            with open(name, 'w', encoding='utf-8') as log:
+                for sql, duration, frame in chunk:
+                    log.write(json.dumps({
+                        'sql': sql, 'duration_ms': duration,
+                        'frame': frame, 'template': None,
+                    }) + '\n')
+        out = StringIO()
+        call_command('slow_queries', '--log', path, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertIn('2 запросов, всего 420 мс', lines[0])
+        self.assertEqual(lines[1].strip(),
+                         'SELECT * FROM posts_post WHERE id = ?')
+        self.assertEqual(lines[2].strip(), 'a.py:1 in f (2)')
+        self.assertIn('1 запросов', lines[3])
@@ -0,0 +1,69 @@
+from django.core import mail
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from core.models import Job
+from core.tasks import claim, run_jobs, task
+from posts.models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+calls = []
+
+
+@task(max_attempts=2)
+def flaky(value):
+    calls.append(value)
+    if len(calls) == 1:
+        raise RuntimeError('первая попытка')
+
+
+@override_settings(TASKS_RETRY_DELAY=0)
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_retry_then_success(self):
+        """Упавшая задача повторяется и после успеха удаляется."""
+        flaky.enqueue('x')
+        run_jobs()
+        self.assertEqual(calls, ['x', 'x'])
+        self.assertFalse(Job.objects.exists())
+
+    def test_failed_after_max_attempts(self):
+        """Исчерпав попытки, задача остаётся со статусом failed."""
+        Job.objects.create(task='core.tests.missing', payload='{}',
+                           max_attempts=1)
+        run_jobs()
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn('UnknownTask', job.last_error)
+
+    def test_claim_is_exclusive(self):
+        """Одну задачу может взять только один исполнитель."""
+        flaky.enqueue('x')
+        self.assertIsNotNone(claim('first'))
+        self.assertIsNone(claim('second'))
+
+
+class PostTasksTests(TestCase):
+    @override_settings(SITE_URL='https://yatube.example')
+    def test_post_side_effects_are_queued(self):
+        """Раскладка по лентам и письма подписчикам идут через очередь."""
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(
+            username='reader', email='reader@example.com'
+        )
+        Follow.objects.create(user=reader, author=author)
+        run_jobs()
+        post = Post.objects.create(text='Новость', author=author)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(mail.outbox, [])
+        run_jobs()
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=reader, post=post).exists()
+        )
+        self.assertEqual(mail.outbox[0].to, ['reader@example.com'])
+        self.assertIn(
+            f'https://yatube.example/posts/{post.pk}/', mail.outbox[0].body
+        )
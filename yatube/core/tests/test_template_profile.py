@@ -0,0 +1,72 @@
+import os
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.template import engines
+from django.template.base import Node, Template
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.template_profile import (RenderProfile, templates_mtime,
+                                   warm_templates)
+from posts.models import Group, Post
+
+User = get_user_model()
+
+CACHED_TEMPLATES = [{
+    **settings.TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **settings.TEMPLATES[0]['OPTIONS'],
+        'loaders': [(
+            'django.template.loaders.cached.Loader',
+            [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ],
+        )],
+    },
+}]
+
+
+class TemplateProfileTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='author')
+        group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.create(text='Тестовый пост', author=author, group=group)
+
+    def test_templates_mtime_is_newest_template(self):
+        base = os.path.join(settings.TEMPLATES_DIR, 'base.html')
+        self.assertGreaterEqual(templates_mtime(), os.path.getmtime(base))
+
+    @override_settings(TEMPLATES=CACHED_TEMPLATES)
+    def test_warm_templates_fills_cached_loader(self):
+        self.assertGreater(warm_templates(), 0)
+        loader = engines['django'].engine.template_loaders[0]
+        for name in ('base.html', 'includes/header.html',
+                     'posts/includes/paginator.html', 'users/login.html'):
+            self.assertIn(name, loader.get_template_cache)
+        self.assertNotIn('admin/base.html', loader.get_template_cache)
+
+    def test_render_profile(self):
+        """Профиль видит шаблоны с include и теги по строкам; после
+        выхода методы возвращены."""
+        render, render_annotated = Template.render, Node.render_annotated
+        with RenderProfile() as profile:
+            self.client.get(reverse('posts:index'))
+        self.assertIs(Template.render, render)
+        self.assertIs(Node.render_annotated, render_annotated)
+        self.assertEqual(profile.templates['posts/index.html'][0], 1)
+        self.assertEqual(profile.templates['includes/header.html'][0], 1)
+        labels = {label for _, _, label in profile.nodes}
+        self.assertIn('{% include %}', labels)
+        self.assertIn('{% url %}', labels)
+
+    def test_profile_templates_command(self):
+        out = StringIO()
+        call_command('profile_templates', '--repeat', '1', stdout=out)
+        self.assertIn('posts/group_list.html', out.getvalue())
+        self.assertIn('{% for %}', out.getvalue())
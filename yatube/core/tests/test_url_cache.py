@@ -0,0 +1,39 @@
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse, set_script_prefix
+
+from core.url_cache import _reverse, cached_reverse
+
+
+class CachedReverseTests(SimpleTestCase):
+    def setUp(self):
+        _reverse.cache_clear()
+        self.addCleanup(set_script_prefix, '/')
+
+    def test_same_as_reverse(self):
+        self.assertEqual(
+            cached_reverse('posts:profile', 'leo'),
+            reverse('posts:profile', args=['leo']),
+        )
+        self.assertEqual(
+            cached_reverse('posts:posts_list', slug='cats'),
+            reverse('posts:posts_list', kwargs={'slug': 'cats'}),
+        )
+
+    def test_repeated_reverse_is_cached(self):
+        for _ in range(3):
+            cached_reverse('posts:post_detail', 1)
+        info = _reverse.cache_info()
+        self.assertEqual((info.misses, info.hits), (1, 2))
+
+    def test_script_prefix_is_part_of_key(self):
+        cached_reverse('posts:post_detail', 1)
+        set_script_prefix('/yatube/')
+        self.assertEqual(
+            cached_reverse('posts:post_detail', 1), '/yatube/posts/1/'
+        )
+
+    def test_urlconf_change_clears_cache(self):
+        """Смена ROOT_URLCONF очищает кэш адресов."""
+        cached_reverse('posts:post_detail', 1)
+        with override_settings(ROOT_URLCONF='yatube.urls'):
+            self.assertEqual(_reverse.cache_info().currsize, 0)
@@ -0,0 +1,35 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.urls import get_script_prefix, get_urlconf, reverse
+
+# Адреса лент, профилей и постов; LRU не даёт кэшу расти с числом постов.
+MAX_CACHED_URLS = 20000
+
+
+@lru_cache(maxsize=MAX_CACHED_URLS)
+def _reverse(viewname, args, kwargs, urlconf, prefix):
+    return reverse(viewname, urlconf=urlconf, args=args, kwargs=dict(kwargs))
+
+
+def cached_reverse(viewname, *args, **kwargs):
+    """reverse() с памятью: адрес с теми же именем, аргументами, URLconf
+    и префиксом скрипта строится резолвером один раз на процесс.
+    Аргументы должны быть хешируемыми."""
+    return _reverse(
+        viewname,
+        args,
+        tuple(sorted(kwargs.items())),
+        get_urlconf() or settings.ROOT_URLCONF,
+        get_script_prefix(),
+    )
+
+
+@receiver(setting_changed)
+def clear_on_urlconf_change(setting, **kwargs):
+    # Как clear_url_caches() у Django: при смене ROOT_URLCONF в тестах
+    # адреса старой схемы не должны попадаться из памяти.
+    if setting == 'ROOT_URLCONF':
+        _reverse.cache_clear()
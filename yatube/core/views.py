@@ -0,0 +1,13 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse
+
+from .metrics import registry
+
+
+@staff_member_required
+def metrics(request):
+    """Гистограммы запросов этого процесса в текстовом формате
+    Prometheus."""
+    return HttpResponse(
+        registry.render(), content_type='text/plain; version=0.0.4'
+    )
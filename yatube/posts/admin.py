@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import Group, Post
+from .search import matching_post_ids, query_terms
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -8,6 +9,7 @@ class PostAdmin(admin.ModelAdmin):
         'pk',
         'text',
         'pub_date',
+        'modified',
         'author',
         'group',
     )
@@ -16,6 +18,14 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Вместо LIKE '%...%' по всей таблице ищем по инвертированному
+        # индексу posts.search.
+        found = query_terms(search_term)
+        if not found:
+            return queryset, False
+        return queryset.filter(pk__in=matching_post_ids(found)), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = (
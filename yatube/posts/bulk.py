@@ -0,0 +1,33 @@
+from contextlib import contextmanager
+
+from .counters import recount_posts_counts
+from .feeds import ALL_FEEDS, bump_versions
+from .models import Post
+from .search import reindex_posts
+
+
+@contextmanager
+def explicit_pub_date():
+    """Отключает auto_now_add у Post.pub_date, чтобы bulk_create сохранил
+    заданные даты. Меняет поле модели для всего процесса, поэтому годится
+    только для отдельного процесса manage.py."""
+    field = Post._meta.get_field('pub_date')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def finish_bulk_load(author_ids, after_pk, batch_size, search_index=True):
+    """Пересчитывает после загрузки с bulk_signals_suspended то, что при
+    построчной записи обновили бы сигналы: счётчики авторов, поисковый
+    индекс постов с id больше after_pk и версии лент."""
+    author_ids = sorted(author_ids)
+    for start in range(0, len(author_ids), batch_size):
+        recount_posts_counts(author_ids[start:start + batch_size])
+    if search_index:
+        sum(reindex_posts(
+            after_pk=after_pk, batch_size=batch_size, created=True
+        ))
+    bump_versions([ALL_FEEDS])
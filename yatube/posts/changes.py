@@ -0,0 +1,48 @@
+from collections import namedtuple
+
+from .models import Post, PostTombstone
+
+Changes = namedtuple('Changes', 'updated deleted last_seq')
+
+
+def _rows_after(after_seq, limit):
+    """Первые limit изменений с номером больше after_seq: посты в
+    текущем виде и следы удалённых, по возрастанию номера."""
+    posts = Post.objects.filter(
+        change_seq__gt=after_seq
+    ).select_related('author', 'group').order_by('change_seq', 'pk')
+    tombstones = PostTombstone.objects.filter(
+        change_seq__gt=after_seq
+    ).order_by('change_seq', 'pk')
+    rows = list(posts[:limit]) + list(tombstones[:limit])
+    rows.sort(key=lambda row: row.change_seq)
+    return rows[:limit]
+
+
+def changes_since(after_seq=0, limit=1000):
+    """Изменения постов после номера after_seq.
+
+    Отдаёт Changes: updated — созданные и изменённые посты в текущем виде,
+    deleted — id удалённых, last_seq — номер, с которым спрашивать
+    дальше. Пост, изменённый несколько раз, приходит один раз.
+
+    Один QuerySet.update() даёт всем строкам один номер, поэтому пачка
+    дополняется до конца последнего номера и может быть больше limit.
+    Пустая пачка значит, что изменений после after_seq пока нет.
+    """
+    rows = _rows_after(after_seq, limit)
+    if len(rows) == limit:
+        last_seq = rows[-1].change_seq
+        seen = {(type(row), row.pk) for row in rows}
+        rows += [
+            row for row in (
+                *Post.objects.filter(change_seq=last_seq)
+                .select_related('author', 'group'),
+                *PostTombstone.objects.filter(change_seq=last_seq),
+            )
+            if (type(row), row.pk) not in seen
+        ]
+    updated = [row for row in rows if isinstance(row, Post)]
+    deleted = [row.post_id for row in rows if isinstance(row, PostTombstone)]
+    last_seq = rows[-1].change_seq if rows else after_seq
+    return Changes(updated, deleted, last_seq)
@@ -0,0 +1,94 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import AuthorStats, Follow, Group, Post
+
+
+def _author_stats_defaults(author_id):
+    return {
+        'posts_count': Post.objects.filter(author_id=author_id).count(),
+        'followers_count': Follow.objects.filter(author_id=author_id).count(),
+    }
+
+
+def _adjust_author_stat(author_id, field, delta):
+    """Сдвигает счётчик автора на delta.
+
+    Строка, которой ещё нет, создаётся только при росте: при удалении
+    автора каскадом его строка AuthorStats уже удаляется вместе с ним.
+    """
+    updated = AuthorStats.objects.filter(author_id=author_id).update(
+        **{field: F(field) + delta}
+    )
+    if not updated and delta > 0:
+        AuthorStats.objects.get_or_create(
+            author_id=author_id,
+            defaults=_author_stats_defaults(author_id),
+        )
+
+
+def adjust_posts_count(author_id, delta):
+    """Сдвигает сохранённое число постов автора на delta."""
+    _adjust_author_stat(author_id, 'posts_count', delta)
+
+
+def adjust_followers_count(author_id, delta):
+    """Сдвигает сохранённое число подписчиков автора на delta."""
+    _adjust_author_stat(author_id, 'followers_count', delta)
+
+
+def adjust_members_count(group_id, delta):
+    Group.objects.filter(pk=group_id).update(
+        members_count=F('members_count') + delta
+    )
+
+
+def adjust_posts_counts(author_ids, sign=1):
+    """Применяет сдвиги счётчиков по списку author_id одним запросом
+    на автора, а не на пост."""
+    for author_id, delta in Counter(author_ids).items():
+        adjust_posts_count(author_id, sign * delta)
+
+
+def get_posts_count(author):
+    """Число постов автора без COUNT(*) по таблице постов."""
+    try:
+        return author.post_stats.posts_count
+    except AuthorStats.DoesNotExist:
+        stats, _ = AuthorStats.objects.get_or_create(
+            author=author,
+            defaults=_author_stats_defaults(author.pk),
+        )
+        return stats.posts_count
+
+
+def recount_posts_counts(author_ids):
+    """Пересчитывает счётчики авторов и возвращает число исправленных."""
+    actual = dict(
+        Post.objects.filter(author_id__in=author_ids)
+        .order_by()
+        .values_list('author_id')
+        .annotate(posts_count=Count('pk'))
+    )
+    with transaction.atomic():
+        stored = {
+            stats.author_id: stats
+            for stats in AuthorStats.objects.select_for_update().filter(
+                author_id__in=author_ids)
+        }
+        missing = [
+            AuthorStats(author_id=author_id,
+                        posts_count=actual.get(author_id, 0))
+            for author_id in author_ids
+            if author_id not in stored
+        ]
+        changed = []
+        for author_id, stats in stored.items():
+            if stats.posts_count != actual.get(author_id, 0):
+                stats.posts_count = actual.get(author_id, 0)
+                changed.append(stats)
+        AuthorStats.objects.bulk_create(missing)
+        AuthorStats.objects.bulk_update(changed, ['posts_count'])
+    return len(missing) + len(changed)
@@ -0,0 +1,68 @@
+import csv
+import json
+
+from django.conf import settings
+
+from .paginators import CursorPaginator
+
+# Имена полей выгрузки совпадают с теми, что читает import_posts.
+COLUMNS = {
+    'id': 'id',
+    'text': 'text',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'pub_date': 'pub_date',
+}
+FIELDS = tuple(COLUMNS)
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def iter_posts(queryset, chunk_size=None):
+    """Посты ленты от новых к старым словарями FIELDS.
+
+    Читает пачками по chunk_size через ключ (pub_date, id), как курсорная
+    пагинация: каждая пачка — отдельный запрос по индексу ленты, и в
+    памяти не больше одной пачки при любом числе постов.
+    """
+    paginator = CursorPaginator(
+        queryset, chunk_size or settings.EXPORT_CHUNK_SIZE
+    )
+    position = (None, None)
+    while True:
+        chunk = list(
+            paginator.queryset_after(*position)
+            .values_list(*COLUMNS.values())[:paginator.per_page]
+        )
+        if not chunk:
+            return
+        for row in chunk:
+            post = dict(zip(FIELDS, row))
+            position = (post['pub_date'], post['id'])
+            post['pub_date'] = post['pub_date'].isoformat()
+            yield post
+
+
+class _Echo:
+    """Файл для csv.writer, который возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def jsonl_lines(posts):
+    for post in posts:
+        yield json.dumps(post, ensure_ascii=False) + '\n'
+
+
+def csv_lines(posts):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(FIELDS)
+    for post in posts:
+        yield writer.writerow([post[field] or '' for field in FIELDS])
+
+
+def export_lines(posts, fmt):
+    return csv_lines(posts) if fmt == 'csv' else jsonl_lines(posts)
@@ -0,0 +1,189 @@
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Post
+
+# Шаблоны лент обращаются к post.author и post.group в каждой строке,
+# поэтому автор и группа загружаются тем же запросом, что и посты.
+FEED_RELATED = ('author', 'group')
+
+INDEX_FEED = 'index'
+# Версия, общая для всех лент: её поднимают изменения, которые задевают
+# отрисовку постов во многих лентах сразу (имя автора, слаг группы).
+ALL_FEEDS = '*'
+
+
+def index_feed():
+    """Общая лента: все посты сайта."""
+    return Post.objects.select_related(*FEED_RELATED)
+
+
+def group_feed(group):
+    """Лента постов сообщества."""
+    return group.posts.select_related(*FEED_RELATED)
+
+
+def author_feed(author):
+    """Лента постов автора."""
+    return author.posts.select_related(*FEED_RELATED)
+
+
+def group_feed_key(group_id):
+    return f'group:{group_id}'
+
+
+def author_feed_key(author_id):
+    return f'author:{author_id}'
+
+
+def viewer_key(user_id):
+    """Ключ версии того, что страницы показывают конкретному
+    пользователю: подписки и членство в группах."""
+    return f'viewer:{user_id}'
+
+
+def feed_posts(feed_key):
+    """Посты ленты по её ключу, без загрузки автора и группы: для
+    подсчёта вне запроса страницы."""
+    if feed_key == INDEX_FEED:
+        return Post.objects.all()
+    kind, pk = feed_key.split(':')
+    return Post.objects.filter(**{f'{kind}_id': int(pk)})
+
+
+def feed_keys(author_id, group_id):
+    """Ключи всех лент, в которые попадает пост с такими автором и
+    группой."""
+    keys = [INDEX_FEED, author_feed_key(author_id)]
+    if group_id is not None:
+        keys.append(group_feed_key(group_id))
+    return keys
+
+
+def _count_cache_key(feed_key):
+    return f'posts:count:{get_feed_version(ALL_FEEDS)}:{feed_key}'
+
+
+def get_cached_count(feed_key):
+    return cache.get(_count_cache_key(feed_key))
+
+
+def set_cached_count(feed_key, count):
+    cache.set(
+        _count_cache_key(feed_key), count, settings.COUNT_CACHE_TIMEOUT
+    )
+
+
+def refresh_cached_count(feed_key, count):
+    """Сохраняет число постов, посчитанное вне запроса страницы (задача
+    count_feed). Страницы ленты уже отданы с оценкой, поэтому время
+    подсчёта входит в их ETag и Last-Modified."""
+    set_cached_count(feed_key, count)
+    cache.set(_counted_cache_key(feed_key), time.time(), None)
+
+
+def claim_count_refresh(feed_key):
+    """True, если точный подсчёт ленты ещё не поставлен в очередь: не
+    даёт каждому запросу к длинной ленте ставить ещё одну задачу."""
+    return cache.add(
+        f'posts:counting:{feed_key}', True, settings.TASKS_LOCK_TIMEOUT
+    )
+
+
+def invalidate_counts(feed_keys):
+    cache.delete_many([_count_cache_key(key) for key in set(feed_keys)])
+
+
+def _version_cache_key(feed_key):
+    return f'posts:version:{feed_key}'
+
+
+def _new_version():
+    # Начальная версия берётся из часов, а не с единицы: после вытеснения
+    # ключа из кэша старые фрагменты не должны снова стать актуальными.
+    return int(time.time() * 1000)
+
+
+def _changed_cache_key(feed_key):
+    return f'posts:changed:{feed_key}'
+
+
+def _counted_cache_key(feed_key):
+    return f'posts:counted:{feed_key}'
+
+
+def _get_or_add(defaults):
+    """Значения ключей словаря defaults одним get_many; отсутствующие
+    получают значение от его фабрики и сохраняются бессрочно."""
+    values = cache.get_many(list(defaults))
+    for key, default in defaults.items():
+        if key not in values:
+            values[key] = default()
+            cache.add(key, values[key], None)
+    return values
+
+
+def get_feed_version(feed_key):
+    """Версия ленты для ключей кэша отрисованных страниц."""
+    keys = [_version_cache_key(ALL_FEEDS), _version_cache_key(feed_key)]
+    versions = _get_or_add(dict.fromkeys(keys, _new_version))
+    return '.'.join(str(versions[key]) for key in keys)
+
+
+def feed_state(feed_keys):
+    """Версия и время последнего изменения лент feed_keys вместе с общей
+    одним обращением к кэшу: из них складываются ETag и Last-Modified.
+    Пересчёт числа постов задачей count_feed тоже считается изменением.
+
+    Если время изменения вытеснено из кэша, лента считается изменённой
+    сейчас: лишний полный ответ лучше, чем 304 на устаревшую страницу.
+    """
+    feed_keys = [ALL_FEEDS, *feed_keys]
+    version_keys = [_version_cache_key(key) for key in feed_keys]
+    changed_keys = [_changed_cache_key(key) for key in feed_keys]
+    counted_keys = [_counted_cache_key(key) for key in feed_keys]
+    values = _get_or_add({
+        **dict.fromkeys(version_keys, _new_version),
+        **dict.fromkeys(changed_keys, time.time),
+        # Ленту, которую count_feed ещё не пересчитывал, нечем менять.
+        **dict.fromkeys(counted_keys, int),
+    })
+    version = '.'.join(
+        str(values[key]) for key in [*version_keys, *counted_keys]
+    )
+    changed = max(values[key] for key in [*changed_keys, *counted_keys])
+    return version, datetime.fromtimestamp(changed, timezone.utc)
+
+
+def bump_versions(feed_keys):
+    """Делает устаревшими отрисованные страницы перечисленных лент."""
+    feed_keys = set(feed_keys)
+    for feed_key in feed_keys:
+        key = _version_cache_key(feed_key)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_version(), None)
+    now = time.time()
+    cache.set_many(
+        {_changed_cache_key(feed_key): now for feed_key in feed_keys}, None
+    )
+
+
+def replicas_synced():
+    """Реплики догнали основную базу: кэш, заполненный с отстающей
+    реплики уже после сброса, больше не используется."""
+    bump_versions([ALL_FEEDS])
+
+
+def feed_cache_context(feed_key, page_obj):
+    """Переменные шаблона для {% cache %} вокруг цикла по постам."""
+    return {
+        'feed_cache_key': (
+            f'{feed_key}:{get_feed_version(feed_key)}:{page_obj.cache_key}'
+        ),
+        'feed_cache_timeout': settings.FEED_CACHE_TIMEOUT,
+    }
@@ -0,0 +1,313 @@
+import copy
+import io
+import json
+import math
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+import uuid
+from contextlib import ExitStack
+
+import django
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import (CaptureQueriesContext, setup_databases,
+                               setup_test_environment, teardown_databases,
+                               teardown_test_environment)
+from django.urls import reverse
+
+from posts.models import AuthorStats, Group, Post
+
+# Метрики, рост которых больше порога считается регрессией.
+COMPARED_METRICS = ('p50_ms', 'p95_ms', 'queries', 'peak_kb')
+
+
+def percentile(values, fraction):
+    """Перцентиль по ближайшему рангу: значение, не меньше которого
+    fraction всех измерений."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[rank - 1]
+
+
+def private_caches(directory):
+    """CACHES со своими областями памяти, KEY_PREFIX и каталогом общего
+    уровня в directory: прогон не видит и не очищает кэш работающего
+    сайта. clear() очищает всю область или каталог целиком, поэтому
+    одного префикса мало."""
+    private = copy.deepcopy(settings.CACHES)
+    prefix = f'benchmark-{uuid.uuid4().hex}'
+    for alias, config in private.items():
+        config['LOCATION'] = f'{prefix}-{alias}'
+        config['KEY_PREFIX'] = prefix
+        shared = config.get('OPTIONS', {}).get('SHARED')
+        if shared:
+            shared['LOCATION'] = os.path.join(directory, alias)
+    return private
+
+
+def scenarios():
+    """Запросы к каждой странице posts, users и about на данных самого
+    активного автора и самой большой группы: (имя, метод, адрес, данные,
+    нужен ли вход)."""
+    author = AuthorStats.objects.order_by('-posts_count').first().author
+    group = (
+        Group.objects.annotate(size=Count('posts'))
+        .order_by('-size').first()
+    )
+    post = Post.objects.filter(author=author).order_by('-pub_date').first()
+    index = reverse('posts:index')
+    create = reverse('posts:create_post')
+    edit = reverse('posts:edit', args=[post.pk])
+    new_post = {'text': 'Пост из бенчмарка', 'group': group.pk}
+    return author, [
+        ('index', 'get', index, None, False),
+        ('index_page_50', 'get', f'{index}?page=50', None, False),
+        ('posts_list', 'get',
+         reverse('posts:posts_list', args=[group.slug]), None, False),
+        ('profile', 'get',
+         reverse('posts:profile', args=[author.username]), None, False),
+        ('post_detail', 'get',
+         reverse('posts:post_detail', args=[post.pk]), None, False),
+        ('search', 'get', f'{reverse("posts:search")}?q=пост', None, False),
+        ('follow_index', 'get', reverse('posts:follow_index'), None, True),
+        ('create_post', 'get', create, None, True),
+        ('create_post_submit', 'post', create, new_post, True),
+        ('edit', 'get', edit, None, True),
+        ('edit_submit', 'post', edit, {'text': post.text}, True),
+        ('login', 'get', reverse('users:login'), None, False),
+        ('signup', 'get', reverse('users:signup'), None, False),
+        ('about_author', 'get', reverse('about:author'), None, False),
+        ('about_tech', 'get', reverse('about:tech'), None, False),
+    ]
+
+
+def measure(client, method, url, data, repeat, warmup):
+    """Время ответа, число запросов к базе и пик памяти Python.
+
+    Пик памяти меряется отдельным прогоном: tracemalloc заметно
+    замедляет код и исказил бы задержки.
+    """
+    send = getattr(client, method)
+    for _ in range(warmup):
+        check(send(url, data), url)
+    timings = []
+    queries = []
+    for _ in range(repeat):
+        # Запросы ко всем базам: с репликами чтения идут не в default.
+        with ExitStack() as stack:
+            captured = [
+                stack.enter_context(CaptureQueriesContext(db))
+                for db in connections.all()
+            ]
+            started = time.perf_counter()
+            check(send(url, data), url)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(sum(len(context) for context in captured))
+    tracemalloc.start()
+    try:
+        check(send(url, data), url)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'p50_ms': round(percentile(timings, 0.5), 3),
+        'p90_ms': round(percentile(timings, 0.9), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'p99_ms': round(percentile(timings, 0.99), 3),
+        'max_ms': round(max(timings), 3),
+        'queries': max(queries),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def check(response, url):
+    if response.status_code >= 400:
+        raise CommandError(f'{url}: ответ {response.status_code}')
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Регрессии относительно сохранённого прогона: метрики, выросшие
+    больше чем в 1 + threshold раз. Разница задержек меньше
+    min_delta_ms миллисекунд считается шумом."""
+    regressions = []
+    for size, pages in results.items():
+        for name, metrics in pages.items():
+            old = baseline.get(size, {}).get(name)
+            if old is None:
+                continue
+            for metric in COMPARED_METRICS:
+                if metric not in old:
+                    continue
+                before, after = old[metric], metrics[metric]
+                if after <= before * (1 + threshold):
+                    continue
+                if metric.endswith('_ms') and after - before < min_delta_ms:
+                    continue
+                regressions.append(
+                    f'{size}/{name}: {metric} {before} -> {after}'
+                )
+    return regressions
+
+
+class Command(BaseCommand):
+    help = (
+        'Меряет страницы posts, users и about тестовым клиентом на '
+        'тестовых базах нескольких размеров, заполненных seed_load: '
+        'перцентили задержки, число запросов и пик памяти. Пишет JSON и '
+        'при --baseline завершается ошибкой, если есть регрессии. '
+        'Рабочая база и кэш сайта не затрагиваются: прогон идёт на '
+        'своих кэшах, которые и очищаются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='1000,10000',
+            help='Число постов в каждой базе, через запятую.',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Сколько раз замерять каждую страницу.',
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=2,
+            help='Сколько запросов сделать до замера.',
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэши перед каждым запросом.',
+        )
+        parser.add_argument('--output', help='Файл для JSON; иначе stdout.')
+        parser.add_argument(
+            '--baseline', help='JSON прошлого прогона для сравнения.'
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Допустимый рост метрики, доля: 0.2 — на 20%%.',
+        )
+        parser.add_argument(
+            '--min-delta-ms', type=float, default=1.0,
+            help='Меньший рост задержки не считается регрессией.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',')]
+        except ValueError:
+            raise CommandError('--sizes: ожидаются числа через запятую.')
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as source:
+                baseline = json.load(source)['results']
+
+        with tempfile.TemporaryDirectory() as cache_dir, \
+                override_settings(CACHES=private_caches(cache_dir)):
+            setup_test_environment()
+            try:
+                results = {
+                    str(size): self.run_size(size, options)
+                    for size in sizes
+                }
+            finally:
+                teardown_test_environment()
+
+        report = {
+            'meta': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'seed': options['seed'],
+                'repeat': options['repeat'],
+                'cold': options['cold'],
+            },
+            'results': results,
+        }
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as target:
+                target.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+        if baseline is not None:
+            regressions = compare(
+                results, baseline,
+                options['threshold'], options['min_delta_ms'],
+            )
+            for regression in regressions:
+                self.stderr.write(regression)
+            if regressions:
+                raise CommandError(f'Регрессий: {len(regressions)}')
+            self.stderr.write(self.style.SUCCESS('Регрессий нет'))
+
+    def run_size(self, size, options):
+        """Создаёт тестовую базу, заполняет её size постами, меряет все
+        страницы и удаляет базу. Реплики из DATABASE_REPLICAS, как и в
+        тестах, становятся зеркалами тестовой базы (TEST MIRROR), и
+        чтения идут через роутер на них."""
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            self.clear_caches()
+            call_command(
+                'seed_load',
+                users=max(10, size // 100),
+                groups=max(2, size // 2000),
+                posts=size,
+                seed=options['seed'],
+                search_index=True,
+                stdout=io.StringIO(),
+            )
+            author, pages = scenarios()
+            client = Client()
+            results = {}
+            for name, method, url, data, login in pages:
+                if login:
+                    client.force_login(author)
+                else:
+                    client.logout()
+                self.stderr.write(f'{size}: {name}')
+                results[name] = self.measure_page(
+                    client, method, url, data, options
+                )
+            return results
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+    def measure_page(self, client, method, url, data, options):
+        if not options['cold']:
+            return measure(
+                client, method, url, data,
+                options['repeat'], options['warmup'],
+            )
+        cold = ColdClient(client, self.clear_caches)
+        return measure(
+            cold, method, url, data, options['repeat'], options['warmup']
+        )
+
+    def clear_caches(self):
+        for alias in settings.CACHES:
+            caches[alias].clear()
+
+
+class ColdClient:
+    """Клиент, очищающий кэши перед каждым запросом."""
+
+    def __init__(self, client, clear_caches):
+        self.client = client
+        self.clear_caches = clear_caches
+
+    def get(self, url, data=None):
+        self.clear_caches()
+        return self.client.get(url, data)
+
+    def post(self, url, data=None):
+        self.clear_caches()
+        return self.client.post(url, data)
@@ -0,0 +1,72 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router
+from django.utils import timezone
+
+from yatube.settings import VAR_NUMBER_POSTS
+
+from posts.feeds import author_feed, group_feed, index_feed
+from posts.models import Group, Post
+from posts.paginators import CursorPaginator
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет EXPLAIN QUERY PLAN запросов лент index, group_posts и '
+        'profile: полный просмотр posts_post или сортировка во временном '
+        'B-дереве считаются ошибкой.'
+    )
+
+    def handle(self, *args, **options):
+        alias = router.db_for_read(Post)
+        if connections[alias].vendor != 'sqlite':
+            raise CommandError(
+                'EXPLAIN QUERY PLAN поддерживается только для SQLite.'
+            )
+        table = Post._meta.db_table
+        full_scan = re.compile(rf'\bSCAN (TABLE )?{table}\b(?! USING)')
+        failures = []
+        for name, queryset in self.feed_queries():
+            plan = queryset.explain()
+            problems = []
+            if full_scan.search(plan):
+                problems.append('полный просмотр таблицы')
+            if 'USE TEMP B-TREE' in plan:
+                problems.append('сортировка во временном B-дереве')
+            if problems:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(
+                    f'{name}: {", ".join(problems)}'
+                ))
+                self.stdout.write(plan)
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{name}: OK'))
+        if failures:
+            raise CommandError(
+                f'Запросы без подходящего индекса: {", ".join(failures)}'
+            )
+
+    def feed_queries(self):
+        """Запросы страниц каждой ленты в режимах ?page= и ?after=."""
+        feeds = {
+            'index': index_feed(),
+            'group_posts': group_feed(Group(pk=1)),
+            'profile': author_feed(User(pk=1)),
+        }
+        position = (timezone.now(), 1)
+        for name, queryset in feeds.items():
+            offset = VAR_NUMBER_POSTS
+            yield name, queryset[offset:offset + VAR_NUMBER_POSTS]
+            paginator = CursorPaginator(queryset, VAR_NUMBER_POSTS)
+            yield (
+                f'{name} (after)',
+                paginator.queryset_after(*position)[:VAR_NUMBER_POSTS + 1],
+            )
+            yield (
+                f'{name} (before)',
+                paginator.queryset_before(*position)[:VAR_NUMBER_POSTS + 1],
+            )
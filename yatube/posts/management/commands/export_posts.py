@@ -0,0 +1,55 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.exports import export_lines, iter_posts
+from posts.feeds import author_feed, group_feed, index_feed
+from posts.models import Group
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты автора, группы или всего сайта в JSONL или CSV, '
+        'читая базу пачками по ключу (pub_date, id).'
+    )
+
+    def add_arguments(self, parser):
+        source = parser.add_mutually_exclusive_group()
+        source.add_argument('--author', help='username автора.')
+        source.add_argument('--group', help='slug группы.')
+        parser.add_argument(
+            '--format', choices=('jsonl', 'csv'), default='jsonl',
+        )
+        parser.add_argument(
+            '--output', default='-', help='Файл или - для stdout.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int,
+            help='Постов в одном запросе; по умолчанию EXPORT_CHUNK_SIZE.',
+        )
+
+    def handle(self, *args, **options):
+        posts = iter_posts(self.feed(options), options['chunk_size'])
+        lines = export_lines(posts, options['format'])
+        if options['output'] == '-':
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8',
+                  newline='') as output:
+            output.writelines(lines)
+
+    def feed(self, options):
+        if options['author']:
+            try:
+                return author_feed(User.objects.get(
+                    username=options['author']))
+            except User.DoesNotExist:
+                raise CommandError(f'Нет автора {options["author"]}')
+        if options['group']:
+            try:
+                return group_feed(Group.objects.get(slug=options['group']))
+            except Group.DoesNotExist:
+                raise CommandError(f'Нет группы {options["group"]}')
+        return index_feed()
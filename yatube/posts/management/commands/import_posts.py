@@ -0,0 +1,197 @@
+import csv
+import json
+import sys
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts.bulk import explicit_pub_date, finish_bulk_load
+from posts.models import Group, Post
+from posts.signals import bulk_signals_suspended
+
+User = get_user_model()
+
+# Сколько пропущенных записей показать подробно.
+MAX_REPORTED_ERRORS = 20
+
+
+class InvalidRecord(Exception):
+    pass
+
+
+def read_jsonl(stream):
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as error:
+            yield line_number, InvalidRecord(f'не JSON: {error}')
+
+
+def read_csv(stream):
+    # Строка 1 — заголовок.
+    for line_number, row in enumerate(csv.DictReader(stream), 2):
+        yield line_number, row
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует посты из JSONL или CSV с полями text, author '
+        '(username), group (slug, необязательно) и pub_date (ISO 8601, '
+        'необязательно). Пишет пачками через bulk_create; счётчики, '
+        'поисковый индекс и версии лент пересчитываются в конце.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл или - для stdin.')
+        parser.add_argument(
+            '--format', choices=('jsonl', 'csv'),
+            help='Формат входа; по умолчанию по расширению файла.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько постов вставлять за одну транзакцию.',
+        )
+        parser.add_argument(
+            '--create-authors', action='store_true',
+            help='Создавать неизвестных авторов без пароля.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.endswith('.csv')
+                                    else 'jsonl')
+        reader = read_csv if fmt == 'csv' else read_jsonl
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля.')
+        self.batch_size = options['batch_size']
+        self.create_authors = options['create_authors']
+        self.authors = dict(User.objects.values_list('username', 'pk'))
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.touched_authors = set()
+        self.imported = self.skipped = 0
+        last_pk = Post.objects.aggregate(last=Max('pk'))['last'] or 0
+
+        stream = sys.stdin if path == '-' else self.open(path)
+        self.started = time.monotonic()
+        try:
+            with bulk_signals_suspended(), explicit_pub_date():
+                records = reader(stream)
+                while True:
+                    batch = list(islice(records, self.batch_size))
+                    if not batch:
+                        break
+                    self.import_batch(batch)
+                    self.report_progress()
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        self.rebuild(last_pk)
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано постов: {self.imported}, '
+            f'пропущено записей: {self.skipped}'
+        ))
+
+    def open(self, path):
+        try:
+            return open(path, encoding='utf-8', newline='')
+        except OSError as error:
+            raise CommandError(f'Не удалось открыть {path}: {error}')
+
+    def import_batch(self, batch):
+        if self.create_authors:
+            self.add_missing_authors(batch)
+        posts = []
+        for line_number, record in batch:
+            try:
+                posts.append(self.build_post(record))
+            except InvalidRecord as error:
+                self.skip(line_number, error)
+        with transaction.atomic():
+            Post.objects.bulk_create(posts)
+        self.imported += len(posts)
+        self.touched_authors.update(post.author_id for post in posts)
+
+    def add_missing_authors(self, batch):
+        missing = {
+            record.get('author') for _, record in batch
+            if isinstance(record, dict)
+            and isinstance(record.get('author'), str)
+        } - set(self.authors) - {''}
+        if not missing:
+            return
+        password = make_password(None)
+        User.objects.bulk_create(
+            (User(username=username, password=password)
+             for username in missing),
+            ignore_conflicts=True,
+        )
+        self.authors.update(User.objects.filter(
+            username__in=missing).values_list('username', 'pk'))
+
+    def build_post(self, record):
+        if isinstance(record, InvalidRecord):
+            raise record
+        if not isinstance(record, dict):
+            raise InvalidRecord('запись не объект')
+        for field in ('text', 'author', 'group', 'pub_date'):
+            value = record.get(field)
+            if value is not None and not isinstance(value, str):
+                raise InvalidRecord(f'{field} не строка: {value!r}')
+        text = record.get('text')
+        if not text:
+            raise InvalidRecord('пустой text')
+        author_id = self.authors.get(record.get('author'))
+        if author_id is None:
+            raise InvalidRecord(f'неизвестный автор {record.get("author")!r}')
+        group_id = None
+        if record.get('group'):
+            group_id = self.groups.get(record['group'])
+            if group_id is None:
+                raise InvalidRecord(f'неизвестная группа {record["group"]!r}')
+        return Post(
+            text=text,
+            author_id=author_id,
+            group_id=group_id,
+            pub_date=self.parse_pub_date(record.get('pub_date')),
+        )
+
+    def parse_pub_date(self, value):
+        if not value:
+            return timezone.now()
+        try:
+            pub_date = parse_datetime(value)
+        except ValueError:
+            pub_date = None
+        if pub_date is None:
+            raise InvalidRecord(f'неверная дата {value!r}')
+        if timezone.is_naive(pub_date):
+            pub_date = timezone.make_aware(pub_date)
+        return pub_date
+
+    def skip(self, line_number, error):
+        self.skipped += 1
+        if self.skipped <= MAX_REPORTED_ERRORS:
+            self.stderr.write(f'Строка {line_number}: {error}')
+        elif self.skipped == MAX_REPORTED_ERRORS + 1:
+            self.stderr.write('Дальнейшие ошибки не показываются.')
+
+    def report_progress(self):
+        elapsed = time.monotonic() - self.started
+        rate = self.imported / elapsed if elapsed else 0
+        self.stdout.write(
+            f'Импортировано {self.imported}, пропущено {self.skipped}, '
+            f'{rate:.0f} постов/с'
+        )
+
+    def rebuild(self, last_pk):
+        self.stdout.write('Пересчёт счётчиков и поискового индекса...')
+        finish_bulk_load(self.touched_authors, last_pk, self.batch_size)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts.search import reindex_posts
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько постов индексировать за одну транзакцию.',
+        )
+
+    def handle(self, *args, **options):
+        indexed = sum(reindex_posts(batch_size=options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано постов: {indexed}'
+        ))
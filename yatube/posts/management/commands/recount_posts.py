@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from posts.counters import recount_posts_counts
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сохранённое число постов авторов и чинит счётчики.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько авторов пересчитывать за одну транзакцию.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_pk = 0
+        checked = repaired = 0
+        while True:
+            author_ids = list(
+                User.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not author_ids:
+                break
+            repaired += recount_posts_counts(author_ids)
+            checked += len(author_ids)
+            last_pk = author_ids[-1]
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено авторов: {checked}, исправлено счётчиков: {repaired}'
+        ))
@@ -0,0 +1,186 @@
+import random
+import time
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils.dateparse import parse_datetime
+from faker import Faker
+
+from posts.bulk import explicit_pub_date, finish_bulk_load
+from posts.models import Group, Post
+from posts.signals import bulk_signals_suspended
+
+User = get_user_model()
+
+# Даты постов отсчитываются назад от фиксированного момента, а не от
+# текущего: иначе два прогона с одним --seed дают разные данные.
+DEFAULT_EPOCH = '2025-01-01T00:00:00+00:00'
+
+
+def zipf_weights(count, exponent):
+    """Накопленные веса закона Ципфа для рангов 1..count: k-й по
+    популярности получает долю, пропорциональную 1 / k ** exponent."""
+    return list(accumulate(1 / rank ** exponent
+                           for rank in range(1, count + 1)))
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу нагрузочными данными: пользователи, группы и посты '
+        'с распределением авторов и групп по закону Ципфа. Одинаковый '
+        '--seed даёт одинаковые данные. Посты пишутся через bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--zipf', type=float, default=1.1,
+            help='Показатель закона Ципфа: чем больше, тем сильнее перекос.',
+        )
+        parser.add_argument(
+            '--group-share', type=float, default=0.6,
+            help='Доля постов, опубликованных в группе.',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней до --epoch распределены даты постов.',
+        )
+        parser.add_argument(
+            '--epoch', default=DEFAULT_EPOCH,
+            help='Дата самого позднего поста, ISO 8601 с часовым поясом.',
+        )
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument(
+            '--prefix', default='load',
+            help='Префикс имён пользователей и слагов групп.',
+        )
+        parser.add_argument(
+            '--search-index', action='store_true',
+            help='Построить поисковый индекс (заметно дольше).',
+        )
+
+    def handle(self, *args, **options):
+        for option in ('users', 'posts', 'batch_size'):
+            if options[option] < 1:
+                raise CommandError(
+                    f'--{option.replace("_", "-")} должен быть больше нуля.'
+                )
+        if options['groups'] < 0 or options['days'] < 0:
+            raise CommandError('--groups и --days не могут быть меньше нуля.')
+        self.epoch = parse_datetime(options['epoch'])
+        if self.epoch is None or self.epoch.tzinfo is None:
+            raise CommandError(
+                '--epoch: ожидается дата ISO 8601 с часовым поясом.'
+            )
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(options['seed'])
+        if connection.vendor == 'sqlite' and not connection.in_atomic_block:
+            # Данные можно сгенерировать заново, fsync на каждую
+            # транзакцию не нужен.
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA synchronous = OFF')
+
+        started = time.monotonic()
+        authors = self.create_users()
+        groups = self.create_groups()
+        last_pk = Post.objects.aggregate(last=Max('pk'))['last'] or 0
+        with bulk_signals_suspended(), explicit_pub_date():
+            self.create_posts(authors, groups)
+        self.stdout.write('Пересчёт счётчиков...')
+        finish_bulk_load(
+            authors, last_pk, options['batch_size'],
+            search_index=options['search_index'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.monotonic() - started:.0f} с'
+        ))
+
+    def shuffled(self, ids):
+        """Порядок популярности: самые активные — не первые по id."""
+        ids = list(ids)
+        self.rng.shuffle(ids)
+        return ids
+
+    def create_users(self):
+        prefix = self.options['prefix']
+        password = make_password(None)
+        users = []
+        for number in range(self.options['users']):
+            users.append(User(
+                username=f'{prefix}-{number}',
+                first_name=self.fake.first_name(),
+                last_name=self.fake.last_name(),
+                password=password,
+            ))
+        User.objects.bulk_create(users, ignore_conflicts=True)
+        ids = User.objects.filter(
+            username__startswith=f'{prefix}-'
+        ).order_by('pk').values_list('pk', flat=True)
+        self.stdout.write(f'Пользователей: {len(users)}')
+        return self.shuffled(ids)
+
+    def create_groups(self):
+        prefix = self.options['prefix']
+        Group.objects.bulk_create(
+            (
+                Group(
+                    title=self.fake.catch_phrase()[:200],
+                    slug=f'{prefix}-{number}',
+                    description=self.fake.paragraph(),
+                )
+                for number in range(self.options['groups'])
+            ),
+            ignore_conflicts=True,
+        )
+        ids = Group.objects.filter(
+            slug__startswith=f'{prefix}-'
+        ).order_by('pk').values_list('pk', flat=True)
+        self.stdout.write(f'Групп: {self.options["groups"]}')
+        return self.shuffled(ids)
+
+    def create_posts(self, authors, groups):
+        options = self.options
+        rng = self.rng
+        sentences = [self.fake.sentence(nb_words=10) for _ in range(5000)]
+        author_weights = zipf_weights(len(authors), options['zipf'])
+        group_weights = zipf_weights(len(groups), options['zipf'])
+        epoch = self.epoch
+        span = options['days'] * 24 * 60 * 60
+        total = options['posts']
+        created = 0
+        started = time.monotonic()
+        while created < total:
+            size = min(options['batch_size'], total - created)
+            post_authors = rng.choices(
+                authors, cum_weights=author_weights, k=size
+            )
+            post_groups = rng.choices(
+                groups, cum_weights=group_weights, k=size
+            ) if groups else [None] * size
+            posts = [
+                Post(
+                    text=' '.join(rng.choices(sentences, k=rng.randint(1, 4))),
+                    author_id=author_id,
+                    group_id=(
+                        group_id if rng.random() < options['group_share']
+                        else None
+                    ),
+                    pub_date=epoch - timedelta(seconds=rng.uniform(0, span)),
+                )
+                for author_id, group_id in zip(post_authors, post_groups)
+            ]
+            with transaction.atomic():
+                Post.objects.bulk_create(posts)
+            created += size
+            rate = created / (time.monotonic() - started)
+            self.stdout.write(f'Постов: {created}/{total}, {rate:.0f} в с')
@@ -0,0 +1,39 @@
+# Generated by Django 2.2.6 on 2026-10-18 02:50
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_author_stats(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    db_alias = schema_editor.connection.alias
+    counts = (
+        Post.objects.using(db_alias).order_by()
+        .values_list('author_id')
+        .annotate(posts_count=models.Count('pk'))
+    )
+    AuthorStats.objects.using(db_alias).bulk_create(
+        AuthorStats(author_id=author_id, posts_count=posts_count)
+        for author_id, posts_count in counts
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0016_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='post_stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('posts_count', models.PositiveIntegerField(default=0, help_text='Поддерживается сигналами, пересчитывается recount_posts', verbose_name='Число постов')),
+            ],
+        ),
+        migrations.RunPython(fill_author_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 2.2.6 on 2026-10-18 03:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+from collections import Counter
+
+
+def fill_search_index(apps, schema_editor):
+    from posts.search import MAX_WEIGHT, terms
+
+    Post = apps.get_model('posts', 'Post')
+    PostTerm = apps.get_model('posts', 'PostTerm')
+    db_alias = schema_editor.connection.alias
+    for post in Post.objects.using(db_alias).only('text').iterator():
+        PostTerm.objects.using(db_alias).bulk_create(
+            PostTerm(post=post, term=term, weight=min(weight, MAX_WEIGHT))
+            for term, weight in Counter(terms(post.text)).items()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_author_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Термин')),
+                ('weight', models.PositiveSmallIntegerField(verbose_name='Число вхождений')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'unique_together': {('term', 'post')},
+            },
+        ),
+        migrations.RunPython(fill_search_index, migrations.RunPython.noop),
+    ]
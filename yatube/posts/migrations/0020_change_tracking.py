@@ -0,0 +1,56 @@
+# Generated by Django 2.2.6 on 2026-10-18 03:25
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def number_existing_posts(apps, schema_editor):
+    # Старые посты нумеруются по id, правок у них ещё не было.
+    ChangeSequence = apps.get_model('posts', 'ChangeSequence')
+    Post = apps.get_model('posts', 'Post')
+    db_alias = schema_editor.connection.alias
+    posts = Post.objects.using(db_alias)
+    posts.update(change_seq=F('id'), modified=F('pub_date'))
+    last = posts.aggregate(last=Max('id'))['last'] or 0
+    ChangeSequence.objects.using(db_alias).create(name='posts', value=last)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_timelines'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeSequence',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='Имя')),
+                ('value', models.BigIntegerField(default=0, verbose_name='Последний номер')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PostTombstone',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_id', models.PositiveIntegerField(verbose_name='id поста')),
+                ('change_seq', models.BigIntegerField(db_index=True, verbose_name='Номер изменения')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата удаления')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='change_seq',
+            field=models.BigIntegerField(default=0, editable=False, help_text='Растёт с каждым сохранением, см. posts.changes', verbose_name='Номер изменения'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Дата изменения'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['change_seq', 'id'], name='post_change_seq_idx'),
+        ),
+        migrations.RunPython(number_existing_posts, migrations.RunPython.noop),
+    ]
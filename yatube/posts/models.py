@@ -1,11 +1,41 @@
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models import F
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from core.url_cache import cached_reverse
+
+from .signals import (bulk_signals_active, posts_bulk_created,
+                      posts_bulk_deleted, posts_bulk_updated,
+                      row_signals_suspended)
 
 User = get_user_model()
 
 
-class Group(models.Model):
+class LoadedStateMixin:
+    """Запоминает значения полей на момент загрузки из базы или
+    последнего сохранения; обработчики post_save видят в них старые
+    значения."""
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded = {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+        }
+
+    def previous(self, attname):
+        return getattr(self, '_loaded', {}).get(attname)
+
+
+class Group(LoadedStateMixin, models.Model):
     title = models.CharField(
         verbose_name='Заголовок',
         max_length=200,
@@ -20,12 +50,113 @@ class Group(models.Model):
         verbose_name='Описание',
         help_text='Описание группы'
     )
+    members_count = models.PositiveIntegerField(
+        'Число участников',
+        default=0,
+        editable=False,
+    )
 
     def __str__(self):
         return self.title
 
 
-class Post(models.Model):
+class ChangeSequence(models.Model):
+    """Именованный счётчик номеров изменений.
+
+    Номер выделяется UPDATE строки счётчика в транзакции изменения:
+    строка остаётся заблокированной до фиксации, поэтому изменения
+    становятся видны в порядке своих номеров, и читатель, запомнивший
+    последний номер, не пропустит зафиксированное позже изменение с
+    меньшим номером.
+    """
+
+    POSTS = 'posts'
+
+    name = models.CharField('Имя', max_length=50, primary_key=True)
+    value = models.BigIntegerField('Последний номер', default=0)
+
+    @classmethod
+    def allocate(cls, name, count=1):
+        """Выделяет count номеров подряд и возвращает первый. Вызывается
+        внутри транзакции изменения."""
+        counter = cls.objects.filter(name=name)
+        if not counter.update(value=F('value') + count):
+            # Строку создаёт миграция, но её может стереть manage.py flush.
+            cls.objects.get_or_create(name=name)
+            counter.update(value=F('value') + count)
+        return counter.get().value - count + 1
+
+    def __str__(self):
+        return f'{self.name}: {self.value}'
+
+
+class PostQuerySet(models.QuerySet):
+    """Массовые операции сообщают о себе сводными сигналами, чтобы
+    денормализованные данные не расходились с таблицей постов, и, как
+    Post.save, получают номера изменений (posts.changes)."""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        with transaction.atomic(using=self.db):
+            if objs:
+                first = ChangeSequence.allocate(
+                    ChangeSequence.POSTS, len(objs)
+                )
+                for number, post in enumerate(objs):
+                    post.change_seq = first + number
+            posts = super().bulk_create(objs, *args, **kwargs)
+            if bulk_signals_active():
+                posts_bulk_created.send(sender=self.model, posts=posts)
+        return posts
+
+    def delete(self):
+        self._for_write = True
+        with transaction.atomic(using=self.db):
+            rows = self._affected_rows()
+            with row_signals_suspended():
+                result = super().delete()
+            PostTombstone.record([pk for pk, _, _ in rows])
+            if bulk_signals_active():
+                posts_bulk_deleted.send(sender=self.model, rows=rows)
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def update(self, **kwargs):
+        """Все строки одного update() получают один номер изменения."""
+        self._for_write = True
+        fields = set(kwargs)
+        with transaction.atomic(using=self.db):
+            rows = self._affected_rows()
+            kwargs['change_seq'] = ChangeSequence.allocate(
+                ChangeSequence.POSTS
+            )
+            kwargs.setdefault('modified', timezone.now())
+            result = super().update(**kwargs)
+            if bulk_signals_active():
+                posts_bulk_updated.send(
+                    sender=self.model, rows=rows, fields=fields
+                )
+        return result
+
+    update.alters_data = True
+
+    def _affected_rows(self):
+        """Строки для счётчиков и следов. Читаются в транзакции записи и
+        из базы, куда она пойдёт (_for_write): реплика может отставать.
+        Где есть SELECT ... FOR UPDATE, строки блокируются до фиксации,
+        и соседний запрос не изменит их между чтением и записью."""
+        rows = self.order_by()
+        features = connections[self.db].features
+        if features.has_select_for_update:
+            rows = rows.select_for_update(
+                of=('self',) if features.has_select_for_update_of else ()
+            )
+        return list(rows.values_list('pk', 'author_id', 'group_id'))
+
+
+class Post(LoadedStateMixin, models.Model):
     text = models.TextField(
         'Текст поста',
         help_text='Введите текст поста'
@@ -52,8 +183,206 @@ class Post(models.Model):
         help_text='Выберите группу',
     )
 
+    modified = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+        db_index=True,
+    )
+    change_seq = models.BigIntegerField(
+        'Номер изменения',
+        default=0,
+        editable=False,
+        help_text='Растёт с каждым сохранением, см. posts.changes',
+    )
+
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['change_seq', 'id'], name='post_change_seq_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['-pub_date', '-id'], name='post_pub_date_idx'
+            ),
+        ]
+
+    def get_absolute_url(self):
+        return cached_reverse('posts:post_detail', self.pk)
+
+    # Адреса для строк лент: шаблоны не вызывают {% url %} на каждый пост.
+    @property
+    def author_url(self):
+        return cached_reverse('posts:profile', self.author.username)
+
+    @property
+    def group_url(self):
+        if self.group_id is None:
+            return None
+        return cached_reverse('posts:posts_list', self.group.slug)
+
+    @property
+    def edit_url(self):
+        return cached_reverse('posts:edit', self.pk)
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            self.change_seq = ChangeSequence.allocate(ChangeSequence.POSTS)
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {
+                    *update_fields, 'change_seq', 'modified'
+                }
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return self.text
+
+
+class PostTombstone(models.Model):
+    """След удалённого поста для posts.changes: номер изменения, под
+    которым пост был удалён."""
+
+    post_id = models.PositiveIntegerField('id поста')
+    change_seq = models.BigIntegerField('Номер изменения', db_index=True)
+    deleted_at = models.DateTimeField('Дата удаления', auto_now_add=True)
+
+    @classmethod
+    def record(cls, post_ids):
+        """Записывает следы удалённых постов. Вызывается внутри
+        транзакции удаления."""
+        if not post_ids:
+            return
+        first = ChangeSequence.allocate(ChangeSequence.POSTS, len(post_ids))
+        cls.objects.bulk_create(
+            cls(post_id=post_id, change_seq=first + number)
+            for number, post_id in enumerate(post_ids)
+        )
+
+    def __str__(self):
+        return f'{self.post_id} ({self.change_seq})'
+
+
+class AuthorStats(models.Model):
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='post_stats',
+        verbose_name='Автор',
+    )
+    posts_count = models.PositiveIntegerField(
+        'Число постов',
+        default=0,
+        help_text='Поддерживается сигналами, пересчитывается recount_posts',
+    )
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков',
+        default=0,
+    )
+
+    def __str__(self):
+        return f'{self.author}: {self.posts_count}'
+
+
+class Follow(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follower',
+        verbose_name='Подписчик',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='following',
+        verbose_name='Автор',
+    )
+
+    class Meta:
+        unique_together = ('user', 'author')
+
+    def __str__(self):
+        return f'{self.user} -> {self.author}'
+
+
+class GroupMember(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='memberships',
+        verbose_name='Участник',
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        related_name='members',
+        verbose_name='Группа',
+    )
+
+    class Meta:
+        unique_together = ('user', 'group')
+
+    def __str__(self):
+        return f'{self.user} in {self.group}'
+
+
+class TimelineEntry(models.Model):
+    """Пост в сохранённой домашней ленте пользователя. Заполняется
+    posts.timelines при публикации; pub_date скопирована из поста, чтобы
+    лента читалась по индексу без соединения с posts_post."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост',
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user}: {self.post_id}'
+
+
+class PostTerm(models.Model):
+    """Запись инвертированного индекса: термин и число его вхождений в
+    текст поста. Заполняется posts.search."""
+
+    term = models.CharField('Термин', max_length=64)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='search_terms',
+        verbose_name='Пост',
+    )
+    weight = models.PositiveSmallIntegerField('Число вхождений')
+
+    class Meta:
+        unique_together = ('term', 'post')
+
+    def __str__(self):
+        return f'{self.term}: {self.post_id}'
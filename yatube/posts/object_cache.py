@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.shortcuts import get_object_or_404
+
+from .feeds import ALL_FEEDS, get_feed_version
+from .models import Group, Post
+
+# Кэш только для чтения страниц: сохранение и удаление сбрасывают записи
+# (posts.receivers), а не пишут их заново. Запросы, которые меняют пост
+# или группу, читают их из основной базы: в памяти процесса запись может
+# отставать до LOCAL_TIMEOUT секунд.
+
+# Отдельный кэш со своим пределом LRU: отрисованные ленты не вытесняют
+# из него популярные посты.
+OBJECT_CACHE = 'objects'
+
+
+def _post_key(pk):
+    # Пост хранится вместе с автором и группой, поэтому ключ зависит от
+    # общей версии лент, которую поднимает переименование автора или
+    # изменение группы.
+    return f'posts:post:{get_feed_version(ALL_FEEDS)}:{pk}'
+
+
+def _group_key(slug):
+    return f'posts:group:{slug}'
+
+
+def get_post_or_404(pk):
+    """Пост с автором и группой из кэша, при промахе из базы."""
+    cache = caches[OBJECT_CACHE]
+    key = _post_key(pk)
+    post = cache.get(key)
+    if post is None:
+        post = get_object_or_404(
+            Post.objects.select_related('author', 'group'), pk=pk
+        )
+        cache.set(key, post, settings.OBJECT_CACHE_TIMEOUT)
+    return post
+
+
+def get_group_or_404(slug):
+    """Группа по slug из кэша, при промахе из базы."""
+    cache = caches[OBJECT_CACHE]
+    key = _group_key(slug)
+    group = cache.get(key)
+    if group is None:
+        group = get_object_or_404(Group, slug=slug)
+        cache.set(key, group, settings.OBJECT_CACHE_TIMEOUT)
+    return group
+
+
+def forget_posts(pks):
+    caches[OBJECT_CACHE].delete_many([_post_key(pk) for pk in pks])
+
+
+def forget_groups(slugs):
+    caches[OBJECT_CACHE].delete_many(
+        [_group_key(slug) for slug in slugs if slug]
+    )
@@ -0,0 +1,212 @@
+import base64
+import binascii
+from collections.abc import Sequence
+
+from django.conf import settings
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from . import tasks
+from .feeds import claim_count_refresh, get_cached_count, set_cached_count
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class FeedPage(Page):
+
+    @property
+    def cache_key(self):
+        return f'page:{self.number}'
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator, который берёт общее число постов ленты из кэша.
+
+    При холодном кэше посты считаются с LIMIT: хватает на запрошенную
+    страницу и COUNT_ESTIMATE_PAGES страниц вперёд. Если лента короче
+    этой границы, счёт точный и попадает в кэш. Иначе страница получает
+    оценку снизу, а точный COUNT(*) ставится задачей count_feed и
+    попадает в кэш вне запроса страницы.
+    """
+
+    def __init__(self, object_list, per_page, feed_key, count=None,
+                 **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.feed_key = feed_key
+        self.known_count = count
+        self.page_hint = 1
+
+    def _get_page(self, *args, **kwargs):
+        return FeedPage(*args, **kwargs)
+
+    def get_page(self, number):
+        try:
+            self.page_hint = max(int(number), 1)
+        except (TypeError, ValueError):
+            self.page_hint = 1
+        return super().get_page(number)
+
+    @cached_property
+    def count(self):
+        if self.known_count is not None:
+            return self.known_count
+        count = get_cached_count(self.feed_key)
+        if count is not None:
+            return count
+        bound = (
+            (self.page_hint + settings.COUNT_ESTIMATE_PAGES) * self.per_page
+        )
+        count = self.object_list.values('pk')[:bound].count()
+        if count < bound:
+            set_cached_count(self.feed_key, count)
+        elif claim_count_refresh(self.feed_key):
+            tasks.count_feed.enqueue(self.feed_key)
+        return count
+
+
+def page_window(page, on_each_side=2, on_ends=1):
+    """Номера страниц для навигации: on_each_side вокруг текущей и
+    on_ends с каждого края, None на месте пропуска. Длина не зависит от
+    числа страниц в ленте; алгоритм как у Paginator.get_elided_page_range
+    из Django 3.2."""
+    number = page.number
+    num_pages = page.paginator.num_pages
+    if num_pages <= (on_each_side + on_ends) * 2:
+        yield from range(1, num_pages + 1)
+        return
+    if number > 1 + on_each_side + on_ends + 1:
+        yield from range(1, on_ends + 1)
+        yield None
+        yield from range(number - on_each_side, number + 1)
+    else:
+        yield from range(1, number + 1)
+    if number < num_pages - on_each_side - on_ends - 1:
+        yield from range(number + 1, number + on_each_side + 1)
+        yield None
+        yield from range(num_pages - on_ends + 1, num_pages + 1)
+    else:
+        yield from range(number + 1, num_pages + 1)
+
+
+def encode_cursor(post):
+    """Упаковывает позицию поста (pub_date, id) в непрозрачный токен."""
+    raw = f'{post.pub_date.isoformat()}|{post.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковывает токен обратно в пару (pub_date, id)."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        pub_date, pk = raw.rsplit('|', 1)
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise InvalidCursor(token)
+    if pub_date is None:
+        raise InvalidCursor(token)
+    return pub_date, pk
+
+
+class CursorPage(Sequence):
+    """Страница ленты без номера и без общего числа страниц."""
+
+    is_cursor_page = True
+    cache_key = 'first'
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<Cursor page of %s posts>' % len(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next and self.object_list:
+            return encode_cursor(self.object_list[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous and self.object_list:
+            return encode_cursor(self.object_list[0])
+        return None
+
+
+class CursorPaginator:
+    """Пагинация по ключу (pub_date, id): стоимость страницы не зависит
+    от глубины, COUNT(*) и OFFSET не выполняются."""
+
+    def __init__(self, object_list, per_page):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+
+    def get_page(self, after=None, before=None):
+        """Возвращает страницу после или до курсора. Битый токен, как и
+        неверный номер у Paginator.get_page, ведёт на первую страницу."""
+        try:
+            if before:
+                page = self._page_before(*decode_cursor(before))
+                page.cache_key = f'before:{before}'
+                return page
+            if after:
+                page = self._page_after(*decode_cursor(after))
+                page.cache_key = f'after:{after}'
+                return page
+        except InvalidCursor:
+            pass
+        return self._page_after()
+
+    def queryset_after(self, pub_date=None, pk=None):
+        queryset = self.object_list.order_by('-pub_date', '-pk')
+        if pub_date is None:
+            return queryset
+        return queryset.filter(
+            Q(pub_date__lt=pub_date) | Q(pk__lt=pk), pub_date__lte=pub_date
+        )
+
+    def queryset_before(self, pub_date, pk):
+        return self.object_list.order_by('pub_date', 'pk').filter(
+            Q(pub_date__gt=pub_date) | Q(pk__gt=pk), pub_date__gte=pub_date
+        )
+
+    def _page_after(self, pub_date=None, pk=None):
+        queryset = self.queryset_after(pub_date, pk)
+        rows = list(queryset[:self.per_page + 1])
+        return CursorPage(
+            rows[:self.per_page],
+            has_next=len(rows) > self.per_page,
+            has_previous=pub_date is not None,
+        )
+
+    def _page_before(self, pub_date, pk):
+        queryset = self.queryset_before(pub_date, pk)
+        rows = list(queryset[:self.per_page + 1])
+        if not rows:
+            return self._page_after()
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        rows.reverse()
+        return CursorPage(rows, has_next=True, has_previous=has_previous)
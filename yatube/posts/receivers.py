@@ -0,0 +1,290 @@
+import threading
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from .counters import (adjust_followers_count, adjust_members_count,
+                       adjust_posts_count, adjust_posts_counts)
+from .feeds import (ALL_FEEDS, bump_versions, feed_keys, invalidate_counts,
+                    viewer_key)
+from .models import Follow, Group, GroupMember, Post, PostTombstone
+from .object_cache import forget_groups, forget_posts
+from . import tasks
+from .signals import (posts_bulk_created, posts_bulk_deleted,
+                      posts_bulk_updated, row_signals_active)
+
+User = get_user_model()
+
+# Поля пользователя, которые видны в отрисованных лентах.
+AUTHOR_RENDERED_FIELDS = {'username', 'first_name', 'last_name'}
+
+# Авторы, удаляемые прямо сейчас: их посты уходят каскадом вместе со
+# счётчиком, и сдвигать его по каждому посту незачем.
+_deleting = threading.local()
+
+
+@receiver(pre_delete, sender=User)
+def mark_author_deleting(sender, instance, **kwargs):
+    if not hasattr(_deleting, 'authors'):
+        _deleting.authors = set()
+    _deleting.authors.add(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def unmark_author_deleting(sender, instance, **kwargs):
+    getattr(_deleting, 'authors', set()).discard(instance.pk)
+
+
+@receiver(pre_delete, sender=User)
+def bury_author_posts(sender, instance, **kwargs):
+    # Посты удаляемого автора получают следы одной пачкой, а не по
+    # одному в post_delete.
+    PostTombstone.record(list(instance.posts.values_list('pk', flat=True)))
+
+
+@receiver(post_delete, sender=Post)
+def bury_deleted_post(sender, instance, **kwargs):
+    if (
+        row_signals_active()
+        and instance.author_id not in getattr(_deleting, 'authors', ())
+    ):
+        PostTombstone.record([instance.pk])
+
+
+@receiver(pre_delete, sender=Group)
+def detach_group_posts(sender, instance, **kwargs):
+    # SET_NULL обнуляет группу у постов мимо PostQuerySet.update, без
+    # номера изменения. Делаем это сами раньше, в той же транзакции.
+    Post.objects.filter(group=instance).update(group=None)
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, **kwargs):
+    if not row_signals_active():
+        return
+    if created:
+        adjust_posts_count(instance.author_id, 1)
+        return
+    previous_author_id = instance.previous('author_id')
+    if previous_author_id not in (None, instance.author_id):
+        adjust_posts_count(previous_author_id, -1)
+        adjust_posts_count(instance.author_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    if not row_signals_active():
+        return
+    if instance.author_id not in getattr(_deleting, 'authors', ()):
+        adjust_posts_count(instance.author_id, -1)
+
+
+@receiver(posts_bulk_created, sender=Post)
+def count_bulk_created_posts(sender, posts, **kwargs):
+    adjust_posts_counts(post.author_id for post in posts)
+
+
+@receiver(posts_bulk_deleted, sender=Post)
+def count_bulk_deleted_posts(sender, rows, **kwargs):
+    adjust_posts_counts((author_id for _, author_id, _ in rows), sign=-1)
+
+
+@receiver(posts_bulk_updated, sender=Post)
+def count_bulk_updated_posts(sender, rows, fields, **kwargs):
+    if not fields & {'author', 'author_id'}:
+        return
+    pks = [pk for pk, _, _ in rows]
+    adjust_posts_counts((author_id for _, author_id, _ in rows), sign=-1)
+    adjust_posts_counts(
+        Post.objects.filter(pk__in=pks).values_list('author_id', flat=True)
+    )
+
+
+def _after_commit(func, *args):
+    """Кэш сбрасывается после фиксации транзакции, а не в ней: иначе
+    читатель может увидеть новую версию ленты или пустую запись кэша,
+    ещё читая старые строки, и сохранить их под новой версией."""
+    transaction.on_commit(partial(func, *args))
+
+
+def _rows_feed_keys(rows):
+    keys = set()
+    for _, author_id, group_id in rows:
+        keys.update(feed_keys(author_id, group_id))
+    return keys
+
+
+def _feeds_changed(keys, moved):
+    """Новые, удалённые и перенесённые посты меняют и число постов, и
+    отрисовку лент; правка на месте меняет только отрисовку."""
+    keys = set(keys)
+    if moved:
+        _after_commit(invalidate_counts, keys)
+    _after_commit(bump_versions, keys)
+
+
+@receiver(post_save, sender=Post)
+def refresh_saved_post_feeds(sender, instance, created, **kwargs):
+    if not row_signals_active():
+        return
+    keys = feed_keys(instance.author_id, instance.group_id)
+    previous = (instance.previous('author_id'), instance.previous('group_id'))
+    moved = created or previous != (instance.author_id, instance.group_id)
+    if moved and not created:
+        keys += feed_keys(*previous)
+    _feeds_changed(keys, moved)
+
+
+@receiver(post_delete, sender=Post)
+def refresh_deleted_post_feeds(sender, instance, **kwargs):
+    if row_signals_active():
+        _feeds_changed(
+            feed_keys(instance.author_id, instance.group_id), moved=True
+        )
+
+
+@receiver(posts_bulk_created, sender=Post)
+def refresh_bulk_created_feeds(sender, posts, **kwargs):
+    _feeds_changed(_rows_feed_keys(
+        (post.pk, post.author_id, post.group_id) for post in posts
+    ), moved=True)
+
+
+@receiver(posts_bulk_deleted, sender=Post)
+def refresh_bulk_deleted_feeds(sender, rows, **kwargs):
+    _feeds_changed(_rows_feed_keys(rows), moved=True)
+
+
+@receiver(posts_bulk_updated, sender=Post)
+def refresh_bulk_updated_feeds(sender, rows, fields, **kwargs):
+    keys = _rows_feed_keys(rows)
+    moved = bool(fields & {'author', 'author_id', 'group', 'group_id'})
+    if moved:
+        pks = [pk for pk, _, _ in rows]
+        keys |= _rows_feed_keys(Post.objects.filter(pk__in=pks).values_list(
+            'pk', 'author_id', 'group_id'))
+    _feeds_changed(keys, moved)
+
+
+def _rendered_names(user):
+    # Отложенные (.only/.defer) поля не читаются: это был бы запрос.
+    return {
+        field: user.__dict__[field]
+        for field in AUTHOR_RENDERED_FIELDS if field in user.__dict__
+    }
+
+
+@receiver(post_init, sender=User)
+def remember_author_names(sender, instance, **kwargs):
+    instance._rendered_names = _rendered_names(instance)
+
+
+@receiver(post_save, sender=User)
+def refresh_feeds_on_author_rename(sender, instance, created, update_fields,
+                                   **kwargs):
+    # Регистрация, смена пароля и вход не меняют того, что видно в
+    # лентах: версия поднимается, только если имя отличается от
+    # загруженного. Незагруженное поле считается изменённым.
+    previous = instance._rendered_names
+    instance._rendered_names = _rendered_names(instance)
+    if created:
+        return
+    fields = AUTHOR_RENDERED_FIELDS
+    if update_fields:
+        fields = fields & set(update_fields)
+    if any(
+        field not in previous
+        or previous[field] != getattr(instance, field)
+        for field in fields
+    ):
+        _after_commit(bump_versions, [ALL_FEEDS])
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def refresh_feeds_on_group_change(sender, instance, **kwargs):
+    _after_commit(bump_versions, [ALL_FEEDS])
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def forget_cached_post(sender, instance, **kwargs):
+    _after_commit(forget_posts, [instance.pk])
+
+
+@receiver(posts_bulk_deleted, sender=Post)
+@receiver(posts_bulk_updated, sender=Post)
+def forget_cached_posts(sender, rows, **kwargs):
+    _after_commit(forget_posts, [pk for pk, _, _ in rows])
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def forget_cached_group(sender, instance, **kwargs):
+    _after_commit(forget_groups, {instance.slug, instance.previous('slug')})
+
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, created, **kwargs):
+    if created or instance.previous('text') != instance.text:
+        tasks.index_posts.enqueue([instance.pk], created=created)
+
+
+@receiver(posts_bulk_created, sender=Post)
+def index_bulk_created_posts(sender, posts, **kwargs):
+    # Без RETURNING (SQLite) bulk_create не проставляет id, и такие посты
+    # попадут в индекс только после manage.py rebuild_search_index.
+    post_ids = [post.pk for post in posts if post.pk is not None]
+    if post_ids:
+        tasks.index_posts.enqueue(post_ids, created=True)
+
+
+@receiver(posts_bulk_updated, sender=Post)
+def index_bulk_updated_posts(sender, rows, fields, **kwargs):
+    if 'text' in fields:
+        tasks.index_posts.enqueue([pk for pk, _, _ in rows])
+
+
+@receiver(post_save, sender=Post)
+def enqueue_created_post_tasks(sender, instance, created, **kwargs):
+    if created:
+        tasks.fanout_post.enqueue(instance.pk)
+        tasks.notify_followers.enqueue(instance.pk)
+    elif instance.previous('group_id') != instance.group_id:
+        # Пост перенесли в другую группу: её участникам он ещё не
+        # разложен, а из лент участников прежней должен уйти.
+        tasks.fanout_post.enqueue(instance.pk, instance.previous('group_id'))
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        adjust_followers_count(instance.author_id, 1)
+        _after_commit(bump_versions, [viewer_key(instance.user_id)])
+        tasks.rebuild_timeline.enqueue(instance.user_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    adjust_followers_count(instance.author_id, -1)
+    _after_commit(bump_versions, [viewer_key(instance.user_id)])
+    tasks.rebuild_timeline.enqueue(instance.user_id)
+
+
+@receiver(post_save, sender=GroupMember)
+def membership_created(sender, instance, created, **kwargs):
+    if created:
+        adjust_members_count(instance.group_id, 1)
+        _after_commit(bump_versions, [viewer_key(instance.user_id)])
+        tasks.rebuild_timeline.enqueue(instance.user_id)
+
+
+@receiver(post_delete, sender=GroupMember)
+def membership_deleted(sender, instance, **kwargs):
+    adjust_members_count(instance.group_id, -1)
+    _after_commit(bump_versions, [viewer_key(instance.user_id)])
+    tasks.rebuild_timeline.enqueue(instance.user_id)
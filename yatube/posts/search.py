@@ -0,0 +1,209 @@
+import re
+from collections import Counter
+from functools import lru_cache
+
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from .models import Post, PostTerm
+
+TOKEN_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile(r'^[а-я]+$')
+MAX_TERM_LENGTH = PostTerm._meta.get_field('term').max_length
+# Верхняя граница PositiveSmallIntegerField.
+MAX_WEIGHT = 32767
+
+STOP_WORDS = frozenset((
+    'а', 'без', 'бы', 'был', 'была', 'были', 'было', 'быть', 'в', 'вам',
+    'вас', 'весь', 'во', 'вот', 'все', 'всего', 'всех', 'вы', 'где', 'да',
+    'для', 'до', 'его', 'ее', 'если', 'есть', 'еще', 'же', 'за', 'здесь',
+    'и', 'из', 'или', 'им', 'их', 'к', 'как', 'ко', 'когда', 'кто', 'ли',
+    'либо', 'мне', 'мы', 'на', 'над', 'не', 'него', 'нее', 'нет', 'ни',
+    'них', 'но', 'ну', 'о', 'об', 'он', 'она', 'они', 'оно', 'от', 'по',
+    'под', 'при', 'с', 'со', 'так', 'также', 'то', 'тот', 'ты', 'у', 'уже',
+    'чем', 'что', 'чтобы', 'эта', 'эти', 'это', 'этот', 'я',
+))
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = (
+    (),
+    ('ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+     'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+     'ая', 'яя', 'ою', 'ею'),
+)
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = ((), ('ся', 'сь'))
+VERB = (
+    ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'ешь', 'нно'),
+    ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+     'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+     'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'),
+)
+NOUN = (
+    (),
+    ('а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии',
+     'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам',
+     'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия',
+     'ья', 'я'),
+)
+DERIVATIONAL = ('ост', 'ость')
+SUPERLATIVE = ('ейш', 'ейше')
+
+
+def _regions(word):
+    """Начала областей RV и R2 алгоритма Snowball для русского языка."""
+    rv = len(word)
+    for i, char in enumerate(word):
+        if char in VOWELS:
+            rv = i + 1
+            break
+    r1 = _after_vowel_consonant(word, 0)
+    r2 = _after_vowel_consonant(word, r1)
+    return rv, r2
+
+
+def _after_vowel_consonant(word, start):
+    for i in range(start + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            return i + 1
+    return len(word)
+
+
+def _strip(word, rv, groups):
+    """Отрезает самое длинное окончание из groups внутри RV.
+
+    Окончания первой группы допустимы только после «а» или «я». Как и в
+    Snowball, если самое длинное совпадение не прошло это условие, более
+    короткие не пробуются. Возвращает слово без окончания или None.
+    """
+    region = word[rv:]
+    candidates = [
+        (suffix, group)
+        for group, suffixes in enumerate(groups)
+        for suffix in suffixes
+        if region.endswith(suffix)
+    ]
+    if not candidates:
+        return None
+    suffix, group = max(candidates, key=lambda item: len(item[0]))
+    stem = word[:-len(suffix)]
+    if group == 0 and not (len(stem) > rv and stem[-1] in 'ая'):
+        return None
+    return stem
+
+
+@lru_cache(maxsize=100000)
+def stem(word):
+    """Основа русского слова по алгоритму Snowball (Porter)."""
+    word = word.replace('ё', 'е')
+    rv, r2 = _regions(word)
+
+    stripped = _strip(word, rv, PERFECTIVE_GERUND)
+    if stripped is None:
+        word = _strip(word, rv, REFLEXIVE) or word
+        stripped = _strip(word, rv, ADJECTIVE)
+        if stripped is not None:
+            stripped = _strip(stripped, rv, PARTICIPLE) or stripped
+        else:
+            stripped = _strip(word, rv, VERB) or _strip(word, rv, NOUN)
+    word = stripped or word
+
+    if word[rv:].endswith('и'):
+        word = word[:-1]
+
+    for suffix in DERIVATIONAL:
+        if word.endswith(suffix) and len(word) - len(suffix) >= r2:
+            word = word[:-len(suffix)]
+            break
+
+    if word[rv:].endswith(SUPERLATIVE):
+        word = word[:-4] if word.endswith('ейше') else word[:-3]
+    if word[rv:].endswith('нн'):
+        word = word[:-1]
+    elif word[rv:].endswith('ь'):
+        word = word[:-1]
+    return word
+
+
+def terms(text):
+    """Термины текста: слова в нижнем регистре без стоп-слов, русские
+    слова приведены к основе."""
+    for token in TOKEN_RE.findall(text.lower()):
+        token = token.replace('ё', 'е')
+        if token in STOP_WORDS:
+            continue
+        if CYRILLIC_RE.match(token):
+            token = stem(token)
+        if token:
+            yield token[:MAX_TERM_LENGTH]
+
+
+def index_posts(posts, created=False):
+    """Перестраивает записи инвертированного индекса постов. У новых
+    постов (created=True) старых записей нет, и удалять их незачем."""
+    posts = [post for post in posts if post.pk is not None]
+    if not created:
+        PostTerm.objects.filter(post__in=posts).delete()
+    PostTerm.objects.bulk_create(
+        PostTerm(post=post, term=term, weight=min(weight, MAX_WEIGHT))
+        for post in posts
+        for term, weight in Counter(terms(post.text)).items()
+    )
+
+
+def reindex_posts(after_pk=0, batch_size=500, created=False):
+    """Перестраивает индекс постов с id больше after_pk пачками по
+    batch_size, каждую в своей транзакции. Отдаёт размер каждой пачки."""
+    while True:
+        posts = list(
+            Post.objects.filter(pk__gt=after_pk)
+            .order_by('pk')
+            .only('text')[:batch_size]
+        )
+        if not posts:
+            return
+        with transaction.atomic():
+            index_posts(posts, created)
+        after_pk = posts[-1].pk
+        yield len(posts)
+
+
+def query_terms(query):
+    return sorted(set(terms(query)))
+
+
+def matching_post_ids(query_terms):
+    """id постов, содержащих все термины запроса."""
+    return (
+        PostTerm.objects.filter(term__in=query_terms)
+        .values('post_id')
+        .annotate(matched=Count('term'))
+        .filter(matched=len(query_terms))
+        .values('post_id')
+    )
+
+
+def search_posts(query):
+    """Посты, содержащие все слова запроса, по убыванию частоты слов."""
+    found = query_terms(query)
+    if not found:
+        return Post.objects.none()
+    return (
+        Post.objects.filter(search_terms__term__in=found)
+        .annotate(
+            matched=Count('search_terms'),
+            rank=Sum('search_terms__weight'),
+        )
+        .filter(matched=len(found))
+        .select_related('author', 'group')
+        .order_by('-rank', '-pub_date', '-pk')
+    )
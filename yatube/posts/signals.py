@@ -0,0 +1,45 @@
+import threading
+from contextlib import contextmanager
+
+from django.dispatch import Signal
+
+# Массовые операции PostQuerySet не отправляют post_save, а delete()
+# отправляет post_delete по каждой строке. Вместо этого обработчики
+# получают одну сводку на всю операцию.
+posts_bulk_created = Signal(providing_args=['posts'])
+posts_bulk_deleted = Signal(providing_args=['rows'])
+posts_bulk_updated = Signal(providing_args=['rows', 'fields'])
+
+_state = threading.local()
+
+
+@contextmanager
+def row_signals_suspended():
+    """Отключает построчные обработчики постов на время массовой
+    операции, которая сама отправит сводный сигнал."""
+    previous = getattr(_state, 'suspended', False)
+    _state.suspended = True
+    try:
+        yield
+    finally:
+        _state.suspended = previous
+
+
+def row_signals_active():
+    return not getattr(_state, 'suspended', False)
+
+
+@contextmanager
+def bulk_signals_suspended():
+    """Отключает и сводные сигналы: для импорта, после которого
+    денормализованные данные пересчитываются целиком."""
+    previous = getattr(_state, 'bulk_suspended', False)
+    _state.bulk_suspended = True
+    try:
+        yield
+    finally:
+        _state.bulk_suspended = previous
+
+
+def bulk_signals_active():
+    return not getattr(_state, 'bulk_suspended', False)
@@ -0,0 +1,56 @@
+from urllib.parse import urljoin
+
+from django.conf import settings
+from django.core.mail import send_mass_mail
+from django.urls import reverse
+
+from core.tasks import task
+
+from . import search, timelines
+from .feeds import feed_posts, refresh_cached_count
+from .models import Follow, Post
+
+
+@task
+def index_posts(post_ids, created=False):
+    search.index_posts(Post.objects.filter(pk__in=post_ids), created)
+
+
+@task
+def count_feed(feed_key):
+    """Точное число постов длинной ленты, которое страница не считает
+    сама."""
+    refresh_cached_count(feed_key, feed_posts(feed_key).count())
+
+
+@task
+def fanout_post(post_id, old_group_id=None):
+    timelines.fanout_post(post_id, old_group_id)
+
+
+@task
+def rebuild_timeline(user_id):
+    timelines.rebuild_timeline(user_id)
+
+
+@task
+def notify_followers(post_id):
+    """Письма подписчикам автора о новой записи."""
+    post = Post.objects.select_related('author').filter(pk=post_id).first()
+    if post is None:
+        return
+    author = post.author.get_full_name() or post.author.username
+    subject = f'Новая запись: {author}'
+    url = urljoin(
+        settings.SITE_URL,
+        reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+    )
+    body = f'{post.text}\n\n{url}'
+    emails = (
+        Follow.objects.filter(author_id=post.author_id)
+        .exclude(user__email='')
+        .values_list('user__email', flat=True)
+    )
+    send_mass_mail(
+        (subject, body, None, [email]) for email in emails.iterator()
+    )
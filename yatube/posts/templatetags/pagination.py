@@ -0,0 +1,12 @@
+from django import template
+
+from posts.paginators import page_window as window
+
+register = template.Library()
+
+
+@register.simple_tag
+def page_window(page_obj, on_each_side=2, on_ends=1):
+    """{% page_window page_obj as pages %}: номера страниц вокруг
+    текущей и по краям, None на месте пропуска."""
+    return list(window(page_obj, on_each_side, on_ends))
@@ -0,0 +1,53 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.management.commands.benchmark import (compare, measure,
+                                                 percentile, private_caches)
+
+
+class BenchmarkTests(TestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.95), 95)
+        self.assertEqual(percentile([7], 0.99), 7)
+
+    def test_compare_reports_only_regressions_above_threshold(self):
+        baseline = {'100': {'index': {
+            'p50_ms': 10, 'p95_ms': 10, 'queries': 3, 'peak_kb': 100,
+        }}}
+        results = {'100': {
+            'index': {
+                'p50_ms': 11, 'p95_ms': 20, 'queries': 4, 'peak_kb': 100,
+            },
+            'new_page': {
+                'p50_ms': 1, 'p95_ms': 1, 'queries': 1, 'peak_kb': 1,
+            },
+        }}
+        self.assertEqual(
+            compare(results, baseline, threshold=0.2, min_delta_ms=1),
+            ['100/index: p95_ms 10 -> 20', '100/index: queries 3 -> 4'],
+        )
+        self.assertEqual(
+            compare(results, baseline, threshold=0.2, min_delta_ms=50),
+            ['100/index: queries 3 -> 4'],
+        )
+
+    def test_measure(self):
+        metrics = measure(
+            Client(), 'get', reverse('about:author'), None,
+            repeat=3, warmup=1,
+        )
+        self.assertEqual(metrics['queries'], 0)
+        self.assertGreater(metrics['p50_ms'], 0)
+        self.assertGreater(metrics['peak_kb'], 0)
+        self.assertLessEqual(metrics['p50_ms'], metrics['max_ms'])
+
+    def test_private_caches_leave_site_cache_alone(self):
+        """Очистка кэшей бенчмарка не трогает кэш сайта."""
+        cache.set('site-key', 'value')
+        with override_settings(CACHES=private_caches('/nonexistent')):
+            cache.set('site-key', 'benchmark')
+            cache.clear()
+        self.assertEqual(cache.get('site-key'), 'value')
@@ -0,0 +1,89 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from posts.changes import changes_since
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class ChangesSinceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+
+    def create_posts(self, count, author=None, **kwargs):
+        return [
+            Post.objects.create(
+                text=f'Пост {number}', author=author or self.author,
+                **kwargs
+            )
+            for number in range(count)
+        ]
+
+    def test_saves_get_growing_numbers(self):
+        first, second = self.create_posts(2)
+        self.assertLess(first.change_seq, second.change_seq)
+        changes = changes_since(0)
+        self.assertEqual(changes.updated, [first, second])
+        self.assertEqual(changes.last_seq, second.change_seq)
+        self.assertEqual(changes_since(changes.last_seq).updated, [])
+
+        modified = first.modified
+        first.text = 'Правка'
+        first.save(update_fields=['text'])
+        first.refresh_from_db()
+        self.assertGreater(first.change_seq, second.change_seq)
+        self.assertGreater(first.modified, modified)
+        self.assertEqual(changes_since(changes.last_seq).updated, [first])
+
+    def test_bulk_create_and_update(self):
+        posts = Post.objects.bulk_create(
+            Post(text=f'Пост {number}', author=self.author)
+            for number in range(3)
+        )
+        numbers = sorted(post.change_seq for post in posts)
+        self.assertEqual(numbers, list(range(numbers[0], numbers[0] + 3)))
+        Post.objects.update(group=self.group)
+        self.assertEqual(
+            set(Post.objects.values_list('change_seq', flat=True)),
+            {numbers[-1] + 1},
+        )
+
+    def test_batch_does_not_split_one_update(self):
+        """Строки одного update() приходят в одной пачке."""
+        self.create_posts(1)
+        Post.objects.bulk_create(
+            Post(text=f'Массовый {number}', author=self.author)
+            for number in range(4)
+        )
+        Post.objects.filter(text__startswith='Массовый').update(text='Общий')
+        changes = changes_since(0, limit=2)
+        self.assertEqual(len(changes.updated), 5)
+        self.assertEqual(
+            changes_since(changes.last_seq), ([], [], changes.last_seq)
+        )
+
+    def test_deletes_leave_tombstones(self):
+        author = User.objects.create_user(username='leaving')
+        single, in_queryset, other = self.create_posts(3, author=author)
+        cursor = changes_since(0).last_seq
+        deleted = [single.pk, in_queryset.pk]
+        single.delete()
+        Post.objects.filter(pk=in_queryset.pk).delete()
+        changes = changes_since(cursor)
+        self.assertEqual(changes.updated, [])
+        self.assertEqual(changes.deleted, deleted)
+
+        cursor = changes.last_seq
+        author.delete()
+        self.assertEqual(changes_since(cursor).deleted, [other.pk])
+
+    def test_group_delete_is_a_change(self):
+        post, = self.create_posts(1, group=self.group)
+        cursor = changes_since(0).last_seq
+        self.group.delete()
+        changes = changes_since(cursor)
+        self.assertEqual(changes.updated, [post])
+        self.assertIsNone(changes.updated[0].group)
@@ -0,0 +1,145 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.http import http_date
+
+from core.testing import CommitCallbacksMixin
+from posts.feeds import ALL_FEEDS, INDEX_FEED, get_feed_version
+from posts.models import Follow, Group, Post
+from posts.tasks import count_feed
+
+User = get_user_model()
+
+
+class ConditionalGetTests(CommitCallbacksMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(
+            text='Тестовый пост', author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.urls = [
+            reverse('posts:index'),
+            reverse('posts:posts_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        ]
+
+    def test_unchanged_page_is_not_rendered(self):
+        """Повтор с тем же ETag — 304 без отрисовки. Из базы читается
+        только id автора профиля."""
+        for url, queries in zip(self.urls, (0, 0, 1, 0)):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('no-cache', response['Cache-Control'])
+                self.assertTrue(response.has_header('Last-Modified'))
+                with self.assertNumQueries(queries):
+                    repeat = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag']
+                    )
+                self.assertEqual(repeat.status_code, 304)
+                self.assertEqual(repeat.templates, [])
+
+    def test_if_modified_since(self):
+        response = self.client.get(self.urls[0])
+        repeat = self.client.get(
+            self.urls[0], HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(repeat.status_code, 304)
+        repeat = self.client.get(
+            self.urls[0], HTTP_IF_MODIFIED_SINCE=http_date(0)
+        )
+        self.assertEqual(repeat.status_code, 200)
+
+    def test_edit_changes_etag(self):
+        """Правка поста меняет ETag всех страниц, где он виден."""
+        etags = [self.client.get(url)['ETag'] for url in self.urls]
+        self.post.text = 'Исправленный текст'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.save()
+        for url, etag in zip(self.urls, etags):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, 'Исправленный текст')
+
+    def test_pages_differ_by_query_and_viewer(self):
+        index = self.urls[0]
+        etag = self.client.get(index)['ETag']
+        self.assertNotEqual(self.client.get(index + '?page=2')['ETag'], etag)
+        self.client.force_login(self.reader)
+        self.assertNotEqual(self.client.get(index)['ETag'], etag)
+
+    def test_follow_changes_profile_etag(self):
+        """Подписка меняет кнопку на странице автора и её ETag."""
+        self.client.force_login(self.reader)
+        profile = self.urls[2]
+        etag = self.client.get(profile)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.create(user=self.reader, author=self.author)
+        response = self.client.get(profile, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Отписаться')
+
+    def test_count_refresh_changes_etag(self):
+        """Пересчёт числа постов задачей count_feed меняет ETag и
+        Last-Modified ленты."""
+        response = self.client.get(self.urls[0])
+        count_feed(INDEX_FEED)
+        repeat = self.client.get(
+            self.urls[0], HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(repeat.status_code, 200)
+
+    def test_deploy_changes_etag(self):
+        """Новая версия выкладки меняет ETag всех страниц лент."""
+        etags = [self.client.get(url)['ETag'] for url in self.urls]
+        with override_settings(BUILD_VERSION='next'):
+            for url, etag in zip(self.urls, etags):
+                with self.subTest(url=url):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                    self.assertEqual(response.status_code, 200)
+
+    def test_missing_objects_are_404(self):
+        for url in (
+            reverse('posts:profile', args=['nobody']),
+            reverse('posts:posts_list', args=['nothing']),
+            reverse('posts:post_detail', args=[self.post.pk + 100]),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class AuthorRenameTests(CommitCallbacksMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.version = get_feed_version(ALL_FEEDS)
+
+    def test_signup_and_password_change_keep_feeds(self):
+        """Регистрация и смена пароля не сбрасывают кэш лент."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('users:signup'), {
+                'username': 'newcomer',
+                'password1': 'Sup3r-secret-pass',
+                'password2': 'Sup3r-secret-pass',
+            })
+            user = User.objects.get(username='newcomer')
+            user.set_password('An0ther-secret-pass')
+            user.save()
+            User.objects.get(pk=user.pk).save()
+        self.assertEqual(get_feed_version(ALL_FEEDS), self.version)
+
+    def test_rename_refreshes_feeds(self):
+        """Новое имя автора сбрасывает кэш лент."""
+        user = User.objects.create_user(username='author')
+        user.first_name = 'Лев'
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        self.assertNotEqual(get_feed_version(ALL_FEEDS), self.version)
@@ -0,0 +1,90 @@
+import csv
+import io
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='-'
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {i}', author=cls.user,
+                group=cls.group if i % 2 else None,
+            )
+            for i in range(5)
+        ]
+        # Одинаковое время публикации: порядок решает id.
+        Post.objects.update(pub_date=cls.posts[0].pub_date)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_export_profile_jsonl(self):
+        """Выгрузка автора отдаётся потоком, все посты по одному разу."""
+        response = self.client.get(
+            reverse('posts:export_profile', args=[self.user.username])
+        )
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        exported = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [post['id'] for post in exported],
+            [post.pk for post in reversed(self.posts)],
+        )
+        self.assertEqual(exported[0]['author'], 'author')
+
+    def test_export_group_csv(self):
+        """CSV группы с заголовком в формате import_posts."""
+        response = self.client.get(
+            reverse('posts:export_group', args=[self.group.slug]),
+            {'format': 'csv'},
+        )
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        content = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['group'], 'group')
+
+    def test_export_requires_login(self):
+        self.client.logout()
+        url = reverse('posts:export_group', args=[self.group.slug])
+        response = self.client.get(url)
+        self.assertRedirects(response, f"{reverse('users:login')}?next={url}")
+
+    def test_export_is_throttled(self):
+        """Вторая выгрузка раньше EXPORT_INTERVAL получает 429."""
+        url = reverse('posts:export_group', args=[self.group.slug])
+        self.assertEqual(self.client.get(url).status_code, 200)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+    def test_unknown_format(self):
+        response = self.client.get(
+            reverse('posts:export_group', args=[self.group.slug]),
+            {'format': 'xml'},
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_export_command(self):
+        """Команда выгружает все посты сайта."""
+        stdout = io.StringIO()
+        call_command('export_posts', stdout=stdout)
+        self.assertEqual(len(stdout.getvalue().splitlines()), 5)
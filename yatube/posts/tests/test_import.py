@@ -0,0 +1,124 @@
+import io
+import json
+import tempfile
+from datetime import datetime, timezone
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from core.models import Job
+from posts.counters import get_posts_count
+from posts.models import Group, Post
+from posts.search import search_posts
+
+User = get_user_model()
+
+
+class ImportPostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='-'
+        )
+
+    def import_lines(self, content, suffix, *args):
+        with tempfile.NamedTemporaryFile(
+                'w', suffix=suffix, encoding='utf-8') as source:
+            source.write(content)
+            source.flush()
+            stdout, stderr = io.StringIO(), io.StringIO()
+            call_command('import_posts', source.name, '--batch-size', '2',
+                         *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_import_jsonl(self):
+        """Посты импортируются пачками с исходными датами, счётчики и
+        поиск пересчитываются в конце, задачи по постам не ставятся."""
+        records = [
+            {'text': 'Первый импорт', 'author': 'author', 'group': 'group',
+             'pub_date': '2015-03-01T10:00:00+00:00'},
+            {'text': 'Второй импорт', 'author': 'author'},
+            {'text': 'Без автора', 'author': 'nobody'},
+            {'text': 'Новый автор', 'author': 'newcomer'},
+        ]
+        content = '\n'.join(json.dumps(record) for record in records)
+        Job.objects.all().delete()
+        stdout, stderr = self.import_lines(
+            content + '\nне json\n', '.jsonl', '--create-authors'
+        )
+        self.assertIn('Импортировано постов: 4, пропущено записей: 1',
+                      stdout)
+        self.assertIn('Строка 5', stderr)
+        self.assertFalse(Job.objects.exists())
+        first = Post.objects.get(text='Первый импорт')
+        self.assertEqual(first.group, self.group)
+        self.assertEqual(
+            first.pub_date, datetime(2015, 3, 1, 10, tzinfo=timezone.utc)
+        )
+        self.assertEqual(get_posts_count(self.user), 2)
+        self.assertEqual(len(search_posts('импорт')), 2)
+
+    def test_import_csv(self):
+        """CSV с неизвестной группой: запись пропускается."""
+        content = (
+            'text,author,group\n'
+            'Пост из CSV,author,\n'
+            'Чужая группа,author,missing\n'
+        )
+        stdout, stderr = self.import_lines(content, '.csv')
+        self.assertIn('Импортировано постов: 1, пропущено записей: 1',
+                      stdout)
+        self.assertIn('неизвестная группа', stderr)
+        self.assertTrue(Post.objects.filter(text='Пост из CSV').exists())
+
+    def test_non_string_fields_are_skipped(self):
+        """Автор-объект или список пропускается, как битая строка."""
+        records = [
+            {'text': 'Автор-объект', 'author': {'name': 'author'}},
+            {'text': 'Автор-список', 'author': ['author']},
+            {'text': 'Дата-число', 'author': 'author', 'pub_date': 1},
+            {'text': 'Обычный пост', 'author': 'author'},
+        ]
+        content = '\n'.join(json.dumps(record) for record in records)
+        stdout, stderr = self.import_lines(
+            content, '.jsonl', '--create-authors'
+        )
+        self.assertIn('Импортировано постов: 1, пропущено записей: 3',
+                      stdout)
+        self.assertIn('author не строка', stderr)
+
+    def test_batch_size_must_be_positive(self):
+        """--batch-size 0 — ошибка, а не пустой импорт."""
+        with self.assertRaisesMessage(CommandError, '--batch-size'):
+            call_command('import_posts', '-', '--batch-size', '0')
+
+
+class SeedLoadTests(TestCase):
+    def seed(self, prefix):
+        call_command(
+            'seed_load', '--users', '5', '--groups', '2', '--posts', '40',
+            '--batch-size', '15', '--prefix', prefix, stdout=io.StringIO(),
+        )
+        return list(
+            Post.objects.filter(author__username__startswith=f'{prefix}-')
+            .order_by('pk').values_list('text', 'pub_date')
+        )
+
+    def test_seed_is_reproducible(self):
+        """Одинаковый --seed даёт те же посты, счётчики пересчитаны."""
+        first = self.seed('a')
+        self.assertEqual(len(first), 40)
+        self.assertEqual(self.seed('b'), first)
+        self.assertEqual(
+            sum(get_posts_count(author) for author in
+                User.objects.filter(username__startswith='a-')),
+            40,
+        )
+
+    def test_counts_are_validated(self):
+        """Нулевое число пользователей — ошибка команды."""
+        with self.assertRaisesMessage(CommandError, '--users'):
+            call_command('seed_load', '--users', '0', stdout=io.StringIO())
@@ -1,7 +1,11 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
 
-from posts.models import Group, Post
+from posts.models import AuthorStats, Group, Post
 
 User = get_user_model()
 
@@ -88,8 +92,80 @@ class PostModelTest(TestCase):
                 self.assertEqual(
                     post._meta.get_field(field).help_text, expected_value)
 
+    def test_urls_post(self):
+        """Адреса поста совпадают с reverse()."""
+        group = Group.objects.create(title='Группа', slug='urls-group')
+        post = Post.objects.create(author=self.user, text='Текст', group=group)
+        self.assertEqual(
+            post.get_absolute_url(),
+            reverse('posts:post_detail', args=[post.pk]),
+        )
+        self.assertEqual(
+            post.author_url, reverse('posts:profile', args=['auth'])
+        )
+        self.assertEqual(
+            post.group_url, reverse('posts:posts_list', args=['urls-group'])
+        )
+        self.assertEqual(post.edit_url, reverse('posts:edit', args=[post.pk]))
+        self.assertIsNone(PostModelTest.post.group_url)
+
     def test_object_name_is_text_field_post(self):
         """__str__ post - проверка содержимого поля post."""
         post = PostModelTest.post
         post_object_name_text = post.text
         self.assertEqual(post_object_name_text, str(post.text[:15]))
+
+
+class PostIndexesTest(TestCase):
+    def test_feed_queries_use_indexes(self):
+        """Запросы лент не сканируют таблицу и не сортируют во временном
+        B-дереве."""
+        call_command('check_feed_plans', stdout=StringIO())
+
+
+class AuthorStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.other = User.objects.create_user(username='other')
+
+    def posts_count(self, user):
+        return AuthorStats.objects.get(author=user).posts_count
+
+    def test_counter_follows_create_and_delete(self):
+        """Счётчик растёт при создании поста и падает при удалении."""
+        post = Post.objects.create(author=self.user, text='Текст')
+        self.assertEqual(self.posts_count(self.user), 1)
+        post.delete()
+        self.assertEqual(self.posts_count(self.user), 0)
+
+    def test_counter_follows_bulk_operations(self):
+        """Счётчик учитывает bulk_create, update и delete по QuerySet."""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Текст {i}') for i in range(5)
+        )
+        self.assertEqual(self.posts_count(self.user), 5)
+        Post.objects.filter(
+            pk__in=Post.objects.values('pk')[:2]).update(author=self.other)
+        self.assertEqual(self.posts_count(self.user), 3)
+        self.assertEqual(self.posts_count(self.other), 2)
+        Post.objects.filter(author=self.user).delete()
+        self.assertEqual(self.posts_count(self.user), 0)
+        self.assertEqual(self.posts_count(self.other), 2)
+
+    def test_author_cascade_delete(self):
+        """Удаление автора уносит его посты и счётчик."""
+        author = User.objects.create_user(username='gone')
+        Post.objects.create(author=author, text='Текст')
+        author.delete()
+        self.assertFalse(AuthorStats.objects.filter(author_id=author.pk))
+
+    def test_recount_posts_repairs_counters(self):
+        """recount_posts восстанавливает испорченные счётчики."""
+        Post.objects.create(author=self.user, text='Текст')
+        AuthorStats.objects.filter(author=self.user).update(posts_count=7)
+        AuthorStats.objects.filter(author=self.other).delete()
+        call_command('recount_posts', batch_size=1, stdout=StringIO())
+        self.assertEqual(self.posts_count(self.user), 1)
+        self.assertEqual(self.posts_count(self.other), 0)
@@ -0,0 +1,85 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from yatube.settings import VAR_NUMBER_POSTS
+
+from core.tasks import run_jobs
+
+from posts.models import Post, PostTerm
+from posts.search import search_posts, stem, terms
+
+User = get_user_model()
+
+
+class StemTests(TestCase):
+    def test_stem(self):
+        """Формы слова сводятся к одной основе."""
+        words = {
+            'красивая': 'красив',
+            'книги': 'книг',
+            'важнейший': 'важн',
+            'общественность': 'обществен',
+            'улыбнувшись': 'улыбнувш',
+        }
+        for word, expected in words.items():
+            with self.subTest(word=word):
+                self.assertEqual(stem(word), expected)
+
+    def test_terms_skip_stop_words(self):
+        """Стоп-слова в индекс не попадают, латиница не стеммится."""
+        self.assertEqual(
+            list(terms('Кошки и Django')), ['кошк', 'django']
+        )
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.cats = Post.objects.create(
+            text='Кошки гуляли по крыше. Кошка спала.', author=cls.user
+        )
+        cls.cat = Post.objects.create(
+            text='Кошка гуляет одна', author=cls.user
+        )
+        cls.dogs = Post.objects.create(
+            text='Собаки гуляли во дворе', author=cls.user
+        )
+        run_jobs()
+
+    def test_search_ranks_by_frequency(self):
+        """Находятся посты со всеми словами запроса, частые выше."""
+        self.assertEqual(list(search_posts('кошками')), [self.cats, self.cat])
+        self.assertEqual(list(search_posts('кошки на крыше')), [self.cats])
+
+    def test_index_follows_edits_and_deletes(self):
+        """Индекс обновляется при правке и удалении поста."""
+        self.dogs.text = 'Кошка во дворе'
+        self.dogs.save()
+        run_jobs()
+        self.assertIn(self.dogs, search_posts('кошка'))
+        self.assertNotIn(self.dogs, search_posts('собаки'))
+        post_id = self.dogs.pk
+        self.dogs.delete()
+        self.assertFalse(PostTerm.objects.filter(post_id=post_id).exists())
+
+    def test_bulk_update_reindexes(self):
+        """Массовая правка текста перестраивает индекс."""
+        Post.objects.filter(pk=self.cat.pk).update(text='Попугай')
+        run_jobs()
+        self.assertEqual(list(search_posts('попугай')), [self.cat])
+
+    def test_search_page(self):
+        """Страница поиска сохраняет запрос в ссылках пагинации."""
+        for number in range(VAR_NUMBER_POSTS):
+            Post.objects.create(text=f'Кошка номер {number}', author=self.user)
+        run_jobs()
+        response = Client().get(reverse('posts:search'), {'q': 'кошка'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'posts/search.html')
+        self.assertEqual(len(response.context['page_obj']), VAR_NUMBER_POSTS)
+        self.assertContains(
+            response, '?q=%D0%BA%D0%BE%D1%88%D0%BA%D0%B0&amp;page='
+        )
@@ -0,0 +1,156 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.tasks import run_jobs
+from core.testing import CommitCallbacksMixin
+
+from posts.models import (AuthorStats, Follow, Group, GroupMember, Post,
+                          TimelineEntry)
+from posts.timelines import fanout_post, home_timeline, rebuild_timeline
+
+User = get_user_model()
+
+
+class TimelineTests(CommitCallbacksMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.stranger = User.objects.create_user(username='stranger')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='-'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        GroupMember.objects.create(user=cls.reader, group=cls.group)
+
+    def test_fanout_fills_followers_and_members(self):
+        """Пост попадает в ленты подписчиков автора и участников группы."""
+        by_author = Post.objects.create(text='Автор', author=self.author)
+        in_group = Post.objects.create(
+            text='Группа', author=self.stranger, group=self.group
+        )
+        other = Post.objects.create(text='Чужой', author=self.stranger)
+        for post in (by_author, in_group, other):
+            fanout_post(post.pk)
+        self.assertEqual(
+            list(home_timeline(self.reader)), [in_group, by_author]
+        )
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.stranger, post=other).exists())
+
+    def test_counters(self):
+        """Подписки и участие в группах считаются в денормализованных
+        полях."""
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.author).followers_count, 1
+        )
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.members_count, 1)
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.author).followers_count, 0
+        )
+
+    @override_settings(TIMELINE_LENGTH=2, TIMELINE_TRIM_SLACK=0)
+    def test_timeline_is_capped(self):
+        """Сохранённая лента не длиннее TIMELINE_LENGTH."""
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=self.author)
+            for i in range(3)
+        ]
+        for post in posts:
+            fanout_post(post.pk)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 2
+        )
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.reader, post=posts[0]).exists())
+
+    @override_settings(TIMELINE_LENGTH=2, TIMELINE_TRIM_SLACK=2)
+    def test_timeline_is_trimmed_past_slack(self):
+        """Лента обрезается, только когда перерастёт TIMELINE_LENGTH
+        больше чем на TIMELINE_TRIM_SLACK записей."""
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=self.author)
+            for i in range(5)
+        ]
+        entries = TimelineEntry.objects.filter(user=self.reader)
+        for post in posts[:4]:
+            fanout_post(post.pk)
+        self.assertEqual(entries.count(), 4)
+        fanout_post(posts[4].pk)
+        self.assertEqual(entries.count(), 2)
+        self.assertEqual(list(home_timeline(self.reader)), posts[:2:-1])
+
+    def test_fanout_after_group_change(self):
+        """Пост, перенесённый в другую группу, раскладывается её
+        участникам и уходит из лент участников прежней."""
+        other_group = Group.objects.create(
+            title='Другая', slug='other', description='-'
+        )
+        member = User.objects.create_user(username='member')
+        GroupMember.objects.create(user=member, group=other_group)
+        post = Post.objects.create(
+            text='Пост', author=self.stranger, group=self.group
+        )
+        fanout_post(post.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            post.group = other_group
+            post.save()
+        run_jobs()
+        self.assertNotIn(post, home_timeline(self.reader))
+        self.assertIn(post, home_timeline(member))
+
+    @override_settings(FANOUT_LIMIT=0)
+    def test_celebrity_posts_merged_on_read(self):
+        """Посты автора со слишком многими подписчиками не раскладываются,
+        а подмешиваются при чтении."""
+        post = Post.objects.create(text='Знаменитость', author=self.author)
+        fanout_post(post.pk)
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
+        self.assertIn(post, home_timeline(self.reader))
+
+    def test_rebuild_after_unfollow(self):
+        """После отписки посты автора уходят из ленты."""
+        post = Post.objects.create(text='Автор', author=self.author)
+        rebuild_timeline(self.reader.pk)
+        self.assertIn(post, home_timeline(self.reader))
+        Follow.objects.filter(user=self.reader).delete()
+        rebuild_timeline(self.reader.pk)
+        self.assertNotIn(post, home_timeline(self.reader))
+
+    def test_follow_views(self):
+        """Подписка и отписка через страницы профиля."""
+        client = Client()
+        client.force_login(self.stranger)
+        follow_url = reverse('posts:profile_follow', args=[self.author])
+        self.assertEqual(client.get(follow_url).status_code, 405)
+        self.assertFalse(Follow.objects.filter(
+            user=self.stranger, author=self.author).exists())
+        client.post(follow_url)
+        self.assertTrue(Follow.objects.filter(
+            user=self.stranger, author=self.author).exists())
+        client.post(reverse('posts:profile_follow', args=[self.stranger]))
+        self.assertFalse(Follow.objects.filter(
+            user=self.stranger, author=self.stranger).exists())
+        client.post(reverse('posts:profile_unfollow', args=[self.author]))
+        self.assertFalse(Follow.objects.filter(
+            user=self.stranger, author=self.author).exists())
+        response = client.get(reverse('posts:follow_index'))
+        self.assertTemplateUsed(response, 'posts/follow.html')
+
+    def test_group_membership_views(self):
+        """Вступление в группу и выход из неё только через POST."""
+        client = Client()
+        client.force_login(self.stranger)
+        join_url = reverse('posts:group_join', args=[self.group.slug])
+        self.assertEqual(client.get(join_url).status_code, 405)
+        client.post(join_url)
+        self.assertTrue(GroupMember.objects.filter(
+            user=self.stranger, group=self.group).exists())
+        client.post(reverse('posts:group_leave', args=[self.group.slug]))
+        self.assertFalse(GroupMember.objects.filter(
+            user=self.stranger, group=self.group).exists())
@@ -1,11 +1,22 @@
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.cache import cache, caches
+from django.core.paginator import Paginator
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.template.loader import render_to_string
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django import forms
 
+from core.models import Job
+from core.testing import CommitCallbacksMixin
+from core.tasks import run_jobs
 from yatube.settings import VAR_NUMBER_POSTS
 
+from posts.feeds import INDEX_FEED, get_feed_version
 from posts.models import Post, Group
+from posts.object_cache import _post_key
+from posts.paginators import page_window
 
 
 User = get_user_model()
@@ -33,6 +44,8 @@ class PostsPagesTests(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
+        caches['objects'].clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
 
@@ -184,6 +197,7 @@ class PaginatorPagesTests(TestCase):
         cls.page_paginator_remains = total_posts % 10
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
 
     def test_index_page_paginator(self):
@@ -223,3 +237,340 @@ class PaginatorPagesTests(TestCase):
             self.assertEqual(len(
                 response.context['page_obj']), self.page_paginator_remains
             )
+
+
+@override_settings(CURSOR_PAGINATION=True)
+class CursorPaginatorPagesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Тестовый текст поста{i}')
+            for i in range(25)
+        )
+        cls.expected = list(
+            Post.objects.order_by('-pub_date', '-pk').values_list(
+                'pk', flat=True)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_index_cursor_walks_all_posts(self):
+        """Курсор проходит всю ленту без пропусков и повторов."""
+        seen = []
+        url = reverse('posts:index')
+        while True:
+            page_obj = self.client.get(url).context['page_obj']
+            self.assertLessEqual(len(page_obj), VAR_NUMBER_POSTS)
+            seen.extend(post.pk for post in page_obj)
+            if not page_obj.has_next():
+                break
+            url = reverse('posts:index') + f'?after={page_obj.next_cursor}'
+        self.assertEqual(seen, self.expected)
+
+    def test_index_cursor_previous_page(self):
+        """Ссылка «Предыдущая» возвращает на предыдущую страницу."""
+        first = self.client.get(reverse('posts:index')).context['page_obj']
+        self.assertFalse(first.has_previous())
+        second = self.client.get(
+            reverse('posts:index') + f'?after={first.next_cursor}'
+        ).context['page_obj']
+        self.assertTrue(second.has_previous())
+        back = self.client.get(
+            reverse('posts:index') + f'?before={second.previous_cursor}'
+        ).context['page_obj']
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+
+    def test_index_cursor_invalid_token(self):
+        """Битый курсор ведёт на первую страницу."""
+        response = self.client.get(reverse('posts:index') + '?after=мусор')
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            self.expected[:VAR_NUMBER_POSTS]
+        )
+
+
+class FeedQueryBudgetTests(TestCase):
+    # Потолок запросов на страницу ленты при любом числе постов на ней.
+    QUERY_BUDGET = {
+        'posts:index': 2,
+        'posts:posts_list': 3,
+        'posts:profile': 3,
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug='test-slug',
+            description='Описание группы'
+        )
+        cls.user = User.objects.create_user(username='test_user')
+        for i in range(VAR_NUMBER_POSTS):
+            author = User.objects.create_user(username=f'author_{i}')
+            group = Group.objects.create(
+                title=f'Группа {i}', slug=f'group-{i}', description='-'
+            )
+            Post.objects.create(author=author, group=group, text=f'Пост {i}')
+            Post.objects.create(
+                author=cls.user, group=cls.group, text=f'Пост автора {i}'
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feed_query_budget(self):
+        """Страница ленты укладывается в бюджет запросов (нет N+1)."""
+        urls = {
+            'posts:index': reverse('posts:index'),
+            'posts:posts_list': reverse(
+                'posts:posts_list', kwargs={'slug': self.group.slug}),
+            'posts:profile': reverse(
+                'posts:profile', kwargs={'username': self.user.username}),
+        }
+        for view_name, url in urls.items():
+            with self.subTest(view_name=view_name):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertEqual(
+                    len(response.context['page_obj']), VAR_NUMBER_POSTS)
+                self.assertLessEqual(
+                    len(queries), self.QUERY_BUDGET[view_name],
+                    '\n'.join(query['sql'] for query in queries)
+                )
+
+
+class CachedCountPaginatorTests(CommitCallbacksMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Тестовый текст поста{i}')
+            for i in range(25)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_index_count_is_cached(self):
+        """Повторная страница index не считает посты заново."""
+        self.client.get(reverse('posts:index'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.context['page_obj'].paginator.count, 25)
+        self.assertFalse(
+            [query for query in queries if 'COUNT' in query['sql']])
+
+    def test_new_post_invalidates_count(self):
+        """Новый пост сбрасывает закэшированное число постов лент."""
+        self.client.get(reverse('posts:index'))
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(author=self.user, text='Новый пост')
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.context['page_obj'].paginator.count, 26)
+
+    @override_settings(COUNT_ESTIMATE_PAGES=1)
+    def test_cold_cache_count_is_bounded(self):
+        """При холодном кэше посты считаются не дальше границы оценки."""
+        response = self.client.get(reverse('posts:index'))
+        paginator = response.context['page_obj'].paginator
+        self.assertEqual(paginator.count, 2 * VAR_NUMBER_POSTS)
+        response = self.client.get(reverse('posts:index') + '?page=2')
+        paginator = response.context['page_obj'].paginator
+        self.assertEqual(paginator.count, 25)
+
+    @override_settings(COUNT_ESTIMATE_PAGES=1)
+    def test_long_feed_count_is_warmed_by_task(self):
+        """Точное число постов длинной ленты считает одна задача."""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(
+            Job.objects.filter(task='posts.tasks.count_feed').count(), 1
+        )
+        run_jobs()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.context['page_obj'].paginator.count, 25)
+        self.assertFalse(
+            [query for query in queries if 'COUNT' in query['sql']])
+
+
+class PageWindowTests(TestCase):
+    def window(self, number, num_pages):
+        page = Paginator(range(num_pages), 1).page(number)
+        return list(page_window(page))
+
+    def test_window(self):
+        self.assertEqual(self.window(1, 6), [1, 2, 3, 4, 5, 6])
+        self.assertEqual(self.window(1, 50000), [1, 2, 3, None, 50000])
+        self.assertEqual(
+            self.window(2500, 50000),
+            [1, None, 2498, 2499, 2500, 2501, 2502, None, 50000],
+        )
+        self.assertEqual(
+            self.window(50000, 50000), [1, None, 49998, 49999, 50000]
+        )
+        # Пропуск в одну страницу не заменяется многоточием.
+        self.assertEqual(self.window(5, 9), list(range(1, 10)))
+        self.assertEqual(
+            self.window(6, 12), [1, None, 4, 5, 6, 7, 8, None, 12]
+        )
+
+    def test_paginator_include_size_is_bounded(self):
+        """Навигация по ленте в 50 000 страниц — несколько ссылок."""
+        page = Paginator(range(500000), VAR_NUMBER_POSTS).page(2500)
+        html = render_to_string(
+            'posts/includes/paginator.html', {'page_obj': page}
+        )
+        self.assertEqual(html.count('<li'), 13)
+        self.assertIn('page=50000', html)
+        self.assertNotIn('page=1000"', html)
+        self.assertEqual(html.count('&hellip;'), 2)
+
+
+class FeedFragmentCacheTests(CommitCallbacksMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug='test-slug',
+            description='Описание группы'
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст поста',
+            author=cls.user,
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_cached_feed_page_skips_queries(self):
+        """Повторная страница ленты отдаётся из кэша без запросов."""
+        self.client.get(reverse('posts:index'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:index'))
+        self.assertEqual(len(queries), 0)
+        self.assertContains(response, self.post.text)
+
+    def test_post_edit_refreshes_affected_feeds(self):
+        """Правка поста обновляет его ленты, но не чужие."""
+        other_group = Group.objects.create(
+            title='Другая группа', slug='other-slug', description='-')
+        other_url = reverse(
+            'posts:posts_list', kwargs={'slug': other_group.slug})
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:posts_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+        ]
+        for url in urls + [other_url]:
+            self.client.get(url)
+        versions = self.client.get(other_url).context['feed_cache_key']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.authorized_client.post(
+                reverse('posts:edit', kwargs={'post_id': self.post.pk}),
+                data={'text': 'Новый текст', 'group': self.group.pk},
+            )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Новый текст')
+        self.assertEqual(
+            self.client.get(other_url).context['feed_cache_key'], versions)
+
+    def test_feed_version_changes_after_commit(self):
+        """Версия ленты поднимается после фиксации транзакции, а не в
+        ней."""
+        version = get_feed_version(INDEX_FEED)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Post.objects.create(author=self.user, text='Новый пост')
+            self.assertEqual(get_feed_version(INDEX_FEED), version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_feed_version(INDEX_FEED), version)
+
+    def test_authorized_header_is_not_cached(self):
+        """Шапка авторизованного пользователя не берётся из кэша ленты."""
+        self.client.get(reverse('posts:index'))
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, self.user.username)
+        self.assertContains(response, reverse('users:logout'))
+
+
+class ObjectCacheTests(CommitCallbacksMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug='test-slug',
+            description='Описание группы'
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст поста',
+            author=cls.user,
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        caches['objects'].clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_post_detail_served_from_cache(self):
+        """Повторный post_detail не читает пост, автора и группу."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.context['post'].group, self.group)
+        self.assertFalse(
+            [query for query in queries if 'posts_post' in query['sql']])
+
+    def test_post_edit_invalidates_cached_post(self):
+        """Правка поста сбрасывает его запись в кэше объектов."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.authorized_client.post(
+                reverse('posts:edit', kwargs={'post_id': self.post.pk}),
+                data={'text': 'Новый текст', 'group': self.group.pk},
+            )
+        self.assertEqual(
+            self.client.get(url).context['post'].text, 'Новый текст')
+
+    def test_post_edit_ignores_stale_cached_post(self):
+        """Форма правки берёт пост из базы, а не из кэша объектов."""
+        stale = Post.objects.get(pk=self.post.pk)
+        stale.text = 'Устаревший текст'
+        stale.group = None
+        caches['objects'].set(_post_key(self.post.pk), stale)
+        response = self.authorized_client.get(
+            reverse('posts:edit', kwargs={'post_id': self.post.pk}))
+        post = response.context['form'].instance
+        self.assertEqual(post.text, self.post.text)
+        self.assertEqual(post.group, self.group)
+
+    def test_group_slug_change_invalidates_cached_group(self):
+        """Смена slug группы убирает из кэша запись по старому slug."""
+        old_url = reverse('posts:posts_list', kwargs={'slug': 'test-slug'})
+        self.client.get(old_url)
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'new-slug'
+        with self.captureOnCommitCallbacks(execute=True):
+            group.save()
+        self.assertEqual(self.client.get(old_url).status_code, 404)
+        response = self.client.get(
+            reverse('posts:posts_list', kwargs={'slug': 'new-slug'}))
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,152 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import router, transaction
+from django.db.models import Count, Q
+
+from .models import (AuthorStats, Follow, Group, GroupMember, Post,
+                     TimelineEntry)
+
+User = get_user_model()
+
+
+def _primary():
+    # Раскладка идёт сразу после записи, реплика может её ещё не видеть.
+    return router.db_for_write(Post)
+
+
+def timeline_sources(user_id, using=None):
+    """Авторы и группы ленты пользователя, разделённые на раскладываемые
+    при записи и подмешиваемые при чтении."""
+    limit = settings.FANOUT_LIMIT
+    authors, celebrity_authors = {user_id}, set()
+    for author_id, followers in Follow.objects.using(using).filter(
+            user_id=user_id).values_list(
+                'author_id', 'author__post_stats__followers_count'):
+        if (followers or 0) > limit:
+            celebrity_authors.add(author_id)
+        else:
+            authors.add(author_id)
+    groups, celebrity_groups = set(), set()
+    for group_id, members in GroupMember.objects.using(using).filter(
+            user_id=user_id).values_list('group_id', 'group__members_count'):
+        if members > limit:
+            celebrity_groups.add(group_id)
+        else:
+            groups.add(group_id)
+    return authors, celebrity_authors, groups, celebrity_groups
+
+
+def fanout_post(post_id, old_group_id=None):
+    """Кладёт пост в ленты автора, его подписчиков и участников группы.
+
+    Если пост перенесли из группы old_group_id, он уходит из лент её
+    участников, которые не подписаны на автора.
+    """
+    db = _primary()
+    limit = settings.FANOUT_LIMIT
+    post = Post.objects.using(db).filter(pk=post_id).values(
+        'pub_date', 'author_id', 'group_id').first()
+    if post is None:
+        return
+    author_id, group_id = post['author_id'], post['group_id']
+    if old_group_id and old_group_id != group_id:
+        TimelineEntry.objects.using(db).filter(
+            post_id=post_id,
+            user_id__in=GroupMember.objects.using(db).filter(
+                group_id=old_group_id).values('user_id'),
+        ).exclude(user_id=author_id).exclude(
+            user_id__in=Follow.objects.using(db).filter(
+                author_id=author_id).values('user_id'),
+        ).delete()
+    recipients = {author_id}
+    if not AuthorStats.objects.using(db).filter(
+            author_id=author_id, followers_count__gt=limit).exists():
+        recipients.update(Follow.objects.using(db).filter(
+            author_id=author_id).values_list('user_id', flat=True))
+    if group_id and not Group.objects.using(db).filter(
+            pk=group_id, members_count__gt=limit).exists():
+        recipients.update(GroupMember.objects.using(db).filter(
+            group_id=group_id).values_list('user_id', flat=True))
+    TimelineEntry.objects.using(db).bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=post_id,
+                       pub_date=post['pub_date'])
+         for user_id in recipients),
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    trim_timelines(recipients)
+
+
+def trim_timelines(user_ids):
+    """Обрезает до TIMELINE_LENGTH ленты, переросшие его больше чем на
+    TIMELINE_TRIM_SLACK записей.
+
+    Длины лент считаются одним запросом на пачку читателей, а обрезается
+    каждая лента раз в TIMELINE_TRIM_SLACK раскладок, а не при каждой.
+    Лишние записи до обрезки не видны: home_timeline читает не больше
+    TIMELINE_LENGTH постов.
+    """
+    user_ids = list(user_ids)
+    threshold = settings.TIMELINE_LENGTH + settings.TIMELINE_TRIM_SLACK
+    # Пачки держат число параметров запроса ниже предела SQLite (999).
+    for start in range(0, len(user_ids), 500):
+        overgrown = (
+            TimelineEntry.objects.using(_primary())
+            .filter(user_id__in=user_ids[start:start + 500])
+            .values('user_id')
+            .annotate(entries=Count('pk'))
+            .filter(entries__gt=threshold)
+            .values_list('user_id', flat=True)
+        )
+        for user_id in list(overgrown):
+            trim_timeline(user_id)
+
+
+def trim_timeline(user_id):
+    """Удаляет из ленты посты старше TIMELINE_LENGTH последних."""
+    entries = TimelineEntry.objects.using(_primary()).filter(user_id=user_id)
+    stale = list(
+        entries.order_by('-pub_date', '-post_id')
+        .values_list('pk', flat=True)[settings.TIMELINE_LENGTH:]
+    )
+    if stale:
+        entries.filter(pk__in=stale).delete()
+
+
+def rebuild_timeline(user_id):
+    """Заполняет ленту заново: после подписки, отписки, вступления в
+    группу и выхода из неё."""
+    db = _primary()
+    if not User.objects.using(db).filter(pk=user_id).exists():
+        return
+    authors, _, groups, _ = timeline_sources(user_id, using=db)
+    posts = (
+        Post.objects.using(db)
+        .filter(Q(author_id__in=authors) | Q(group_id__in=groups))
+        .order_by('-pub_date', '-pk')
+        .values_list('pk', 'pub_date')[:settings.TIMELINE_LENGTH]
+    )
+    with transaction.atomic(using=db):
+        TimelineEntry.objects.using(db).filter(user_id=user_id).delete()
+        TimelineEntry.objects.using(db).bulk_create(
+            TimelineEntry(user_id=user_id, post_id=post_id,
+                          pub_date=pub_date)
+            for post_id, pub_date in posts
+        )
+
+
+def home_timeline(user):
+    """Посты из сохранённой ленты вместе с постами авторов и групп,
+    которые при записи не раскладываются."""
+    _, celebrity_authors, _, celebrity_groups = timeline_sources(user.pk)
+    condition = Q(pk__in=TimelineEntry.objects.filter(
+        user=user).values('post_id'))
+    if celebrity_authors:
+        condition |= Q(author_id__in=celebrity_authors)
+    if celebrity_groups:
+        condition |= Q(group_id__in=celebrity_groups)
+    return (
+        Post.objects.filter(condition)
+        .select_related('author', 'group')
+        .order_by('-pub_date', '-pk')[:settings.TIMELINE_LENGTH]
+    )
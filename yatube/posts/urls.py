@@ -7,8 +7,28 @@ app_name = 'posts'
 urlpatterns = [
     path('', views.index, name='index'),
     path('group/<slug:slug>/', views.group_posts, name='posts_list'),
+    path('group/<slug:slug>/join/', views.group_join, name='group_join'),
+    path('group/<slug:slug>/leave/', views.group_leave, name='group_leave'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path(
+        'profile/<str:username>/follow/',
+        views.profile_follow,
+        name='profile_follow'
+    ),
+    path(
+        'profile/<str:username>/unfollow/',
+        views.profile_unfollow,
+        name='profile_unfollow'
+    ),
+    path('follow/', views.follow_index, name='follow_index'),
+    path(
+        'export/profile/<str:username>/',
+        views.export_profile,
+        name='export_profile'
+    ),
+    path('export/group/<slug:slug>/', views.export_group, name='export_group'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path('search/', views.search, name='search'),
     path('create/', views.post_create, name='create_post'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='edit'),
 ]
@@ -1,57 +1,167 @@
+import hashlib
+from datetime import datetime, timezone
+
+from django.conf import settings
 from django.core.paginator import Paginator
+from django.db import router
+from django.core.cache import cache
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
+from django.utils.http import urlencode
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
 
+from core.template_profile import templates_mtime
 from yatube.settings import VAR_NUMBER_POSTS
 
-from .models import Group, Post
+from .models import Follow, Group, GroupMember, Post
+from .counters import get_posts_count
+from .feeds import (INDEX_FEED, author_feed, author_feed_key,
+                    feed_cache_context, feed_state, group_feed,
+                    group_feed_key, index_feed, viewer_key)
+from .exports import CONTENT_TYPES, export_lines, iter_posts
 from .forms import PostForm
+from .object_cache import get_group_or_404, get_post_or_404
+from .paginators import CachedCountPaginator, CursorPaginator
+from .search import search_posts
+from .timelines import home_timeline
+
+
+def for_write(model):
+    """Менеджер модели на основной базе: объекты, которые меняет запрос,
+    читаются не из кэша объектов и не с отстающей реплики."""
+    return model.objects.using(router.db_for_write(model))
 
 
-def paginator_page(request, posts):
-    paginator = Paginator(posts, VAR_NUMBER_POSTS)
+def paginator_page(request, posts, feed_key, count=None):
+    if settings.CURSOR_PAGINATION:
+        paginator = CursorPaginator(posts, VAR_NUMBER_POSTS)
+        return paginator.get_page(
+            after=request.GET.get("after"),
+            before=request.GET.get("before"),
+        )
+    paginator = CachedCountPaginator(
+        posts, VAR_NUMBER_POSTS, feed_key, count=count
+    )
     page_number = request.GET.get("page")
     page_obj = paginator.get_page(page_number)
     return page_obj
 
 
+def conditional_page(page_feed_keys):
+    """Условный GET для страниц, собранных из лент.
+
+    page_feed_keys(request, *args, **kwargs) отдаёт ключи лент страницы.
+    ETag складывается из их версий, версии подписок зрителя, версии
+    выкладки и адреса страницы, Last-Modified — время последнего
+    изменения этих лент или шаблонов. Состояние лент берётся одним
+    обращением к кэшу, и повторный запрос без изменений
+    получает 304 без запросов лент и отрисовки шаблона. no-cache
+    заставляет браузер спрашивать сервер при каждом показе страницы.
+    """
+    def validators(request, *args, **kwargs):
+        if not hasattr(request, "page_validators"):
+            keys = list(page_feed_keys(request, *args, **kwargs))
+            if request.user.is_authenticated:
+                keys.append(viewer_key(request.user.pk))
+            version, changed = feed_state(keys)
+            deployed = templates_mtime()
+            build = settings.BUILD_VERSION or deployed
+            tag = (
+                f"{build}:{version}:{request.user.pk}:"
+                f"{request.get_full_path()}"
+            )
+            request.page_validators = (
+                hashlib.md5(tag.encode()).hexdigest(),
+                max(changed, datetime.fromtimestamp(deployed, timezone.utc)),
+            )
+        return request.page_validators
+
+    def etag(request, *args, **kwargs):
+        return validators(request, *args, **kwargs)[0]
+
+    def last_modified(request, *args, **kwargs):
+        return validators(request, *args, **kwargs)[1]
+
+    def decorator(view):
+        view = condition(etag_func=etag, last_modified_func=last_modified)(
+            view
+        )
+        return cache_control(private=True, no_cache=True)(view)
+
+    return decorator
+
+
+def profile_feed_keys(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        "pk", flat=True
+    ).first()
+    if author_id is None:
+        raise Http404
+    return [author_feed_key(author_id)]
+
+
+@conditional_page(lambda request: [INDEX_FEED])
 def index(request):
-    posts = Post.objects.all()
-    page_obj = paginator_page(request, posts)
+    posts = index_feed()
+    page_obj = paginator_page(request, posts, INDEX_FEED)
     context = {
         "page_obj": page_obj,
+        **feed_cache_context(INDEX_FEED, page_obj),
     }
     return render(request, "posts/index.html", context)
 
 
+@conditional_page(
+    lambda request, slug: [group_feed_key(get_group_or_404(slug).pk)]
+)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    page_obj = paginator_page(request, posts)
+    group = get_group_or_404(slug)
+    posts = group_feed(group)
+    feed_key = group_feed_key(group.pk)
+    page_obj = paginator_page(request, posts, feed_key)
     context = {
         "group": group,
         "page_obj": page_obj,
+        "is_member": request.user.is_authenticated and group.members.filter(
+            user=request.user).exists(),
+        **feed_cache_context(feed_key, page_obj),
     }
     return render(request, "posts/group_list.html", context)
 
 
+@conditional_page(profile_feed_keys)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    number_of_posts = posts.count()
-    page_obj = paginator_page(request, posts)
+    author = get_object_or_404(
+        User.objects.select_related("post_stats"), username=username
+    )
+    posts = author_feed(author)
+    number_of_posts = get_posts_count(author)
+    feed_key = author_feed_key(author.pk)
+    page_obj = paginator_page(
+        request, posts, feed_key, count=number_of_posts
+    )
     context = {
         "page_obj": page_obj,
         "author": author,
         "number_of_posts": number_of_posts,
+        "following": request.user.is_authenticated and author.following.filter(
+            user=request.user).exists(),
+        **feed_cache_context(feed_key, page_obj),
     }
     return render(request, "posts/profile.html", context)
 
 
+@conditional_page(
+    lambda request, post_id: [
+        author_feed_key(get_post_or_404(post_id).author_id)
+    ]
+)
 def post_detail(request, post_id):
-    posts = get_object_or_404(Post, pk=post_id)
-    number_of_posts = posts.author.posts.count()
+    posts = get_post_or_404(post_id)
+    number_of_posts = get_posts_count(posts.author)
     context = {
         "post": posts,
         "number_of_posts": number_of_posts,
@@ -59,6 +169,18 @@ def post_detail(request, post_id):
     return render(request, "posts/post_detail.html", context)
 
 
+def search(request):
+    query = request.GET.get("q", "").strip()
+    paginator = Paginator(search_posts(query), VAR_NUMBER_POSTS)
+    page_obj = paginator.get_page(request.GET.get("page"))
+    context = {
+        "query": query,
+        "page_obj": page_obj,
+        "page_query": urlencode({"q": query}) + "&",
+    }
+    return render(request, "posts/search.html", context)
+
+
 @login_required
 def post_create(request):
 
@@ -79,7 +201,9 @@ def post_create(request):
 
 @login_required
 def post_edit(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        for_write(Post).select_related("author", "group"), pk=post_id
+    )
     groups = Group.objects.all()
     form = PostForm(request.POST or None, instance=post)
     if post.author != request.user:
@@ -94,3 +218,82 @@ def post_edit(request, post_id):
         "form": form,
     }
     return render(request, "posts/create_post.html", context)
+
+
+@login_required
+def follow_index(request):
+    paginator = Paginator(home_timeline(request.user), VAR_NUMBER_POSTS)
+    page_obj = paginator.get_page(request.GET.get("page"))
+    return render(request, "posts/follow.html", {"page_obj": page_obj})
+
+
+@login_required
+@require_POST
+def profile_follow(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user:
+        Follow.objects.get_or_create(user=request.user, author=author)
+    return redirect("posts:profile", username=username)
+
+
+@login_required
+@require_POST
+def profile_unfollow(request, username):
+    author = get_object_or_404(User, username=username)
+    Follow.objects.filter(user=request.user, author=author).delete()
+    return redirect("posts:profile", username=username)
+
+
+@login_required
+@require_POST
+def group_join(request, slug):
+    group = get_object_or_404(for_write(Group), slug=slug)
+    GroupMember.objects.get_or_create(user=request.user, group=group)
+    return redirect("posts:posts_list", slug=slug)
+
+
+@login_required
+@require_POST
+def group_leave(request, slug):
+    group = get_object_or_404(for_write(Group), slug=slug)
+    GroupMember.objects.filter(user=request.user, group=group).delete()
+    return redirect("posts:posts_list", slug=slug)
+
+
+def export_response(request, posts, filename, fmt):
+    """Выгрузка потоком. Она читает всю ленту, поэтому пользователь
+    получает не больше одной за EXPORT_INTERVAL секунд."""
+    if fmt not in CONTENT_TYPES:
+        raise Http404("Неизвестный формат выгрузки")
+    if not cache.add(
+        f"posts:exporting:{request.user.pk}", True, settings.EXPORT_INTERVAL
+    ):
+        response = HttpResponse("Слишком частая выгрузка", status=429)
+        response["Retry-After"] = settings.EXPORT_INTERVAL
+        return response
+    response = StreamingHttpResponse(
+        export_lines(iter_posts(posts), fmt),
+        content_type=CONTENT_TYPES[fmt],
+    )
+    response["Content-Disposition"] = (
+        f'attachment; filename="{filename}.{fmt}"'
+    )
+    return response
+
+
+@login_required
+def export_profile(request, username):
+    author = get_object_or_404(User, username=username)
+    return export_response(
+        request, author_feed(author), f"posts-{author.username}",
+        request.GET.get("format", "jsonl"),
+    )
+
+
+@login_required
+def export_group(request, slug):
+    group = get_group_or_404(slug)
+    return export_response(
+        request, group_feed(group), f"posts-{group.slug}",
+        request.GET.get("format", "jsonl"),
+    )
@@ -4,6 +4,7 @@ from django.views.generic import CreateView
 # Функция reverse_lazy позволяет получить URL по параметрам функции path()
 # Берём, тоже пригодится
 from django.urls import reverse_lazy
+from django.core.mail import send_mail
 
 # Импортируем класс формы, чтобы сослаться на неё во view-классе
 from .forms import CreationForm
@@ -14,3 +15,15 @@ class SignUp(CreateView):
     # После успешной регистрации перенаправляем пользователя на главную.
     success_url = reverse_lazy('posts:index')
     template_name = 'users/signup.html'
+
+    def form_valid(self, form):
+        response = super().form_valid(form)
+        # Письмо ставится в очередь (core.mail), регистрация его не ждёт.
+        if self.object.email:
+            send_mail(
+                'Добро пожаловать в Yatube',
+                f'{self.object.username}, вы зарегистрировались в Yatube.',
+                None,
+                [self.object.email],
+            )
+        return response
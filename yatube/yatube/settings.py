@@ -2,7 +2,19 @@ import os
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
+# Письма складываются в очередь и уходят в фоне через
+# MAIL_DELIVERY_BACKEND пачками по MAIL_BATCH_SIZE, не быстрее
+# MAIL_RATE_LIMIT писем в секунду; неотправленное повторяется до
+# MAIL_MAX_ATTEMPTS раз. Один запуск отправки длится не дольше
+# MAIL_FLUSH_TIME_LIMIT секунд (с запасом меньше TASKS_LOCK_TIMEOUT).
+EMAIL_BACKEND = "core.mail.QueuedEmailBackend"
+MAIL_DELIVERY_BACKEND = os.getenv(
+    "MAIL_DELIVERY_BACKEND", "django.core.mail.backends.filebased.EmailBackend"
+)
+MAIL_BATCH_SIZE = 50
+MAIL_RATE_LIMIT = 10
+MAIL_MAX_ATTEMPTS = 5
+MAIL_FLUSH_TIME_LIMIT = 120
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
@@ -12,6 +24,10 @@ DEBUG = True
 
 ALLOWED_HOSTS = ["127.0.0.1", "localhost", "testserver"]
 
+# Адрес сайта для ссылок в письмах: фоновые задачи идут без запроса, и
+# домен им взять неоткуда.
+SITE_URL = os.getenv("SITE_URL", "http://127.0.0.1:8000")
+
 
 INSTALLED_APPS = [
     "posts.apps.PostsConfig",
@@ -27,7 +43,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "core.middleware.ReplicaPinningMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -42,12 +60,27 @@ LOGIN_URL = "users:login"
 
 LOGIN_REDIRECT_URL = "posts:index"
 
+# Профиль шаблонов выбирается переменной YATUBE_TEMPLATE_PROFILE:
+# debug (по умолчанию при DEBUG) перечитывает шаблоны на каждый запрос,
+# cached (для продакшена) держит скомпилированные шаблоны в памяти
+# процесса и компилирует шаблоны проекта при запуске
+# (core.template_profile.warm_templates).
+TEMPLATE_PROFILE = os.getenv(
+    "YATUBE_TEMPLATE_PROFILE", "debug" if DEBUG else "cached"
+)
+
+# Версия выкладки входит в ETag страниц лент (posts.views.conditional_page):
+# после выкладки браузер не получит 304 на страницу, отрисованную старым
+# кодом. Без YATUBE_BUILD_VERSION версией служит время изменения самого
+# нового шаблона.
+BUILD_VERSION = os.getenv("YATUBE_BUILD_VERSION", "")
+
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [TEMPLATES_DIR],
-        "APP_DIRS": True,
+        "APP_DIRS": TEMPLATE_PROFILE != "cached",
         "OPTIONS": {
             "context_processors": [
                 "django.template.context_processors.debug",
@@ -59,15 +92,94 @@ TEMPLATES = [
         },
     },
 ]
+if TEMPLATE_PROFILE == "cached":
+    TEMPLATES[0]["OPTIONS"]["loaders"] = [
+        (
+            "django.template.loaders.cached.Loader",
+            [
+                "django.template.loaders.filesystem.Loader",
+                "django.template.loaders.app_directories.Loader",
+            ],
+        ),
+    ]
 
 WSGI_APPLICATION = "yatube.wsgi.application"
 
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
+# Профиль базы данных выбирается переменной YATUBE_DB_PROFILE:
+# sqlite (по умолчанию) или postgresql. В обоих соединения переживают
+# запрос и живут DB_CONN_MAX_AGE секунд.
+DB_PROFILE = os.getenv("YATUBE_DB_PROFILE", "sqlite")
+DB_CONN_MAX_AGE = int(os.getenv("DB_CONN_MAX_AGE", "60"))
+
+if DB_PROFILE == "postgresql":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.getenv("POSTGRES_DB", "yatube"),
+            "USER": os.getenv("POSTGRES_USER", "yatube"),
+            "PASSWORD": os.getenv("POSTGRES_PASSWORD", ""),
+            "HOST": os.getenv("POSTGRES_HOST", "localhost"),
+            "PORT": os.getenv("POSTGRES_PORT", "5432"),
+            "CONN_MAX_AGE": DB_CONN_MAX_AGE,
+            # QuerySet.iterator() (рассылка подписчикам в
+            # posts.tasks.notify_followers, миграция поискового индекса)
+            # читает строки серверным курсором порциями; выгрузки
+            # обходятся пачками по ключу и курсор не держат. За PgBouncer
+            # в режиме transaction серверные курсоры нужно выключить:
+            # POSTGRES_NO_SSC=1.
+            "DISABLE_SERVER_SIDE_CURSORS": bool(os.getenv("POSTGRES_NO_SSC")),
+        }
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.getenv(
+                "SQLITE_PATH", os.path.join(BASE_DIR, "db.sqlite3")
+            ),
+            "CONN_MAX_AGE": DB_CONN_MAX_AGE,
+        }
     }
+
+# Реплики только для чтения: файлы SQLite через запятую в
+# YATUBE_DB_REPLICAS (копирует их manage.py sync_replicas) или хосты
+# PostgreSQL в POSTGRES_REPLICA_HOSTS. Чтения постов и групп идут на них,
+# записи и всё остальное — в default.
+if DB_PROFILE == "postgresql":
+    _replicas = [
+        dict(DATABASES["default"], HOST=host)
+        for host in os.getenv("POSTGRES_REPLICA_HOSTS", "").split(",")
+        if host
+    ]
+else:
+    _replicas = [
+        dict(DATABASES["default"], NAME=path)
+        for path in os.getenv("YATUBE_DB_REPLICAS", "").split(",")
+        if path
+    ]
+for _number, _replica in enumerate(_replicas, start=1):
+    # В тестах реплика — то же соединение, что и default.
+    _replica["TEST"] = {"MIRROR": "default"}
+    DATABASES[f"replica{_number}"] = _replica
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["core.routers.PrimaryReplicaRouter"]
+
+# После записи клиент читает основную базу столько секунд: этого должно
+# хватать, чтобы реплики догнали её.
+REPLICA_PIN_COOKIE = "primary_pin"
+REPLICA_PIN_SECONDS = 10
+
+# PRAGMA для каждого нового соединения SQLite (core.db.configure_sqlite):
+# WAL не даёт писателю блокировать читателей, NORMAL в режиме WAL не
+# теряет целостность при сбое, mmap читает базу без копирования в буфер,
+# а busy_timeout ждёт блокировку вместо немедленной ошибки.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "busy_timeout": 5000,
 }
 
 
@@ -97,8 +209,138 @@ USE_L10N = True
 
 USE_TZ = True
 
+# Кэш: LRU в памяти каждого процесса. С YATUBE_CACHE_MODE=shared перед
+# ним появляется общий файловый уровень для всех WSGI-процессов хоста;
+# запись в памяти процесса тогда живёт не дольше LOCAL_TIMEOUT секунд.
+CACHE_MODE = os.getenv("YATUBE_CACHE_MODE", "local")
+CACHE_DIR = os.getenv("YATUBE_CACHE_DIR", os.path.join(BASE_DIR, "cache"))
+
+CACHES = {
+    "default": {
+        "BACKEND": "core.cache_backends.TieredCache",
+        "LOCATION": "yatube",
+        "TIMEOUT": 300,
+        "OPTIONS": {
+            "LOCAL_MAX_ENTRIES": 1000,
+            "LOCAL_TIMEOUT": 5,
+            "SHARED": {
+                "LOCATION": os.path.join(CACHE_DIR, "default"),
+                "MAX_ENTRIES": 10000,
+            } if CACHE_MODE == "shared" else None,
+        },
+    },
+    # Посты и группы по pk и slug: свой предел LRU, чтобы отрисованные
+    # ленты не вытесняли популярные объекты.
+    "objects": {
+        "BACKEND": "core.cache_backends.TieredCache",
+        "LOCATION": "yatube-objects",
+        "TIMEOUT": 300,
+        "OPTIONS": {
+            "LOCAL_MAX_ENTRIES": 5000,
+            "LOCAL_TIMEOUT": 5,
+            "SHARED": {
+                "LOCATION": os.path.join(CACHE_DIR, "objects"),
+                "MAX_ENTRIES": 50000,
+            } if CACHE_MODE == "shared" else None,
+        },
+    },
+}
+
 STATIC_URL = "/static/"
 
 STATICFILES_DIRS = (os.path.join(BASE_DIR, "static"),)
 
 VAR_NUMBER_POSTS = 10
+
+# Ленты index, group_posts и profile листаются курсором ?after=/?before=
+# вместо ?page=: без COUNT(*) и OFFSET, но и без номеров страниц.
+CURSOR_PAGINATION = False
+
+# Сроки жизни записей кэша, в секундах. Все они сбрасываются сигналами
+# при изменении данных, срок лишь ограничивает память и случаи, которые
+# сигналы не видят.
+# Отрисованный список постов страницы ленты: устаревает сменой версии
+# ленты при любом изменении её постов.
+FEED_CACHE_TIMEOUT = 60 * 15
+# Число постов ленты для Paginator: сбрасывается при добавлении,
+# удалении и переносе постов.
+COUNT_CACHE_TIMEOUT = 60 * 60
+# Отдельные посты и группы по pk и slug: сбрасываются при их сохранении
+# и удалении.
+OBJECT_CACHE_TIMEOUT = 60 * 10
+
+# При холодном кэше посты считаются не дальше чем на столько страниц
+# вперёд от запрошенной.
+COUNT_ESTIMATE_PAGES = 100
+
+# Домашняя лента подписок хранится готовым списком не длиннее
+# TIMELINE_LENGTH постов и пополняется в фоне при публикации. Посты
+# авторов и групп, у которых подписчиков или участников больше
+# FANOUT_LIMIT, не раскладываются по лентам, а подмешиваются при чтении.
+# Лента обрезается, когда перерастёт TIMELINE_LENGTH на
+# TIMELINE_TRIM_SLACK записей.
+TIMELINE_LENGTH = 500
+TIMELINE_TRIM_SLACK = 50
+FANOUT_LIMIT = 1000
+
+# Очередь фоновых задач core.tasks, исполнители — manage.py run_workers.
+# Упавшая задача повторяется до TASKS_MAX_ATTEMPTS раз с паузой от
+# TASKS_RETRY_DELAY, удваивающейся до TASKS_RETRY_MAX_DELAY секунд.
+TASKS_MAX_ATTEMPTS = 5
+TASKS_RETRY_DELAY = 10
+TASKS_RETRY_MAX_DELAY = 60 * 60
+# Пауза между опросами пустой очереди, в секундах.
+TASKS_POLL_INTERVAL = 1
+# Задача, взятая исполнителем дольше этого срока назад, считается
+# брошенной и возвращается в очередь.
+TASKS_LOCK_TIMEOUT = 60 * 10
+
+# Выгрузка постов читает базу пачками такого размера. Выгружать могут
+# только вошедшие пользователи, не чаще раза в EXPORT_INTERVAL секунд.
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_INTERVAL = 60
+
+# Гистограммы /metrics (core.metrics) считаются за последние
+# METRICS_WINDOW секунд в памяти процесса; окно сдвигается ступеньками
+# по METRICS_WINDOW / METRICS_WINDOW_SLICES секунд.
+METRICS_WINDOW = 60 * 5
+METRICS_WINDOW_SLICES = 5
+METRICS_PREFIX = "yatube"
+
+# Запросы к базе дольше SLOW_QUERY_MS миллисекунд пишутся в
+# SLOW_QUERY_LOG (core.slow_queries) вместе с кадром нашего кода и строкой
+# шаблона, которые их вызвали; из них в журнал попадает доля
+# SLOW_QUERY_SAMPLE_RATE. Пустая YATUBE_SLOW_QUERY_MS выключает журнал.
+# Отчёт: manage.py slow_queries.
+_slow_query_ms = os.getenv("YATUBE_SLOW_QUERY_MS", "100")
+SLOW_QUERY_MS = float(_slow_query_ms) if _slow_query_ms else None
+SLOW_QUERY_SAMPLE_RATE = float(os.getenv("YATUBE_SLOW_QUERY_SAMPLE_RATE", "1"))
+SLOW_QUERY_LOG = os.getenv(
+    "YATUBE_SLOW_QUERY_LOG", os.path.join(BASE_DIR, "slow_queries.log")
+)
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "message": {"format": "%(message)s"},
+    },
+    "handlers": {
+        "slow_queries": {
+            "class": "logging.handlers.RotatingFileHandler",
+            "filename": SLOW_QUERY_LOG,
+            "maxBytes": 10 * 1024 * 1024,
+            "backupCount": 5,
+            "encoding": "utf-8",
+            "delay": True,
+            "formatter": "message",
+        },
+    },
+    "loggers": {
+        "yatube.slow_queries": {
+            "handlers": ["slow_queries"],
+            "level": "WARNING",
+            "propagate": False,
+        },
+    },
+}